@@ -0,0 +1,210 @@
+"""
+Audio Buffer for TTS Bot
+Write-once audio buffer that is shared without copies and spills large audio to a temporary file
+"""
+
+import io
+import os
+import mmap
+import tempfile
+from typing import Iterable, Optional, Union
+
+from mp3_frames import MP3Joiner
+
+# Audio larger than this is moved out of memory into an anonymous temporary file
+SPILL_BYTES = int(float(os.getenv('AUDIO_SPILL_MB', '4')) * 1024 * 1024)
+
+
+class AudioBuffer(io.BufferedIOBase):
+    """
+    Binary file object for synthesized audio
+
+    Stream chunks are collected in a BytesIO, which grows in place; the first read
+    seals the buffer, turning the collected data into one immutable bytes object
+    without copying it. That object is what the audio cache, coalesced requests and
+    the upload all share (freeze()), and reading the whole buffer returns it as-is.
+    Past spill_bytes the audio moves to a temporary file instead and is shared as an
+    mmap-backed memoryview.
+
+    The buffer can be passed straight to pyrogram's reply_audio / reply_voice, which
+    only needs read/seek/tell and .name. Buffers built from existing bytes (cache
+    hits, coalesced results) wrap them without copying.
+    """
+
+    def __init__(self, initial: Optional[Union[bytes, memoryview]] = None, spill_bytes: int = SPILL_BYTES, name: str = "tts_audio.mp3"):
+        super().__init__()
+        self.name = name
+        self.spill_bytes = spill_bytes
+        self._pos = 0
+        self._file = None
+        self._mmap = None
+        if initial is not None:
+            self._writer = None
+            self._data = initial
+            self._size = len(initial) if isinstance(initial, bytes) else initial.nbytes
+        else:
+            self._writer = io.BytesIO()
+            self._data = b""
+            self._size = 0
+
+    @classmethod
+    def join(cls, parts: Iterable, name: str = "tts_audio.mp3", gap_ms: int = 0) -> "AudioBuffer":
+        """
+        Join MP3 parts (buffers or bytes-like) frame by frame into one buffer with a single copy
+
+        AudioBuffer parts are consumed: they are closed, so their memory is freed even
+        while asyncio still holds the gathered results.
+        """
+        joiner = MP3Joiner(cls(name=name), gap_ms=gap_ms)
+        for part in parts:
+            if isinstance(part, AudioBuffer):
+                joiner.append(part.freeze())
+                part.close()
+            else:
+                joiner.append(part)
+        return joiner.finish()
+
+    @property
+    def nbytes(self) -> int:
+        return self._size
+
+    @property
+    def spilled(self) -> bool:
+        return self._file is not None
+
+    def __len__(self) -> int:
+        return self._size
+
+    def readable(self) -> bool:
+        return True
+
+    def writable(self) -> bool:
+        return self._writer is not None or (self._file is not None and self._mmap is None)
+
+    def seekable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        """Append audio data at the end of the buffer (only before the first read)"""
+        if self.closed:
+            raise ValueError("I/O operation on closed audio buffer")
+        if not self.writable():
+            raise io.UnsupportedOperation("audio buffer is sealed once read")
+        size = data.nbytes if isinstance(data, memoryview) else len(data)
+        if self._file is None and self._size + size > self.spill_bytes:
+            self._spill()
+        if self._file is not None:
+            self._file.write(data)
+        else:
+            self._writer.write(data)
+        self._size += size
+        return size
+
+    def overwrite(self, offset: int, data) -> int:
+        """Replace bytes already written at offset (only before the first read), e.g. a header patched at the end"""
+        if not self.writable():
+            raise io.UnsupportedOperation("audio buffer is sealed once read")
+        size = data.nbytes if isinstance(data, memoryview) else len(data)
+        if offset < 0 or offset + size > self._size:
+            raise ValueError("overwrite outside the written audio")
+        target = self._file if self._file is not None else self._writer
+        target.seek(offset)
+        target.write(data)
+        target.seek(0, io.SEEK_END)
+        return size
+
+    def _spill(self):
+        self._file = tempfile.TemporaryFile()
+        with self._writer.getbuffer() as collected:
+            self._file.write(collected)
+        self._writer = None
+
+    def _seal(self):
+        if self._writer is not None:
+            # BytesIO.getvalue() hands over its internal bytes object when no views are exported
+            self._data = self._writer.getvalue()
+            self._writer = None
+        elif self._file is not None and self._mmap is None:
+            self._file.flush()
+            self._mmap = mmap.mmap(self._file.fileno(), self._size, access=mmap.ACCESS_READ)
+            self._data = memoryview(self._mmap).toreadonly()
+
+    def freeze(self) -> Union[bytes, memoryview]:
+        """Seal the buffer and return its immutable contents without copying (bytes, or a view once spilled)"""
+        self._seal()
+        return self._data
+
+    def view(self) -> memoryview:
+        """Read-only memoryview of the whole audio (no copy)"""
+        return memoryview(self.freeze()).toreadonly()
+
+    def getbuffer(self) -> memoryview:
+        """BytesIO-compatible alias of view()"""
+        return self.view()
+
+    def getvalue(self) -> bytes:
+        """The audio as bytes (no copy unless the buffer spilled or wraps a view)"""
+        data = self.freeze()
+        return data if isinstance(data, bytes) else data.tobytes()
+
+    def read(self, size: int = -1) -> bytes:
+        if self.closed:
+            raise ValueError("I/O operation on closed audio buffer")
+        data = self.freeze()
+        end = self._size if size is None or size < 0 else min(self._size, self._pos + size)
+        if end <= self._pos:
+            return b""
+        if self._pos == 0 and end == self._size and isinstance(data, bytes):
+            chunk = data  # Whole buffer: hand out the bytes object itself
+        else:
+            with memoryview(data) as view:
+                chunk = view[self._pos:end].tobytes()
+        self._pos = end
+        return chunk
+
+    def read1(self, size: int = -1) -> bytes:
+        return self.read(size)
+
+    def readinto(self, target) -> int:
+        """Copy the next bytes straight into target (no intermediate bytes object)"""
+        data = self.freeze()
+        with memoryview(target) as destination, destination.cast('B') as destination:
+            end = min(self._size, self._pos + destination.nbytes)
+            count = max(0, end - self._pos)
+            if count:
+                with memoryview(data) as view:
+                    destination[:count] = view[self._pos:end]
+            self._pos += count
+            return count
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._pos + offset
+        elif whence == io.SEEK_END:
+            position = self._size + offset
+        else:
+            raise ValueError(f"invalid whence ({whence})")
+        if position < 0:
+            raise ValueError(f"negative seek position {position}")
+        self._pos = position
+        return position
+
+    def tell(self) -> int:
+        return self._pos
+
+    def close(self):
+        if self.closed:
+            return
+        # Contents shared earlier (audio cache, coalesced requests) keep their own reference
+        self._data = b""
+        self._writer = None
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                pass  # Still viewed elsewhere; unmapped when the last view is released
+        if self._file is not None:
+            self._file.close()
+        super().close()
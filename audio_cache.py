@@ -0,0 +1,292 @@
+"""
+Audio Cache for TTS Bot
+Two-tier content-addressed cache (memory LRU + on-disk store) for synthesized audio
+"""
+
+import os
+import re
+import hashlib
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Optional, Dict, Any
+
+from executors import run_blocking, Pool
+
+logger = logging.getLogger(__name__)
+
+# Cache location and budgets (configurable through environment)
+CACHE_DIR = os.getenv('AUDIO_CACHE_DIR', os.path.join('temp_files', 'audio_cache'))
+MEMORY_BUDGET_BYTES = int(float(os.getenv('AUDIO_CACHE_MEMORY_MB', '32')) * 1024 * 1024)
+DISK_BUDGET_BYTES = int(float(os.getenv('AUDIO_CACHE_DISK_MB', '256')) * 1024 * 1024)
+
+# Sentence fragment cache: per-sentence audio reused across texts that share sentences
+FRAGMENT_CACHE_DIR = os.getenv('AUDIO_FRAGMENT_CACHE_DIR', os.path.join('temp_files', 'audio_fragments'))
+FRAGMENT_MEMORY_BUDGET_BYTES = int(float(os.getenv('AUDIO_FRAGMENT_CACHE_MEMORY_MB', '16')) * 1024 * 1024)
+FRAGMENT_DISK_BUDGET_BYTES = int(float(os.getenv('AUDIO_FRAGMENT_CACHE_DISK_MB', '256')) * 1024 * 1024)
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text so that trivially different inputs share one cache entry"""
+    text = unicodedata.normalize('NFC', text or '')
+    return _WHITESPACE_RE.sub(' ', text).strip()
+
+
+def make_cache_key(voice: str, text: str) -> str:
+    """Build content-addressed key from voice id and normalized text hash"""
+    digest = hashlib.sha256()
+    digest.update(voice.encode('utf-8'))
+    digest.update(b'\x00')
+    digest.update(normalize_text(text).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def make_text_hash(text: str) -> str:
+    """Hash of normalized text alone (voice-independent), e.g. for Telegram file_id lookups"""
+    return hashlib.sha256(normalize_text(text).encode('utf-8')).hexdigest()
+
+
+class AudioCache:
+    """
+    Byte-budgeted in-memory LRU backed by a size-capped disk store
+
+    get() / put() block on disk I/O; request paths use aget() / aput(), which keep the
+    event loop on the memory tier and run disk reads and writes on the file-io pool.
+    """
+
+    def __init__(
+        self,
+        memory_budget_bytes: int = MEMORY_BUDGET_BYTES,
+        disk_budget_bytes: int = DISK_BUDGET_BYTES,
+        cache_dir: str = CACHE_DIR
+    ):
+        self.memory_budget_bytes = memory_budget_bytes
+        self.disk_budget_bytes = disk_budget_bytes
+        self.cache_dir = cache_dir
+
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_index: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_bytes = 0
+        self._disk_pending = set()  # Keys being written to disk
+        self._lock = threading.Lock()
+
+        self.stats = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'memory_evictions': 0,
+            'disk_evictions': 0,
+            'disk_errors': 0,
+        }
+
+        self._load_disk_index()
+
+    def _path_for(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.mp3")
+
+    def _load_disk_index(self):
+        """Rebuild the disk LRU index from files left by previous runs (oldest first)"""
+        if self.disk_budget_bytes <= 0:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            entries = []
+            for file_name in os.listdir(self.cache_dir):
+                if not file_name.endswith('.mp3'):
+                    continue
+                path = os.path.join(self.cache_dir, file_name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, file_name[:-4], stat.st_size))
+
+            for _, key, size in sorted(entries):
+                self._disk_index[key] = size
+                self._disk_bytes += size
+
+            self._remove_files(self._evict_disk())
+        except Exception as e:
+            self.stats['disk_errors'] += 1
+            logger.error(f"Error loading audio cache index: {e}")
+
+    def _lookup(self, key: str):
+        """Memory-tier lookup: (data, None) on a hit, (None, path) if the key is on disk, (None, None) on a miss"""
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.stats['memory_hits'] += 1
+                return data, None
+            if key not in self._disk_index:
+                self.stats['misses'] += 1
+                return None, None
+            return None, self._path_for(key)
+
+    def _read_disk(self, key: str, path: str) -> Optional[bytes]:
+        """Read a disk entry and promote it into memory (file I/O runs outside the lock)"""
+        try:
+            with open(path, 'rb') as cache_file:
+                data = cache_file.read()
+            os.utime(path, None)
+        except OSError as e:
+            with self._lock:
+                self.stats['disk_errors'] += 1
+                self.stats['misses'] += 1
+                stale = self._drop_disk_entry(key)
+            self._remove_files(stale)
+            logger.warning(f"Audio cache disk read failed for {key[:12]}: {e}")
+            return None
+
+        with self._lock:
+            if key in self._disk_index:
+                self._disk_index.move_to_end(key)
+            self.stats['disk_hits'] += 1
+            self._store_memory(key, data)
+        return data
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return cached audio bytes or None, promoting disk hits into memory (blocking on disk hits)"""
+        data, path = self._lookup(key)
+        if path is None:
+            return data
+        return self._read_disk(key, path)
+
+    async def aget(self, key: str) -> Optional[bytes]:
+        """get() for the event loop: memory hits return at once, disk reads run on the file-io pool"""
+        data, path = self._lookup(key)
+        if path is None:
+            return data
+        return await run_blocking(Pool.FILE_IO, self._read_disk, key, path)
+
+    def contains(self, key: str) -> bool:
+        """Whether key is cached in either tier (no stats, no promotion)"""
+        with self._lock:
+            return key in self._memory or key in self._disk_index
+
+    def _store(self, key: str, data) -> Optional[bytes]:
+        """Store in memory and claim the disk write; returns the data to write to disk, or None"""
+        if not data:
+            return None
+        if not isinstance(data, (bytes, memoryview)):
+            data = bytes(data)
+        with self._lock:
+            self.stats['stores'] += 1
+            self._store_memory(key, data)
+            if len(data) > self.disk_budget_bytes or key in self._disk_pending:
+                return None
+            if key in self._disk_index:
+                self._disk_index.move_to_end(key)
+                return None
+            self._disk_pending.add(key)
+        return data
+
+    def put(self, key: str, data: bytes):
+        """Store audio bytes in both tiers (read-only memoryviews are kept as-is, without a copy); blocking disk write"""
+        data = self._store(key, data)
+        if data is not None:
+            self._write_disk(key, data)
+
+    async def aput(self, key: str, data: bytes):
+        """put() for the event loop: the memory tier is updated at once, the disk write runs on the file-io pool"""
+        data = self._store(key, data)
+        if data is not None:
+            await run_blocking(Pool.FILE_IO, self._write_disk, key, data)
+
+    def _store_memory(self, key: str, data: bytes):
+        size = len(data)
+        if size > self.memory_budget_bytes:
+            return
+
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= len(previous)
+
+        self._memory[key] = data
+        self._memory_bytes += size
+
+        while self._memory_bytes > self.memory_budget_bytes and self._memory:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+            self.stats['memory_evictions'] += 1
+
+    def _write_disk(self, key: str, data: bytes):
+        """Write a claimed entry to disk, then index it and evict over budget (file I/O runs outside the lock)"""
+        path = self._path_for(key)
+        tmp_path = f"{path}.tmp"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(tmp_path, 'wb') as cache_file:
+                cache_file.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            with self._lock:
+                self._disk_pending.discard(key)
+                self.stats['disk_errors'] += 1
+            logger.warning(f"Audio cache disk write failed for {key[:12]}: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return
+
+        with self._lock:
+            self._disk_pending.discard(key)
+            self._disk_index[key] = len(data)
+            self._disk_bytes += len(data)
+            evicted = self._evict_disk()
+        self._remove_files(evicted)
+
+    def _evict_disk(self) -> list:
+        """Drop least recently used entries over the disk budget; returns their paths to delete"""
+        paths = []
+        while self._disk_bytes > self.disk_budget_bytes and self._disk_index:
+            key = next(iter(self._disk_index))
+            paths.extend(self._drop_disk_entry(key))
+            self.stats['disk_evictions'] += 1
+        return paths
+
+    def _drop_disk_entry(self, key: str) -> list:
+        """Remove key from the disk index; returns its path to delete"""
+        size = self._disk_index.pop(key, 0)
+        self._disk_bytes -= size
+        return [self._path_for(key)]
+
+    @staticmethod
+    def _remove_files(paths: list):
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def clear(self):
+        """Remove every cached entry from memory and disk"""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            paths = []
+            for key in list(self._disk_index.keys()):
+                paths.extend(self._drop_disk_entry(key))
+        self._remove_files(paths)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        hits = self.stats['memory_hits'] + self.stats['disk_hits']
+        lookups = hits + self.stats['misses']
+        return {
+            **self.stats,
+            'hits': hits,
+            'hit_rate': round(hits / lookups * 100, 1) if lookups else 0.0,
+            'memory_entries': len(self._memory),
+            'memory_bytes': self._memory_bytes,
+            'memory_budget_bytes': self.memory_budget_bytes,
+            'disk_entries': len(self._disk_index),
+            'disk_bytes': self._disk_bytes,
+            'disk_budget_bytes': self.disk_budget_bytes,
+        }
@@ -0,0 +1,102 @@
+"""
+Audio Output Stage for TTS Bot
+Transcodes synthesized MP3 to OGG/Opus voice notes on the cpu-audio pool, off the pyrogram event loop
+"""
+
+import os
+import time
+import logging
+from io import BytesIO
+from typing import Optional, Dict, Any
+
+from executors import run_blocking, Pool
+
+logger = logging.getLogger(__name__)
+
+OPUS_BITRATE = os.getenv('OPUS_BITRATE', '24k')
+# Uplink speed used to estimate upload time saved by the smaller file (kilobits per second)
+UPLOAD_REFERENCE_KBPS = float(os.getenv('UPLOAD_REFERENCE_KBPS', '1000'))
+
+
+class DeliveryFormat:
+    """How TTS results are delivered to the user"""
+    AUDIO = "audio"   # MP3 audio file (reply_audio)
+    VOICE = "voice"   # OGG/Opus voice note (reply_voice)
+
+
+def transcode_mp3_to_opus(mp3_bytes: bytes, bitrate: str = OPUS_BITRATE) -> tuple:
+    """
+    Transcode MP3 bytes to OGG/Opus (runs on a cpu-audio worker thread; ffmpeg does the work)
+
+    Returns:
+        tuple: (ogg_bytes, duration_seconds)
+    """
+    from pydub import AudioSegment
+
+    segment = AudioSegment.from_file(BytesIO(mp3_bytes), format="mp3")
+    output = BytesIO()
+    segment.export(output, format="ogg", codec="libopus", bitrate=bitrate)
+    return output.getvalue(), int(round(len(segment) / 1000))
+
+
+class AudioOutputStage:
+    """
+    Post-synthesis output stage; transcoding runs on the shared cpu-audio pool
+    """
+
+    def __init__(self):
+        self.stats = {
+            'transcoded': 0,
+            'failed': 0,
+            'bytes_in': 0,
+            'bytes_out': 0,
+            'transcode_seconds': 0.0,
+        }
+
+    async def to_voice_note(self, audio_data: BytesIO) -> Optional[tuple]:
+        """
+        Convert MP3 audio to an OGG/Opus voice note
+
+        Returns:
+            tuple: (voice_buffer, duration_seconds) or None if transcoding failed
+        """
+        mp3_bytes = audio_data.getvalue()
+        start = time.monotonic()
+        try:
+            ogg_bytes, duration = await run_blocking(Pool.CPU_AUDIO, transcode_mp3_to_opus, mp3_bytes)
+        except Exception as e:
+            self.stats['failed'] += 1
+            logger.error(f"Opus transcoding failed, falling back to MP3: {e}")
+            return None
+
+        elapsed = time.monotonic() - start
+        saved = len(mp3_bytes) - len(ogg_bytes)
+        upload_saved = saved * 8 / 1000 / UPLOAD_REFERENCE_KBPS
+
+        self.stats['transcoded'] += 1
+        self.stats['bytes_in'] += len(mp3_bytes)
+        self.stats['bytes_out'] += len(ogg_bytes)
+        self.stats['transcode_seconds'] += elapsed
+
+        logger.info(
+            f"🎙️ Opus voice note: {len(mp3_bytes)} → {len(ogg_bytes)} bytes "
+            f"({saved / len(mp3_bytes) * 100 if mp3_bytes else 0:.0f}% smaller), "
+            f"transcode {elapsed * 1000:.0f}ms, ~{upload_saved * 1000:.0f}ms upload saved @ {UPLOAD_REFERENCE_KBPS:.0f}kbps"
+        )
+
+        voice_data = BytesIO(ogg_bytes)
+        voice_data.name = "tts_voice.ogg"
+        return voice_data, duration
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get transcoding statistics"""
+        transcoded = self.stats['transcoded']
+        return {
+            **self.stats,
+            'avg_size_reduction': round((1 - self.stats['bytes_out'] / self.stats['bytes_in']) * 100, 1) if self.stats['bytes_in'] else 0.0,
+            'avg_transcode_ms': round(self.stats['transcode_seconds'] / transcoded * 1000, 1) if transcoded else 0.0,
+        }
+
+
+# Global output stage instance
+audio_output = AudioOutputStage()
@@ -0,0 +1,698 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for TTS Bot hot paths
+
+Usage:
+    python benchmarks.py                 # run all benchmarks
+    python benchmarks.py language        # run selected benchmarks
+
+The pipeline benchmark runs TTSService behind the scheduler on the offline backend,
+so it needs no network access; tune it with the TTS_OFFLINE_* environment variables.
+"""
+import os
+import re
+import sys
+import time
+import asyncio
+import tempfile
+import contextlib
+import io
+
+from language_detector import LanguageDetector, ROMAN_HINDI_WORDS
+
+INPUT_CHARS = 3000
+
+
+def _repeat_to_length(sample: str, length: int = INPUT_CHARS) -> str:
+    return (sample * (length // len(sample) + 1))[:length]
+
+
+def _time_calls(func, arg, min_seconds: float = 0.5) -> float:
+    """Return calls per second of func(arg), measured for at least min_seconds"""
+    calls = 0
+    start = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < min_seconds:
+        for _ in range(20):
+            func(arg)
+        calls += 20
+        elapsed = time.perf_counter() - start
+    return calls / elapsed
+
+
+def _legacy_detect_language(text: str) -> str:
+    """Previous multi-pass TTSService._detect_language (set rebuilt per call), kept as the baseline"""
+    clean_text = text.strip().lower()
+    hindi_chars = sum(1 for char in clean_text if '\u0900' <= char <= '\u097F')
+    roman_hindi_words = set(ROMAN_HINDI_WORDS)
+    words = re.findall(r'\b[a-z]+\b', clean_text)
+    roman_hindi_count = sum(1 for word in words if word in roman_hindi_words)
+    total_chars = len([c for c in clean_text if c.isalpha()])
+    total_words = len(words) if words else 1
+    if total_chars == 0:
+        return 'en'
+    hindi_ratio = hindi_chars / total_chars
+    roman_hindi_ratio = roman_hindi_count / total_words
+    if hindi_ratio > 0.6 or roman_hindi_ratio >= 0.4 or hindi_ratio > 0.3:
+        return 'hi'
+    return 'en'
+
+
+def bench_language():
+    """Language detection throughput on 3000-character inputs"""
+    samples = {
+        'english': _repeat_to_length("The quick brown fox jumps over the lazy dog. "),
+        'devanagari': _repeat_to_length("नमस्ते, आप कैसे हैं? मैं ठीक हूँ। "),
+        'roman_hindi': _repeat_to_length("kya haal hai bhai, sab theek hai na? "),
+        'mixed': _repeat_to_length("Meeting kal subah hai, please samay par aana. कल मिलते हैं। "),
+    }
+    detector = LanguageDetector()
+    multi_script = LanguageDetector(enabled_scripts=('hi', 'bn', 'ta', 'te'))
+
+    print(f"\n🔍 Language detection ({INPUT_CHARS} chars per call)")
+    print(f"{'input':<12} {'legacy/s':>10} {'single-pass/s':>14} {'4 scripts/s':>12} {'speedup':>8}  result")
+    for name, text in samples.items():
+        legacy = _time_calls(_legacy_detect_language, text)
+        fast = _time_calls(detector.detect, text)
+        multi = _time_calls(multi_script.detect, text)
+        result = detector.detect(text)
+        print(f"{name:<12} {legacy:>10.0f} {fast:>14.0f} {multi:>12.0f} {fast / legacy:>7.1f}x  {result} (legacy {_legacy_detect_language(text)})")
+
+
+def _percentile(values, percent):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percent / 100))] if values else 0.0
+
+
+async def _run_pipeline(users: int, messages_per_user: int, failure_rate: float, cache_dir: str):
+    from audio_cache import AudioCache
+    from tts_backends import OfflineTTSBackend
+    from tts_scheduler import TTSScheduler
+    from tts_service import TTSService
+
+    primary = OfflineTTSBackend(failure_rate=failure_rate)
+    fallback = OfflineTTSBackend(first_byte_seconds=0.8, failure_rate=0)
+    service = TTSService(primary_backend=primary, fallback_backend=fallback)
+    service.audio_cache = AudioCache(cache_dir=cache_dir)
+    service.fragment_cache = AudioCache(cache_dir=os.path.join(cache_dir, 'fragments'))
+    scheduler = TTSScheduler()
+    voices = list(service.voice_mapping)
+
+    latencies = []
+    failed = 0
+
+    async def user_session(user_id):
+        nonlocal failed
+        for index in range(messages_per_user):
+            # Every third message repeats a popular text to exercise caching and coalescing
+            text = "Namaste, aaj ka mausam bahut accha hai." if index % 3 == 0 else \
+                f"User {user_id} message {index}: kal subah meeting hai, please samay par aana."
+            start = time.perf_counter()
+            async with scheduler.slot(user_id):
+                audio_data = await service.text_to_speech_with_voice(text, voices[user_id % len(voices)])
+            latencies.append(time.perf_counter() - start)
+            if not audio_data:
+                failed += 1
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):  # TTSService logs every request
+        await asyncio.gather(*(user_session(user_id) for user_id in range(users)))
+    elapsed = time.perf_counter() - start
+    return elapsed, latencies, failed, service, scheduler, primary
+
+
+def bench_pipeline(users: int = 50, messages_per_user: int = 4, failure_rate: float = 0.05):
+    """End-to-end scheduler + TTSService throughput on the offline backend"""
+    with tempfile.TemporaryDirectory() as cache_dir:
+        elapsed, latencies, failed, service, scheduler, primary = asyncio.run(
+            _run_pipeline(users, messages_per_user, failure_rate, cache_dir)
+        )
+
+    total = len(latencies)
+    queue = scheduler.get_stats()
+    coalescing = service.get_coalescing_stats()
+    print(f"\n🚀 Pipeline: {users} users x {messages_per_user} messages, offline backend, {failure_rate:.0%} injected failures")
+    print(f"requests {total}, failed {failed}, {total / elapsed:.1f} req/s over {elapsed:.1f}s")
+    print(f"latency p50 {_percentile(latencies, 50) * 1000:.0f}ms, p95 {_percentile(latencies, 95) * 1000:.0f}ms, p99 {_percentile(latencies, 99) * 1000:.0f}ms")
+    print(f"queue wait avg {queue['avg_wait_ms']}ms, p95 {queue['p95_wait_ms']}ms, max depth {queue['max_queue_depth_seen']}")
+    print(f"backend requests {primary.stats['requests']} ({primary.stats['failures']} failed), "
+          f"coalesced {coalescing['coalesced']}, cache hits {service.audio_cache.get_stats()['memory_hits']}")
+
+    from latency_metrics import latency_metrics
+    for stage, stage_stats in latency_metrics.get_stats().items():
+        print(f"  {stage:<16} p50 {stage_stats['p50_ms']:>7.1f}ms  p95 {stage_stats['p95_ms']:>7.1f}ms  p99 {stage_stats['p99_ms']:>7.1f}ms  (n={stage_stats['count']})")
+
+
+def _simulate_upload(audio_data, part_size: int = 512 * 1024) -> int:
+    """Read audio the way pyrogram's save_file does (seek to end for the size, then fixed-size parts)"""
+    audio_data.seek(0, io.SEEK_END)
+    audio_data.tell()  # pyrogram reads the file size here
+    audio_data.seek(0)
+    sent = 0
+    while True:
+        chunk = audio_data.read(part_size)
+        if not chunk:
+            return sent
+        sent += len(chunk)
+
+
+async def _measure_request_memory(service, text: str, voice_type: str) -> tuple:
+    import tracemalloc
+
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+    audio_data = await service.text_to_speech_with_voice(text, voice_type)
+    synthesis_peak = tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.reset_peak()
+    uploaded = _simulate_upload(audio_data)
+    upload_peak = tracemalloc.get_traced_memory()[1] - baseline
+    return uploaded, synthesis_peak, upload_peak
+
+
+def _prerendered_backend():
+    """Offline backend that streams pre-rendered audio in 4 KB frames, like the Edge TTS websocket"""
+    from tts_backends import OfflineTTSBackend
+
+    class PrerenderedBackend(OfflineTTSBackend):
+        def __init__(self):
+            super().__init__(first_byte_seconds=0, seconds_per_100_chars=0, jitter=0)
+            self._rendered = {}
+
+        def prerender(self, text, voice):
+            self._rendered[(text, voice)] = self.render(text, voice)
+
+        async def stream(self, text, voice):
+            audio = self._rendered.get((text, voice)) or self.render(text, voice)
+            view = memoryview(audio)
+            for offset in range(0, len(audio), 4096):
+                yield bytes(view[offset:offset + 4096])  # Each websocket frame is a fresh bytes object
+                await asyncio.sleep(0)
+
+    return PrerenderedBackend()
+
+
+def bench_buffers():
+    """Peak traced memory per request (synthesis + upload read) with a streaming offline backend"""
+    import tracemalloc
+    from audio_cache import AudioCache
+    from tts_backends import OfflineTTSBackend
+    from tts_service import TTSService, CHUNK_MAX_CHARS
+    from language_detector import segment_languages
+
+    cases = [
+        ('short', _repeat_to_length("Namaste, aaj ka mausam bahut accha hai. ", 300), 'male1'),
+        ('long', _repeat_to_length("Kal subah meeting hai, please samay par aana. ", 2400), 'male1'),
+        ('code-switched', _repeat_to_length("मैं आज office जा रहा हूँ. The meeting is at five, please join. ", 2400), 'female1'),
+    ]
+
+    async def run(cache_dir):
+        backend = _prerendered_backend()
+        service = TTSService(primary_backend=backend, fallback_backend=OfflineTTSBackend())
+        # Render every piece the service will request up front, outside the measurement
+        for _, text, voice_type in cases:
+            voice_config = service.voice_mapping[voice_type]
+            backend.prerender(text.strip(), voice_config['voice'])
+            for lang, span in segment_languages(text) or [('', text)]:
+                voice = service._get_optimized_voice(voice_config, lang, voice_type) if lang else voice_config['voice']
+                for chunk in service._split_pieces(text, CHUNK_MAX_CHARS) + service._split_pieces(span, CHUNK_MAX_CHARS):
+                    for candidate in (voice, voice_config['voice']):
+                        backend.prerender(chunk, candidate)
+        service.audio_cache = AudioCache(cache_dir=cache_dir, disk_budget_bytes=0)
+        service.fragment_cache = AudioCache(cache_dir=cache_dir, disk_budget_bytes=0)
+        results = []
+        tracemalloc.start()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                for name, text, voice_type in cases:
+                    size, synthesis_peak, upload_peak = await _measure_request_memory(service, text, voice_type)
+                    _, hit_synthesis_peak, hit_upload_peak = await _measure_request_memory(service, text, voice_type)
+                    results.append((name, size, synthesis_peak, upload_peak, max(hit_synthesis_peak, hit_upload_peak)))
+        finally:
+            tracemalloc.stop()
+        return results
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        results = asyncio.run(run(cache_dir))
+
+    # Peaks are relative to the traced memory before the request, as multiples of the audio size.
+    # The upload read holds the previous 512 KB part while reading the next one, like pyrogram's save_file.
+    print("\n🧠 Peak memory per request (tracemalloc, x audio size)")
+    print(f"{'case':<14} {'audio KB':>9} {'synthesis':>10} {'upload':>8} {'cache hit':>10}")
+    for name, size, synthesis_peak, upload_peak, hit_peak in results:
+        print(f"{name:<14} {size / 1024:>9.0f} {synthesis_peak / size:>10.2f} {upload_peak / size:>8.2f} {hit_peak / size:>10.2f}")
+
+
+class EdgeStandInServer:
+    """
+    Local WebSocket server speaking the Edge TTS protocol, for the connection pool
+
+    Answers each ssml request with turn.start, offline-rendered MP3 in 4 KB audio
+    messages and turn.end. handshake_seconds stands in for the TLS + WebSocket setup
+    of the real service; drop_after closes a connection after that many turns, like
+    the service dropping long-lived sockets.
+    """
+
+    def __init__(self, handshake_seconds: float = 0.15, first_byte_seconds: float = 0.05, drop_after: int = 0):
+        self.handshake_seconds = handshake_seconds
+        self.first_byte_seconds = first_byte_seconds
+        self.drop_after = drop_after
+        self.connections = 0
+        self.turns = 0
+        self._runner = None
+
+    async def start(self) -> str:
+        """Start listening on a free local port and return the ws:// URL"""
+        from aiohttp import web
+
+        app = web.Application()
+        app.router.add_get('/edge', self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        return f"ws://127.0.0.1:{port}/edge"
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    async def _handle(self, request):
+        import aiohttp
+        from aiohttp import web
+        from edge_pool import parse_text_message
+        from tts_backends import OfflineTTSBackend
+
+        await asyncio.sleep(self.handshake_seconds)
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.connections += 1
+        turns = 0
+        async for msg in ws:
+            if msg.type != aiohttp.WSMsgType.TEXT:
+                continue
+            headers = parse_text_message(msg.data)
+            if headers.get('Path') != 'ssml':
+                continue
+            request_id = headers['X-RequestId']
+            ssml = msg.data.split('\r\n\r\n', 1)[1]
+            voice = re.search(r"<voice name='([^']+)'>", ssml).group(1)
+            text = re.sub(r'<[^>]+>', '', ssml)
+
+            await ws.send_str(f"X-RequestId:{request_id}\r\nContent-Type:application/json; charset=utf-8\r\nPath:turn.start\r\n\r\n{{}}")
+            await asyncio.sleep(self.first_byte_seconds)
+            audio = OfflineTTSBackend.render(text, voice)
+            header = f"X-RequestId:{request_id}\r\nContent-Type:audio/mpeg\r\nPath:audio\r\n".encode('ascii')
+            for offset in range(0, len(audio), 4096):
+                await ws.send_bytes(len(header).to_bytes(2, 'big') + header + audio[offset:offset + 4096])
+            await ws.send_str(f"X-RequestId:{request_id}\r\nContent-Type:application/json; charset=utf-8\r\nPath:turn.end\r\n\r\n{{}}")
+
+            turns += 1
+            self.turns += 1
+            if self.drop_after and turns >= self.drop_after:
+                await ws.close()
+                break
+        return ws
+
+
+async def _run_edge_pool(pool_size, requests: int, concurrency: int, drop_after: int = 0) -> tuple:
+    from edge_pool import EdgeConnectionPool, EDGE_POOL_SIZE
+
+    server = EdgeStandInServer(drop_after=drop_after)
+    url = await server.start()
+    pool = EdgeConnectionPool(url=url, size=EDGE_POOL_SIZE if pool_size is None else pool_size)
+    texts = [f"Namaste {index}, aaj ka mausam bahut accha hai." for index in range(requests)]
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def request(text):
+        async with semaphore:
+            start = time.perf_counter()
+            audio = b"".join([chunk async for chunk in pool.stream(text, 'hi-IN-MadhurNeural')])
+            latencies.append(time.perf_counter() - start)
+            assert audio
+
+    try:
+        await asyncio.gather(*(request(text) for text in texts))
+    finally:
+        await pool.close()
+        await server.stop()
+    return latencies, pool.get_stats(), server.connections
+
+
+def bench_edge_pool(requests: int = 40):
+    """Short-text latency with a fresh WebSocket per request vs the warm connection pool (local stand-in server)"""
+    print(f"\n🔌 Edge TTS connection pool: {requests} short requests, stand-in server with 150ms handshake")
+    print(f"{'mode':<26} {'p50 ms':>8} {'p95 ms':>8} {'connections':>12} {'reuse %':>8}")
+    for label, pool_size, concurrency, drop_after in (
+        ("fresh, sequential", 0, 1, 0),
+        ("pooled, sequential", None, 1, 0),
+        ("fresh, 8 concurrent", 0, 8, 0),
+        ("pooled, 8 concurrent", None, 8, 0),
+        ("pooled, server drops /3", None, 1, 3),
+    ):
+        with contextlib.redirect_stdout(io.StringIO()):  # The pool logs every stale-connection retry
+            latencies, stats, connections = asyncio.run(_run_edge_pool(pool_size, requests, concurrency, drop_after))
+        print(f"{label:<26} {_percentile(latencies, 50) * 1000:>8.0f} {_percentile(latencies, 95) * 1000:>8.0f} "
+              f"{connections:>12} {stats['reuse_rate']:>8.1f}"
+              + (f"   stale retries {stats['stale_retries']}" if stats['stale_retries'] else ""))
+
+
+async def _run_warmup(warm: bool, users: int, think_seconds: float, gap_seconds: float) -> tuple:
+    from audio_cache import AudioCache
+    from edge_pool import EdgeConnectionPool
+    from tts_backends import EdgeTTSBackend, OfflineTTSBackend
+    from tts_service import TTSService
+
+    server = EdgeStandInServer()
+    url = await server.start()
+    # Idle connections expire between users, as on a quiet bot (real idle expiry is 45s)
+    backend = EdgeTTSBackend(EdgeConnectionPool(url=url, max_idle=think_seconds / 4))
+    service = TTSService(primary_backend=backend, fallback_backend=OfflineTTSBackend())
+    service.audio_cache = AudioCache(disk_budget_bytes=0)
+    latencies = []
+
+    async def user(user_id):
+        await asyncio.sleep(user_id * gap_seconds)
+        if warm:
+            service.warm_up(user_id, 'male1')  # voice_* callback
+        await asyncio.sleep(think_seconds)  # User types the text
+        service.end_warm_up(user_id)  # handle_text
+        start = time.perf_counter()
+        audio_data = await service.text_to_speech_with_voice(f"User {user_id}: kal subah meeting hai.", 'male1')
+        latencies.append(time.perf_counter() - start)
+        assert audio_data
+
+    try:
+        await asyncio.gather(*(user(user_id) for user_id in range(users)))
+    finally:
+        await backend.close()
+        await server.stop()
+    return latencies, backend.pool.get_stats()
+
+
+def bench_warmup(users: int = 10, think_seconds: float = 0.3, gap_seconds: float = 0.5):
+    """Latency of the request after a voice pick, with and without speculative connection warm-up"""
+    print(f"\n🔥 Speculative warm-up: {users} users pick a voice, type for {think_seconds * 1000:.0f}ms, "
+          "stand-in server with 150ms handshake, idle connections expired between users")
+    print(f"{'mode':<12} {'p50 ms':>8} {'p95 ms':>8} {'opened':>7} {'warm used':>10}")
+    for label, warm in (("no warm-up", False), ("warm-up", True)):
+        with contextlib.redirect_stdout(io.StringIO()):
+            latencies, stats = asyncio.run(_run_warmup(warm, users, think_seconds, gap_seconds))
+        print(f"{label:<12} {_percentile(latencies, 50) * 1000:>8.0f} {_percentile(latencies, 95) * 1000:>8.0f} "
+              f"{stats['opened']:>7} {stats['warm_used']:>10}")
+
+
+async def _run_fragments(script: list, edited_line: int, first_byte_seconds: float, cache_dir: str) -> list:
+    from audio_cache import AudioCache
+    from tts_backends import OfflineTTSBackend
+    from tts_service import TTSService
+
+    backend = OfflineTTSBackend(first_byte_seconds=first_byte_seconds, jitter=0)
+    service = TTSService(primary_backend=backend, fallback_backend=OfflineTTSBackend())
+    service.audio_cache = AudioCache(cache_dir=os.path.join(cache_dir, 'whole'))
+    service.fragment_cache = AudioCache(cache_dir=os.path.join(cache_dir, 'fragments'))
+
+    edited = list(script)
+    edited[edited_line] = edited[edited_line].replace("aaj", "kal")
+    results = []
+    for label, lines in (("original", script), ("one line edited", edited)):
+        requests_before, bytes_before = backend.stats['requests'], backend.stats['bytes']
+        start = time.perf_counter()
+        audio_data = await service.text_to_speech_with_voice(" ".join(lines), 'male1')
+        elapsed = time.perf_counter() - start
+        results.append((label, elapsed, backend.stats['requests'] - requests_before,
+                        backend.stats['bytes'] - bytes_before, audio_data.nbytes))
+    return results
+
+
+def bench_fragments(sentences: int = 30, first_byte_seconds: float = 0.05):
+    """Resubmitting a script with one edited sentence: packed chunks vs the sentence fragment cache"""
+    import tts_service
+
+    script = [f"Line {index + 1}: aaj ki meeting mein hum project ke agle kadam par baat karenge." for index in range(sentences)]
+    print(f"\n🧩 Sentence fragments: {sentences}-sentence script, then line 12 edited "
+          f"(offline backend, {first_byte_seconds * 1000:.0f}ms first byte as on a pooled connection)")
+    print(f"{'mode':<11} {'request':<16} {'seconds':>8} {'requests':>9} {'synth KB':>9} {'audio KB':>9}")
+    enabled = tts_service.FRAGMENT_CACHE_ENABLED
+    try:
+        for mode, fragments in (("packed", False), ("fragments", True)):
+            tts_service.FRAGMENT_CACHE_ENABLED = fragments
+            with tempfile.TemporaryDirectory() as cache_dir, contextlib.redirect_stdout(io.StringIO()):
+                results = asyncio.run(_run_fragments(script, 11, first_byte_seconds, cache_dir))
+            for label, elapsed, requests, synthesized, size in results:
+                print(f"{mode:<11} {label:<16} {elapsed:>8.2f} {requests:>9} {synthesized / 1024:>9.0f} {size / 1024:>9.0f}")
+    finally:
+        tts_service.FRAGMENT_CACHE_ENABLED = enabled
+
+
+def _pydub_join(parts: list) -> bytes:
+    """Decode every part, concatenate the PCM and encode again (what a pydub-based join costs)"""
+    from pydub import AudioSegment
+
+    joined = sum((AudioSegment.from_file(io.BytesIO(part), format="mp3") for part in parts[1:]),
+                 AudioSegment.from_file(io.BytesIO(parts[0]), format="mp3"))
+    output = io.BytesIO()
+    joined.export(output, format="mp3", bitrate="48k")
+    return output.getvalue()
+
+
+def bench_mp3_join(parts: int = 30):
+    """Joining sentence fragments: byte concatenation vs the MP3 frame joiner vs a pydub decode / re-encode"""
+    import shutil
+    from audio_buffer import AudioBuffer
+    from mp3_frames import mp3_duration
+    from tts_backends import OfflineTTSBackend
+
+    fragments = [OfflineTTSBackend.render(f"Line {index + 1}: aaj ki meeting mein hum project ke agle kadam par baat karenge.", "hi-IN-MadhurNeural")
+                 for index in range(parts)]
+    expected = sum(mp3_duration(fragment) for fragment in fragments)
+    print(f"\n🔗 MP3 join: {parts} fragments, {expected:.1f}s of 24 kHz / 48 kbps audio")
+    print(f"{'method':<20} {'ms/join':>9} {'ms per min audio':>17} {'KB':>7} {'duration s':>11}")
+
+    methods = [
+        ("bytes concat", lambda: b"".join(fragments)),
+        ("frame joiner", lambda: AudioBuffer.join(fragments).getvalue()),
+        ("frame joiner +48ms", lambda: AudioBuffer.join(fragments, gap_ms=48).getvalue()),
+    ]
+    if shutil.which("ffmpeg"):
+        methods.append(("pydub round-trip", lambda: _pydub_join(fragments)))
+    for label, join in methods:
+        calls = 0
+        start = time.perf_counter()
+        while calls < 3 or time.perf_counter() - start < 0.3:
+            joined = join()
+            calls += 1
+        seconds = (time.perf_counter() - start) / calls
+        print(f"{label:<20} {seconds * 1000:>9.2f} {seconds * 1000 / expected * 60:>17.2f} {len(joined) / 1024:>7.0f} {mp3_duration(joined):>11.2f}")
+    if not shutil.which("ffmpeg"):
+        print("pydub round-trip     skipped (ffmpeg not found)")
+
+
+class GTTSStandInServer:
+    """
+    Local HTTP server answering gTTS batchexecute posts, for the token fetcher
+
+    Each post gets offline-rendered MP3 for its token after latency_seconds (with seeded
+    jitter, so concurrent tokens finish out of order). The first request on a new
+    connection also waits handshake_seconds, standing in for the TLS setup that keep-alive saves.
+    """
+
+    def __init__(self, latency_seconds: float = 0.12, handshake_seconds: float = 0.08, jitter: float = 0.5, seed: int = 7):
+        import random
+        import weakref
+
+        self.latency_seconds = latency_seconds
+        self.handshake_seconds = handshake_seconds
+        self.jitter = jitter
+        self.connections = 0
+        self.posts = 0
+        self.peak_concurrent = 0
+        self._concurrent = 0
+        self._transports = weakref.WeakSet()
+        self._random = random.Random(seed)
+        self._runner = None
+
+    async def start(self) -> str:
+        """Start listening on a free local port and return the batchexecute URL"""
+        from aiohttp import web
+
+        app = web.Application()
+        app.router.add_post('/batchexecute', self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}/batchexecute"
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    async def _handle(self, request):
+        import json
+        import base64
+        from aiohttp import web
+        from tts_backends import OfflineTTSBackend
+
+        self.posts += 1
+        self._concurrent += 1
+        self.peak_concurrent = max(self.peak_concurrent, self._concurrent)
+        try:
+            if request.transport not in self._transports:
+                self._transports.add(request.transport)
+                self.connections += 1
+                await asyncio.sleep(self.handshake_seconds)
+            rpc = json.loads((await request.post())['f.req'])
+            text, lang = json.loads(rpc[0][0][1])[:2]
+            await asyncio.sleep(self.latency_seconds * (1 + self._random.uniform(-self.jitter, self.jitter)))
+            audio = base64.b64encode(OfflineTTSBackend.render(text, lang)).decode('ascii')
+            line = json.dumps([["wrb.fr", "jQ1olc", f'["{audio}"]', None, None, None, "generic"]], separators=(',', ':'))
+            return web.Response(text=f")]}}'\n\n{len(line)}\n{line}\n", content_type='application/json')
+        finally:
+            self._concurrent -= 1
+
+
+async def _run_gtts(mode: str, text: str, requests: int) -> tuple:
+    from unittest import mock
+    from mp3_frames import scan_frames
+    from gtts_fetcher import GTTSTokenFetcher
+    from tts_backends import GTTSBackend
+
+    server = GTTSStandInServer()
+    url = await server.start()
+    if mode == 'library':
+        with mock.patch('gtts_fetcher.GTTS_CONCURRENCY', 0):  # GTTS_CONCURRENCY=0
+            backend = GTTSBackend()
+    else:
+        backend = GTTSBackend(fetcher=GTTSTokenFetcher(url=url, concurrency=int(mode)))
+    latencies = []
+
+    async def request():
+        start = time.perf_counter()
+        audio = await backend.synthesize(text, 'hi')
+        latencies.append(time.perf_counter() - start)
+        return audio
+
+    try:
+        # gTTS posts to Google Translate; point the library path at the stand-in instead
+        with mock.patch('gtts.tts._translate_url', return_value=url):
+            results = await asyncio.gather(*(request() for _ in range(requests)))
+    finally:
+        await backend.close()
+        await server.stop()
+    # Token audio in token order, without the joiner's duration header
+    audio = results[0]
+    scan = scan_frames(audio)
+    frames = b"".join(audio[start:end] for start, end in scan.runs)
+    return latencies, frames, server
+
+
+def bench_gtts(chars: int = 1500, requests: int = 4):
+    """gTTS fallback: the library's sequential token fetch vs concurrent tokens over a pooled session (local stand-in server)"""
+    from gtts_fetcher import GTTSTokenFetcher
+
+    text = _repeat_to_length("Aaj subah office mein meeting thi, jisme naye project ke baare mein baat hui. ", chars)
+    tokens = len(GTTSTokenFetcher.request_bodies(text, 'hi'))
+    print(f"\n🌐 gTTS fallback: {chars} chars = {tokens} tokens, {requests} requests at once, "
+          "stand-in server with 120ms per token and 80ms connection setup")
+    print(f"{'mode':<24} {'p50 ms':>8} {'max ms':>8} {'connections':>12} {'peak posts':>11} {'order':>6}")
+    expected = None
+    for label, mode in (("gTTS library", 'library'), ("fetcher, 1 at a time", '1'), ("fetcher, 6 at a time", '6')):
+        with contextlib.redirect_stdout(io.StringIO()):  # The fetcher logs every request
+            latencies, frames, server = asyncio.run(_run_gtts(mode, text, requests))
+        if expected is None:
+            expected = frames  # The library concatenates the tokens in order
+        print(f"{label:<24} {_percentile(latencies, 50) * 1000:>8.0f} {max(latencies) * 1000:>8.0f} "
+              f"{server.connections:>12} {server.peak_concurrent:>11} {'ok' if frames == expected else 'WRONG':>6}")
+
+
+class _ConcurrencyProbe:
+    """Offline backend wrapper counting requests in flight at once"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.in_flight = 0
+        self.peak = 0
+        self.requests = 0
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
+
+    async def stream(self, text, voice):
+        self.requests += 1
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            async for chunk in self.backend.stream(text, voice):
+                yield chunk
+        finally:
+            self.in_flight -= 1
+
+
+async def _run_bulk(lines: int, concurrency: int, user_limit) -> tuple:
+    from audio_cache import AudioCache
+    from bulk_tts import run_bulk_tts
+    from tts_backends import OfflineTTSBackend
+    from tts_scheduler import TTSScheduler
+    from tts_service import TTSService
+
+    primary = _ConcurrencyProbe(OfflineTTSBackend(first_byte_seconds=0.1, jitter=0, failure_rate=0))
+    service = TTSService(primary_backend=primary, fallback_backend=OfflineTTSBackend(failure_rate=0))
+    service.audio_cache = AudioCache(disk_budget_bytes=0)
+    service.fragment_cache = AudioCache(disk_budget_bytes=0)
+    scheduler = TTSScheduler(per_user_limit=1)  # The production default
+    voice = list(service.voice_mapping)[0]
+
+    async def synthesize_line(text):
+        async with scheduler.slot(1, user_limit=user_limit):
+            return await service.text_to_speech_with_voice(text, voice)
+
+    batch = [f"Line {index}: kal subah meeting hai, please samay par aana." for index in range(lines)]
+    start = time.perf_counter()
+    results = await run_bulk_tts(batch, synthesize_line, concurrency=concurrency)
+    elapsed = time.perf_counter() - start
+    return elapsed, sum(1 for result in results if result.audio), primary.peak
+
+
+def bench_bulk(lines: int = 40):
+    """Bulk batch wall time under the default per-user limit of 1, with and without the batch allowance"""
+    from bulk_tts import BULK_CONCURRENCY
+
+    print(f"\n📦 Bulk TTS: {lines} lines, offline backend with 100ms first byte, TTS_PER_USER_LIMIT=1")
+    print(f"{'mode':<34} {'wall s':>7} {'lines/s':>8} {'peak parallel':>14} {'audio':>6}")
+    for label, concurrency, user_limit in (
+        ("concurrency 1", 1, 1),
+        (f"concurrency {BULK_CONCURRENCY}, per-user limit only", BULK_CONCURRENCY, None),
+        (f"concurrency {BULK_CONCURRENCY}, batch allowance", BULK_CONCURRENCY, BULK_CONCURRENCY),
+    ):
+        with contextlib.redirect_stdout(io.StringIO()):  # TTSService logs every request
+            elapsed, produced, peak = asyncio.run(_run_bulk(lines, concurrency, user_limit))
+        print(f"{label:<34} {elapsed:>7.2f} {lines / elapsed:>8.1f} {peak:>14} {produced:>6}")
+
+
+BENCHMARKS = {
+    'language': bench_language,
+    'pipeline': bench_pipeline,
+    'buffers': bench_buffers,
+    'edge_pool': bench_edge_pool,
+    'warmup': bench_warmup,
+    'fragments': bench_fragments,
+    'mp3_join': bench_mp3_join,
+    'gtts': bench_gtts,
+    'bulk': bench_bulk,
+}
+
+
+def main():
+    selected = sys.argv[1:] or list(BENCHMARKS)
+    for name in selected:
+        if name not in BENCHMARKS:
+            print(f"Unknown benchmark: {name} (available: {', '.join(BENCHMARKS)})")
+            sys.exit(1)
+        BENCHMARKS[name]()
+
+
+if __name__ == "__main__":
+    main()
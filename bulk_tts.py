@@ -0,0 +1,240 @@
+"""
+Bulk TTS for TTS Bot
+Turns an uploaded .txt/.csv of prompts into ZIPs of audio files, each under Telegram's upload limit
+"""
+
+import os
+import re
+import csv
+import time
+import asyncio
+import zipfile
+import tempfile
+from io import BytesIO, StringIO
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from audio_buffer import SPILL_BYTES
+from structured_logging import get_logger
+
+logger = get_logger(__name__)
+
+BULK_EXTENSIONS = ('.txt', '.csv')
+BULK_MAX_FILE_BYTES = int(os.getenv('BULK_MAX_FILE_KB', '512')) * 1024
+BULK_MAX_LINES = int(os.getenv('BULK_MAX_LINES', '500'))
+BULK_MAX_LINE_CHARS = 3000  # Same limit as a single TTS message
+BULK_CONCURRENCY = int(os.getenv('BULK_CONCURRENCY', '4'))
+# Bots can upload documents up to 50 MB; one archive stays below this (headroom for estimate errors)
+BULK_MAX_ARCHIVE_BYTES = int(os.getenv('BULK_MAX_ARCHIVE_MB', '45')) * 1024 * 1024
+# Expected MP3 size per character of text: 48 kbps audio (6 KB/s) at ~15 spoken characters per second
+BULK_AUDIO_BYTES_PER_CHAR = 400
+# Local header and central directory record of one archive entry (plus its file name)
+ZIP_ENTRY_OVERHEAD = 200
+# Minimum seconds between progress message edits (Telegram rate-limits edits)
+BULK_PROGRESS_INTERVAL = float(os.getenv('BULK_PROGRESS_INTERVAL', '2'))
+
+# Header names recognised as the text column of a CSV file
+CSV_TEXT_COLUMNS = ('text', 'prompt', 'line', 'content')
+
+_FILENAME_UNSAFE_RE = re.compile(r'[^\w\-]+', re.UNICODE)
+
+
+class BulkInputError(Exception):
+    """Raised when an uploaded batch file cannot be used (message is shown to the user)"""
+
+
+def is_bulk_file(file_name: Optional[str]) -> bool:
+    return bool(file_name) and file_name.lower().endswith(BULK_EXTENSIONS)
+
+
+def parse_bulk_lines(file_name: str, content: bytes) -> List[str]:
+    """
+    Extract prompts from an uploaded file
+
+    .txt: one prompt per non-empty line. .csv: the 'text'/'prompt' column if the
+    header has one, otherwise the first column.
+    """
+    if len(content) > BULK_MAX_FILE_BYTES:
+        raise BulkInputError(f"File bahut badi hai! Maximum {BULK_MAX_FILE_BYTES // 1024} KB allowed hai.")
+    try:
+        decoded = content.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        raise BulkInputError("File UTF-8 text honi chahiye.")
+
+    if file_name.lower().endswith('.csv'):
+        rows = [row for row in csv.reader(StringIO(decoded)) if row]
+        column = 0
+        if rows:
+            header = [cell.strip().lower() for cell in rows[0]]
+            for name in CSV_TEXT_COLUMNS:
+                if name in header:
+                    column = header.index(name)
+                    rows = rows[1:]
+                    break
+        lines = [row[column] if column < len(row) else '' for row in rows]
+    else:
+        lines = decoded.splitlines()
+
+    lines = [line.strip() for line in lines if line.strip()]
+    if not lines:
+        raise BulkInputError("File me koi text line nahi mili.")
+    if len(lines) > BULK_MAX_LINES:
+        raise BulkInputError(f"Bahut saari lines hai! Maximum {BULK_MAX_LINES} lines allowed hai (file me {len(lines)} hai).")
+    too_long = [index + 1 for index, line in enumerate(lines) if len(line) > BULK_MAX_LINE_CHARS]
+    if too_long:
+        raise BulkInputError(f"Line {too_long[0]} bahut lambi hai! Har line maximum {BULK_MAX_LINE_CHARS} characters ki ho sakti hai.")
+    return lines
+
+
+def audio_file_name(index: int, text: str, total: int) -> str:
+    """Stable, sortable archive name: zero-padded line number plus a short slug of the text"""
+    slug = _FILENAME_UNSAFE_RE.sub('_', text[:30]).strip('_') or 'line'
+    return f"{index + 1:0{len(str(total))}d}_{slug}.mp3"
+
+
+def estimate_audio_bytes(text: str) -> int:
+    """Expected archive bytes of one line's audio"""
+    return len(text) * BULK_AUDIO_BYTES_PER_CHAR + ZIP_ENTRY_OVERHEAD
+
+
+def split_bulk_batches(lines: List[str], max_bytes: int = BULK_MAX_ARCHIVE_BYTES) -> List[range]:
+    """
+    Group consecutive lines so each group's estimated audio fits in one archive
+
+    Groups are synthesized, sent and dropped one after another, so only one archive's
+    worth of audio is held at a time.
+    """
+    batches = []
+    start = 0
+    size = 0
+    for index, line in enumerate(lines):
+        line_bytes = estimate_audio_bytes(line)
+        if index > start and size + line_bytes > max_bytes:
+            batches.append(range(start, index))
+            start, size = index, 0
+        size += line_bytes
+    batches.append(range(start, len(lines)))
+    return batches
+
+
+class BulkResult:
+    """Outcome of one batch line"""
+    __slots__ = ('index', 'text', 'audio', 'error')
+
+    def __init__(self, index: int, text: str):
+        self.index = index
+        self.text = text
+        self.audio: Optional[bytes] = None
+        self.error: Optional[str] = None
+
+
+async def run_bulk_tts(
+    lines: List[str],
+    synthesize: Callable[[str], Awaitable[Optional[BytesIO]]],
+    on_progress: Optional[Callable[[int, int, int], Awaitable[None]]] = None,
+    concurrency: int = BULK_CONCURRENCY,
+    start: int = 0
+) -> List[BulkResult]:
+    """
+    Synthesize every line with at most `concurrency` requests in flight
+
+    Lines go through the same synthesize call as single messages, so repeated lines
+    (within the batch or across batches) are served by the audio cache and coalescing;
+    synthesize is expected to take its own scheduler slot with user_limit=concurrency (under
+    the per-user limit alone the lines would run one at a time). Results are numbered from
+    start (the group's first line in the file). on_progress(done, failed, total) is
+    awaited at most every BULK_PROGRESS_INTERVAL seconds and once at the end.
+    """
+    results = [BulkResult(start + offset, text) for offset, text in enumerate(lines)]
+    queue: asyncio.Queue = asyncio.Queue()
+    for result in results:
+        queue.put_nowait(result)
+
+    done = 0
+    failed = 0
+    last_progress = time.monotonic()
+
+    async def report(final: bool = False):
+        nonlocal last_progress
+        if on_progress is None:
+            return
+        now = time.monotonic()
+        if not final and now - last_progress < BULK_PROGRESS_INTERVAL:
+            return
+        last_progress = now
+        try:
+            await on_progress(done, failed, len(results))
+        except Exception as e:
+            logger.debug("bulk_progress_update_failed", error=str(e))
+
+    async def worker():
+        nonlocal done, failed
+        while True:
+            try:
+                result = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            try:
+                audio_data = await synthesize(result.text)
+                if audio_data:
+                    result.audio = audio_data.getvalue()
+                else:
+                    result.error = "no audio generated"
+            except Exception as e:
+                result.error = str(e) or type(e).__name__
+            if result.error:
+                failed += 1
+                logger.warning("bulk_line_failed", line=result.index + 1, error=result.error)
+            done += 1
+            await report()
+
+    workers = [asyncio.create_task(worker()) for _ in range(max(1, min(concurrency, len(results))))]
+    try:
+        await asyncio.gather(*workers)
+    except BaseException:
+        for task in workers:
+            task.cancel()
+        raise
+    await report(final=True)
+    return results
+
+
+def _write_archive(results: List[BulkResult], total: int):
+    """One ZIP (stored, MP3 is already compressed) with a manifest.csv of its lines, in a spooled temp file"""
+    archive = tempfile.SpooledTemporaryFile(max_size=SPILL_BYTES)
+    manifest = StringIO()
+    writer = csv.writer(manifest)
+    writer.writerow(['line', 'file', 'status', 'text'])
+
+    with zipfile.ZipFile(archive, 'w', compression=zipfile.ZIP_STORED) as zip_file:
+        for result in results:
+            if result.audio:
+                name = audio_file_name(result.index, result.text, total)
+                zip_file.writestr(name, result.audio)
+                writer.writerow([result.index + 1, name, 'ok', result.text])
+            else:
+                writer.writerow([result.index + 1, '', f"failed: {result.error}", result.text])
+        zip_file.writestr('manifest.csv', manifest.getvalue().encode('utf-8-sig'))
+
+    archive.seek(0)
+    return archive
+
+
+def build_bulk_archives(results: List[BulkResult], total: int, max_bytes: int = BULK_MAX_ARCHIVE_BYTES) -> List[Tuple]:
+    """
+    ZIP the generated audio into as few archives as fit under max_bytes each (blocking: run on the file-io pool)
+
+    Groups from split_bulk_batches() normally fit in one archive; this packs by the
+    actual audio sizes, so an estimate that was too low still yields uploadable files.
+    Returns (archive, results in it) pairs. Archives are spooled temporary files (moved
+    to disk beyond AUDIO_SPILL_MB); the caller closes them after sending.
+    """
+    groups = [[]]
+    size = 0
+    for result in results:
+        entry_bytes = len(result.audio) + ZIP_ENTRY_OVERHEAD if result.audio else 0
+        if groups[-1] and size + entry_bytes > max_bytes:
+            groups.append([])
+            size = 0
+        groups[-1].append(result)
+        size += entry_bytes
+    return [(_write_archive(group, total), group) for group in groups]
@@ -8,6 +8,9 @@ from datetime import datetime
 from sqlalchemy import create_engine, Column, Integer, BigInteger, Float, String, DateTime, Boolean
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
+from structured_logging import get_logger
+
+logger = get_logger(__name__)
 
 # Create separate database for credit history
 DATABASE_URL = "sqlite:///credit_history.db"
@@ -56,7 +59,7 @@ class UserCreditSummary(Base):
 def create_credit_history_tables():
     """Create credit history database tables"""
     Base.metadata.create_all(bind=engine)
-    print("✅ Credit history database tables created successfully!")
+    logger.info("credit_history_tables_created")
 
 def get_credit_history_db() -> Session:
     """Get credit history database session"""
@@ -120,10 +123,10 @@ def log_credit_history(user_id: int, amount: float, transaction_type: str, sourc
                 summary.spent_tts += abs(amount)
         
         db.commit()
-        print(f"✅ Credit history logged: User {user_id}, Amount {amount}, Type {transaction_type}")
+        logger.debug("credit_history_logged", user_id=user_id, amount=amount, transaction_type=transaction_type)
         
     except Exception as e:
-        print(f"❌ Error logging credit history: {e}")
+        logger.error("credit_history_log_error", user_id=user_id, error=str(e))
         db.rollback()
     finally:
         db.close()
@@ -137,7 +140,7 @@ def get_user_credit_history(user_id: int, limit: int = 50):
         ).order_by(CreditHistory.timestamp.desc()).limit(limit).all()
         return history
     except Exception as e:
-        print(f"❌ Error getting credit history: {e}")
+        logger.error("credit_history_read_error", user_id=user_id, error=str(e))
         return []
     finally:
         db.close()
@@ -149,7 +152,7 @@ def get_user_credit_summary(user_id: int):
         summary = db.query(UserCreditSummary).filter(UserCreditSummary.user_id == user_id).first()
         return summary
     except Exception as e:
-        print(f"❌ Error getting credit summary: {e}")
+        logger.error("credit_summary_read_error", user_id=user_id, error=str(e))
         return None
     finally:
         db.close()
@@ -161,7 +164,7 @@ def get_all_users_credit_stats():
         stats = db.query(UserCreditSummary).all()
         return stats
     except Exception as e:
-        print(f"❌ Error getting all users credit stats: {e}")
+        logger.error("credit_stats_read_error", error=str(e))
         return []
     finally:
         db.close()
@@ -1,10 +1,12 @@
 import os
-from sqlalchemy import create_engine, Column, Integer, String, Boolean, DateTime, Float, BigInteger
+from sqlalchemy import create_engine, Column, Integer, String, Boolean, DateTime, Float, BigInteger, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from datetime import datetime
+from datetime import datetime, timedelta
 
 DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///./bot.db')
+# Telegram file_ids older than this are treated as stale and re-uploaded
+FILE_ID_MAX_AGE_DAYS = int(os.getenv('FILE_ID_MAX_AGE_DAYS', '30'))
 
 # Add connection pooling and retry logic for better stability
 if DATABASE_URL.startswith('sqlite'):
@@ -181,6 +183,64 @@ class MessageTracking(Base):
     related_message_id = Column(BigInteger, nullable=True)  # For linking related messages (user input -> bot response)
     context = Column(String, nullable=True)  # Additional context about the message
 
+class UserPreference(Base):
+    __tablename__ = "user_preferences"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(BigInteger, unique=True, index=True)
+    audio_format = Column(String, default='audio')  # 'audio' (MP3 file) or 'voice' (OGG/Opus voice note)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+class AudioFileCache(Base):
+    __tablename__ = "audio_file_cache"
+    __table_args__ = (UniqueConstraint('voice', 'text_hash', 'audio_format', name='uq_audio_file_cache_key'),)
+    
+    id = Column(Integer, primary_key=True, index=True)
+    voice = Column(String, index=True)  # Edge TTS voice id, e.g. 'hi-IN-MadhurNeural'
+    text_hash = Column(String(64), index=True)  # sha256 of normalized text
+    audio_format = Column(String)  # 'audio' or 'voice'
+    file_id = Column(String)  # Telegram file_id returned by reply_audio / reply_voice
+    file_size = Column(Integer, nullable=True)
+    hits = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_used_at = Column(DateTime, default=datetime.utcnow)
+
+class TTSJob(Base):
+    __tablename__ = "tts_jobs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(BigInteger, index=True)
+    chat_id = Column(BigInteger)
+    voice_type = Column(String)
+    audio_format = Column(String, default='audio')  # 'audio' or 'voice'
+    title = Column(String, nullable=True)  # Source file name, if uploaded as a document
+    status = Column(String, index=True, default='pending')  # 'pending', 'running', 'paused', 'completed', 'failed', 'cancelled'
+    total_chunks = Column(Integer, default=0)
+    completed_chunks = Column(Integer, default=0)
+    total_chars = Column(Integer, default=0)
+    credits_charged = Column(Float, default=0.0)
+    is_free = Column(Boolean, default=False)  # Owner jobs are not billed
+    status_message_id = Column(BigInteger, nullable=True)  # Progress message edited by the worker
+    error = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+    completed_at = Column(DateTime, nullable=True)
+
+class TTSJobChunk(Base):
+    __tablename__ = "tts_job_chunks"
+    __table_args__ = (UniqueConstraint('job_id', 'chunk_index', name='uq_tts_job_chunk'),)
+    
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(Integer, index=True)
+    chunk_index = Column(Integer)  # 0-based delivery order
+    text = Column(String)
+    status = Column(String, default='pending')  # 'pending', 'delivered', 'failed'
+    credits = Column(Float, default=0.0)  # Billed when the chunk is delivered
+    attempts = Column(Integer, default=0)
+    file_id = Column(String, nullable=True)  # Telegram file_id of the delivered part
+    error = Column(String, nullable=True)
+    completed_at = Column(DateTime, nullable=True)
+
 def get_setting(setting_name: str, default=0.0):
     """Get bot setting value with enhanced error handling"""
     # Input validation
@@ -252,6 +312,165 @@ def update_setting(setting_name: str, value: float, description: str = None):
             except Exception as close_error:
                 print(f"Error closing database in update_setting: {close_error}")
 
+def get_audio_format(user_id: int, default: str = 'audio') -> str:
+    """Get a user's preferred TTS delivery format ('audio' or 'voice')"""
+    db = None
+    try:
+        db = SessionLocal()
+        preference = db.query(UserPreference).filter(UserPreference.user_id == user_id).first()
+        if preference and preference.audio_format:
+            return preference.audio_format
+        return default
+    except Exception as e:
+        print(f"Error getting audio format for user {user_id}: {e}")
+        return default
+    finally:
+        if db:
+            try:
+                db.close()
+            except Exception as close_error:
+                print(f"Error closing database in get_audio_format: {close_error}")
+
+def set_audio_format(user_id: int, audio_format: str) -> bool:
+    """Set a user's preferred TTS delivery format ('audio' or 'voice')"""
+    if audio_format not in ('audio', 'voice'):
+        print(f"Invalid audio format: {audio_format}")
+        return False
+    
+    db = None
+    try:
+        db = SessionLocal()
+        preference = db.query(UserPreference).filter(UserPreference.user_id == user_id).first()
+        if preference:
+            preference.audio_format = audio_format
+            preference.updated_at = datetime.utcnow()
+        else:
+            db.add(UserPreference(user_id=user_id, audio_format=audio_format))
+        db.commit()
+        return True
+    except Exception as e:
+        print(f"Error setting audio format for user {user_id}: {e}")
+        if db:
+            try:
+                db.rollback()
+            except Exception as rollback_error:
+                print(f"Error during rollback in set_audio_format: {rollback_error}")
+        return False
+    finally:
+        if db:
+            try:
+                db.close()
+            except Exception as close_error:
+                print(f"Error closing database in set_audio_format: {close_error}")
+
+def get_cached_file_id(voice: str, text_hash: str, audio_format: str):
+    """Get a previously uploaded Telegram file_id for (voice, text hash, format), or None"""
+    db = None
+    try:
+        db = SessionLocal()
+        entry = db.query(AudioFileCache).filter(
+            AudioFileCache.voice == voice,
+            AudioFileCache.text_hash == text_hash,
+            AudioFileCache.audio_format == audio_format
+        ).first()
+        if not entry:
+            return None
+        
+        if entry.created_at and entry.created_at < datetime.utcnow() - timedelta(days=FILE_ID_MAX_AGE_DAYS):
+            # Stale entry - drop it so the audio is uploaded fresh
+            db.delete(entry)
+            db.commit()
+            return None
+        
+        entry.hits = (entry.hits or 0) + 1
+        entry.last_used_at = datetime.utcnow()
+        db.commit()
+        return entry.file_id
+    except Exception as e:
+        print(f"Error getting cached file_id for voice {voice}: {e}")
+        if db:
+            try:
+                db.rollback()
+            except Exception as rollback_error:
+                print(f"Error during rollback in get_cached_file_id: {rollback_error}")
+        return None
+    finally:
+        if db:
+            try:
+                db.close()
+            except Exception as close_error:
+                print(f"Error closing database in get_cached_file_id: {close_error}")
+
+def store_cached_file_id(voice: str, text_hash: str, audio_format: str, file_id: str, file_size: int = None) -> bool:
+    """Remember the Telegram file_id of uploaded audio for (voice, text hash, format)"""
+    if not file_id:
+        return False
+    
+    db = None
+    try:
+        db = SessionLocal()
+        entry = db.query(AudioFileCache).filter(
+            AudioFileCache.voice == voice,
+            AudioFileCache.text_hash == text_hash,
+            AudioFileCache.audio_format == audio_format
+        ).first()
+        if entry:
+            entry.file_id = file_id
+            entry.file_size = file_size
+            entry.created_at = datetime.utcnow()
+            entry.last_used_at = datetime.utcnow()
+        else:
+            db.add(AudioFileCache(
+                voice=voice,
+                text_hash=text_hash,
+                audio_format=audio_format,
+                file_id=file_id,
+                file_size=file_size
+            ))
+        db.commit()
+        return True
+    except Exception as e:
+        print(f"Error storing cached file_id for voice {voice}: {e}")
+        if db:
+            try:
+                db.rollback()
+            except Exception as rollback_error:
+                print(f"Error during rollback in store_cached_file_id: {rollback_error}")
+        return False
+    finally:
+        if db:
+            try:
+                db.close()
+            except Exception as close_error:
+                print(f"Error closing database in store_cached_file_id: {close_error}")
+
+def invalidate_cached_file_id(voice: str, text_hash: str, audio_format: str) -> bool:
+    """Forget a cached file_id (e.g. Telegram rejected it), forcing a fresh upload next time"""
+    db = None
+    try:
+        db = SessionLocal()
+        deleted = db.query(AudioFileCache).filter(
+            AudioFileCache.voice == voice,
+            AudioFileCache.text_hash == text_hash,
+            AudioFileCache.audio_format == audio_format
+        ).delete()
+        db.commit()
+        return deleted > 0
+    except Exception as e:
+        print(f"Error invalidating cached file_id for voice {voice}: {e}")
+        if db:
+            try:
+                db.rollback()
+            except Exception as rollback_error:
+                print(f"Error during rollback in invalidate_cached_file_id: {rollback_error}")
+        return False
+    finally:
+        if db:
+            try:
+                db.close()
+            except Exception as close_error:
+                print(f"Error closing database in invalidate_cached_file_id: {close_error}")
+
 def create_tables():
     """Create database tables only if needed and initialize default settings with error handling"""
     tables_created = False
@@ -273,7 +492,7 @@ def create_tables():
         existing_tables = inspector.get_table_names()
         
         # Check if our main tables exist
-        required_tables = ['users', 'tts_requests', 'bot_settings', 'bot_status', 'message_tracking']
+        required_tables = ['users', 'tts_requests', 'bot_settings', 'bot_status', 'message_tracking', 'user_preferences', 'audio_file_cache', 'tts_jobs', 'tts_job_chunks']
         missing_tables = [table for table in required_tables if table not in existing_tables]
         
         if missing_tables:
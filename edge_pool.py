@@ -0,0 +1,429 @@
+"""
+Edge TTS Connection Pool for TTS Bot
+Keeps Edge TTS WebSocket connections warm and reuses them across synthesis requests
+"""
+
+import os
+import ssl
+import time
+import uuid
+import asyncio
+from collections import deque
+from functools import lru_cache
+from xml.sax.saxutils import escape
+from typing import AsyncIterator, Deque, Dict, Optional, Tuple
+
+import aiohttp
+import certifi
+# Not part of edge_tts's public API: the edge-tts pin in requirements.txt has an upper bound for these
+from edge_tts.communicate import (
+    split_text_by_byte_length, remove_incompatible_characters, mkssml, ssml_headers_plus_data, date_to_string
+)
+from edge_tts.constants import WSS_URL, WSS_HEADERS, SEC_MS_GEC_VERSION
+from edge_tts.data_classes import TTSConfig
+from edge_tts.drm import DRM
+
+from structured_logging import get_logger
+
+logger = get_logger(__name__)
+
+# Idle connections kept open per pool (0 disables pooling: one connection per request, like edge_tts.Communicate)
+EDGE_POOL_SIZE = int(os.getenv('EDGE_TTS_POOL_SIZE', '8'))
+# Idle connections older than this are closed instead of reused
+EDGE_POOL_MAX_IDLE_SECONDS = float(os.getenv('EDGE_TTS_POOL_MAX_IDLE', '45'))
+# Synthesis turns served by one connection before it is retired
+EDGE_POOL_MAX_REQUESTS = int(os.getenv('EDGE_TTS_POOL_MAX_REQUESTS', '50'))
+# Connections idle at least this long are pinged before reuse
+EDGE_POOL_PING_AFTER_SECONDS = float(os.getenv('EDGE_TTS_POOL_PING_AFTER', '10'))
+EDGE_POOL_PING_TIMEOUT = 2.0
+EDGE_CONNECT_TIMEOUT = 10
+EDGE_RECEIVE_TIMEOUT = 60
+# Endpoint override, e.g. a local stand-in server for tests and benchmarks
+EDGE_TTS_URL = os.getenv('EDGE_TTS_URL', '')
+
+OUTPUT_FORMAT = "audio-24khz-48kbitrate-mono-mp3"
+# The service rejects SSML text larger than this; longer text is sent as several turns
+MAX_TURN_TEXT_BYTES = 4096
+
+_SSL_CTX = ssl.create_default_context(cafile=certifi.where())
+
+
+class EdgeTTSError(Exception):
+    """Raised when the Edge TTS service returns an error or no audio"""
+
+
+class _StaleConnection(Exception):
+    """A pooled connection was closed by the service before the turn got any response"""
+
+
+@lru_cache(maxsize=64)
+def _tts_config(voice: str) -> TTSConfig:
+    """
+    edge_tts's validated config for a voice
+
+    Short ids like 'hi-IN-MadhurNeural' are normalized to the full
+    'Microsoft Server Speech Text to Speech Voice (hi-IN, MadhurNeural)' name, as
+    edge_tts.Communicate sends it. Raises ValueError for a malformed voice.
+    """
+    return TTSConfig(voice=voice, rate='+0%', volume='+0%', pitch='+0Hz', boundary='SentenceBoundary')
+
+
+def _speech_config_message() -> str:
+    """
+    speech.config frame, sent once per connection
+
+    edge_tts builds this frame inline in Communicate, so it is mirrored here; the
+    only difference is that both boundary events are off, as the pool reads audio only.
+    """
+    return (
+        f"X-Timestamp:{date_to_string()}\r\n"
+        "Content-Type:application/json; charset=utf-8\r\n"
+        "Path:speech.config\r\n\r\n"
+        '{"context":{"synthesis":{"audio":{"metadataoptions":{'
+        '"sentenceBoundaryEnabled":"false","wordBoundaryEnabled":"false"},'
+        f'"outputFormat":"{OUTPUT_FORMAT}"'
+        "}}}}\r\n"
+    )
+
+
+def _ssml_message(request_id: str, config: TTSConfig, escaped_text: str) -> str:
+    """ssml frame of one turn, built by edge_tts itself"""
+    return ssml_headers_plus_data(request_id, date_to_string(), mkssml(config, escaped_text))
+
+
+def parse_headers(block: bytes) -> Dict[str, str]:
+    """Parse the 'Name:value' header lines of a service message"""
+    headers = {}
+    for line in block.split(b"\r\n"):
+        if b":" in line:
+            key, value = line.split(b":", 1)
+            headers[key.decode('ascii', 'replace')] = value.decode('utf-8', 'replace')
+    return headers
+
+
+def parse_text_message(data: str) -> Dict[str, str]:
+    encoded = data.encode('utf-8')
+    return parse_headers(encoded[:encoded.find(b"\r\n\r\n")])
+
+
+def parse_binary_message(data: bytes) -> Tuple[Dict[str, str], bytes]:
+    """Binary messages: 2-byte big-endian header length, headers, then the audio payload"""
+    if len(data) < 2:
+        raise EdgeTTSError("Binary message is missing its header length")
+    header_length = int.from_bytes(data[:2], "big")
+    if header_length > len(data) - 2:
+        raise EdgeTTSError("Binary message header length exceeds the message")
+    return parse_headers(data[2:2 + header_length]), data[2 + header_length:]
+
+
+class EdgeConnection:
+    """One open WebSocket to the speech service"""
+    __slots__ = ('ws', 'created_at', 'last_used', 'requests', 'configured', 'expires_at', 'expiry')
+
+    def __init__(self, ws: aiohttp.ClientWebSocketResponse):
+        self.ws = ws
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.requests = 0
+        self.configured = False  # speech.config is sent once per connection
+        self.expires_at = None  # Speculative (warm-up) connections are dropped at this time unless used
+        self.expiry: Optional[asyncio.TimerHandle] = None
+
+    def idle_seconds(self) -> float:
+        return time.monotonic() - self.last_used
+
+
+class EdgeConnectionPool:
+    """
+    Reuses Edge TTS WebSockets across synthesis requests
+
+    A request takes the most recently used idle connection (or opens a new one),
+    runs one turn per <=4 KB of text and hands the connection back once the turn
+    ended cleanly. Concurrency is not capped: at most `size` connections are kept
+    idle, extra ones are closed on release. Connections idle for `ping_after` are
+    pinged before reuse, and ones idle longer than `max_idle` or that served
+    `max_requests` turns are closed. If the service dropped a pooled connection
+    before answering, the turn is retried once on a fresh connection.
+    """
+
+    def __init__(
+        self,
+        url: str = EDGE_TTS_URL,
+        size: int = EDGE_POOL_SIZE,
+        max_idle: float = EDGE_POOL_MAX_IDLE_SECONDS,
+        max_requests: int = EDGE_POOL_MAX_REQUESTS,
+        ping_after: float = EDGE_POOL_PING_AFTER_SECONDS,
+        ping_timeout: float = EDGE_POOL_PING_TIMEOUT
+    ):
+        self.url = url
+        self.size = size
+        self.max_idle = max_idle
+        self.max_requests = max(1, max_requests)
+        self.ping_after = ping_after
+        self.ping_timeout = ping_timeout
+        self._idle: Deque[EdgeConnection] = deque()
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._closing = set()  # Close tasks for discarded connections (kept referenced until done)
+        self._warming = 0  # Warm-up connections still handshaking
+        self._handshake_seconds = 0.0
+        self.stats = {
+            'requests': 0, 'turns': 0, 'opened': 0, 'reused': 0, 'closed': 0,
+            'ping_failures': 0, 'stale_retries': 0, 'expired': 0, 'retired': 0,
+            'warmed': 0, 'warm_used': 0, 'warm_expired': 0
+        }
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                trust_env=True,
+                timeout=aiohttp.ClientTimeout(total=None, sock_connect=EDGE_CONNECT_TIMEOUT, sock_read=EDGE_RECEIVE_TIMEOUT)
+            )
+        return self._session
+
+    def _connect_url(self) -> str:
+        if self.url:
+            return self.url
+        return (
+            f"{WSS_URL}&ConnectionId={uuid.uuid4().hex}"
+            f"&Sec-MS-GEC={DRM.generate_sec_ms_gec()}&Sec-MS-GEC-Version={SEC_MS_GEC_VERSION}"
+        )
+
+    async def _open(self) -> EdgeConnection:
+        """TLS + WebSocket handshake to the service"""
+        start = time.perf_counter()
+        for attempt in range(2):
+            try:
+                ws = await self._get_session().ws_connect(
+                    self._connect_url(),
+                    compress=15,
+                    autoping=False,  # Pongs are read by the health check, pings answered in _turn
+                    headers=DRM.headers_with_muid(WSS_HEADERS),
+                    ssl=_SSL_CTX
+                )
+                break
+            except aiohttp.WSServerHandshakeError as e:
+                if e.status != 403 or attempt:
+                    raise
+                # Sec-MS-GEC is time based: correct the clock skew from the response and retry once
+                DRM.handle_client_response_error(e)
+        self._handshake_seconds += time.perf_counter() - start
+        self.stats['opened'] += 1
+        return EdgeConnection(ws)
+
+    async def _ping(self, conn: EdgeConnection) -> bool:
+        """Health check: the connection answers a ping within ping_timeout"""
+        try:
+            await conn.ws.ping()
+            async with asyncio.timeout(self.ping_timeout):
+                while True:
+                    msg = await conn.ws.receive()
+                    if msg.type == aiohttp.WSMsgType.PONG:
+                        return True
+                    if msg.type == aiohttp.WSMsgType.PING:
+                        await conn.ws.pong(msg.data)
+                        continue
+                    return False  # Close, error or a stray message: not safe to reuse
+        except (TimeoutError, aiohttp.ClientError, ConnectionError, RuntimeError):
+            return False
+
+    def _discard(self, conn: EdgeConnection):
+        """Close a connection in the background (also safe from a generator being finalized)"""
+        self.stats['closed'] += 1
+        if conn.ws.closed:
+            return
+        try:
+            task = asyncio.get_running_loop().create_task(conn.ws.close())
+        except RuntimeError:
+            return  # Event loop already gone; the socket goes with it
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    def _prune(self):
+        """Close idle connections that expired or were closed by the service"""
+        now = time.monotonic()
+        for conn in list(self._idle):
+            if conn.expires_at is not None and not conn.ws.closed:
+                # Warm-up connections wait for their request until their own TTL, not max_idle
+                if now >= conn.expires_at:
+                    self._expire_speculative(conn)
+            elif conn.ws.closed or conn.idle_seconds() >= self.max_idle:
+                self._idle.remove(conn)
+                self.stats['expired'] += 1
+                self._discard(conn)
+
+    def _reserve(self, conn: EdgeConnection, ttl: float):
+        """Keep an idle connection for a speculative request until ttl from now"""
+        if conn.expiry is not None:
+            conn.expiry.cancel()
+        conn.expires_at = time.monotonic() + ttl
+        conn.expiry = asyncio.get_running_loop().call_later(ttl, self._expire_speculative, conn)
+
+    def _expire_speculative(self, conn: EdgeConnection):
+        """Drop a warm-up connection that no request picked up in time"""
+        conn.expiry = None
+        if conn.expires_at is None or conn not in self._idle:
+            return
+        self._idle.remove(conn)
+        self.stats['warm_expired'] += 1
+        self._discard(conn)
+
+    async def _acquire(self, fresh: bool = False) -> Tuple[EdgeConnection, bool]:
+        """A healthy idle connection (reused=True) or a newly opened one"""
+        self._prune()
+        while self._idle and not fresh:
+            conn = self._idle.pop()  # Most recently used first: the warmest socket
+            if conn.idle_seconds() >= self.ping_after and not await self._ping(conn):
+                self.stats['ping_failures'] += 1
+                self._discard(conn)
+                continue
+            self.stats['reused'] += 1
+            if conn.expires_at is not None:
+                if conn.expiry is not None:
+                    conn.expiry.cancel()
+                conn.expires_at = conn.expiry = None
+                self.stats['warm_used'] += 1
+            return conn, True
+        return await self._open(), False
+
+    def _release(self, conn: EdgeConnection, reusable: bool):
+        conn.requests += 1
+        conn.last_used = time.monotonic()
+        if not reusable or conn.ws.closed:
+            self._discard(conn)
+        elif conn.requests >= self.max_requests:
+            self.stats['retired'] += 1
+            self._discard(conn)
+        elif len(self._idle) >= self.size:
+            self._discard(conn)
+        else:
+            self._idle.append(conn)
+
+    async def warm(self, count: int = 1, ttl: Optional[float] = None):
+        """
+        Open connections ahead of demand so the next requests skip the handshake
+
+        Tops the idle connections up to count (at most size), counting ones still
+        being opened by another warm(). With ttl the connections are speculative:
+        idle ones that count towards the target are kept past max_idle, and all of
+        them are closed after ttl seconds unless a request takes them first.
+        """
+        self._prune()
+        target = min(count, self.size)
+        if ttl is not None and target > 0:
+            for conn in list(self._idle)[-target:]:  # The ones _acquire hands out first
+                self._reserve(conn, ttl)
+        missing = target - len(self._idle) - self._warming
+        for _ in range(max(0, missing)):
+            self._warming += 1
+            try:
+                conn = await self._open()
+            finally:
+                self._warming -= 1
+            try:
+                await conn.ws.send_str(_speech_config_message())
+            except (aiohttp.ClientError, ConnectionError):
+                self._discard(conn)
+                raise
+            conn.configured = True
+            self.stats['warmed'] += 1
+            if ttl is not None:
+                self._reserve(conn, ttl)
+            self._idle.append(conn)
+
+    async def stream(self, text: str, voice: str) -> AsyncIterator[bytes]:
+        """Yield MP3 audio chunks for text, one service turn per <=4 KB of escaped text"""
+        self.stats['requests'] += 1
+        config = _tts_config(voice)
+        for part in split_text_by_byte_length(escape(remove_incompatible_characters(text)), MAX_TURN_TEXT_BYTES):
+            async for chunk in self._stream_part(part.decode('utf-8'), config):
+                yield chunk
+
+    async def _stream_part(self, escaped_text: str, config: TTSConfig) -> AsyncIterator[bytes]:
+        for attempt in range(2):
+            conn, reused = await self._acquire(fresh=attempt > 0)
+            clean = False
+            audio_received = False
+            try:
+                async for chunk in self._turn(conn, escaped_text, config, reused):
+                    audio_received = True
+                    yield chunk
+                clean = True
+            except _StaleConnection:
+                self.stats['stale_retries'] += 1
+                logger.debug("edge_pool_stale_connection", requests=conn.requests, idle_s=round(conn.idle_seconds(), 1))
+                continue
+            finally:
+                # Only a turn that reached turn.end leaves the socket in a known state
+                self._release(conn, reusable=clean)
+            if not audio_received:
+                raise EdgeTTSError("No audio was received. Please verify that your parameters are correct.")
+            return
+
+    async def _turn(self, conn: EdgeConnection, escaped_text: str, config: TTSConfig, reused: bool) -> AsyncIterator[bytes]:
+        """Run one synthesis turn on a connection: send SSML, yield audio until turn.end"""
+        ws = conn.ws
+        request_id = uuid.uuid4().hex
+        responded = False
+        self.stats['turns'] += 1
+        try:
+            if not conn.configured:
+                await ws.send_str(_speech_config_message())
+                conn.configured = True
+            await ws.send_str(_ssml_message(request_id, config, escaped_text))
+        except (aiohttp.ClientError, ConnectionError) as e:
+            if reused:
+                raise _StaleConnection() from e
+            raise
+
+        while True:
+            msg = await ws.receive()
+            if msg.type == aiohttp.WSMsgType.TEXT:
+                headers = parse_text_message(msg.data)
+                if headers.get('X-RequestId', request_id) != request_id:
+                    continue  # Leftover of an earlier turn
+                responded = True
+                path = headers.get('Path')
+                if path == 'turn.end':
+                    return
+                if path not in ('turn.start', 'response', 'audio.metadata'):
+                    raise EdgeTTSError(f"Unknown path received: {path}")
+            elif msg.type == aiohttp.WSMsgType.BINARY:
+                headers, data = parse_binary_message(msg.data)
+                if headers.get('X-RequestId', request_id) != request_id:
+                    continue
+                responded = True
+                if headers.get('Path') != 'audio':
+                    raise EdgeTTSError("Received binary message, but the path is not audio")
+                if data:
+                    if headers.get('Content-Type') != 'audio/mpeg':
+                        raise EdgeTTSError("Received audio with an unexpected Content-Type")
+                    yield data
+            elif msg.type == aiohttp.WSMsgType.PING:
+                await ws.pong(msg.data)
+            elif msg.type == aiohttp.WSMsgType.PONG:
+                continue
+            else:
+                # CLOSE / CLOSED / ERROR: a reused socket the service closed while idle is retried by the caller
+                if reused and not responded:
+                    raise _StaleConnection()
+                raise EdgeTTSError(f"Edge TTS connection closed ({msg.type.name}): {msg.extra or msg.data or ''}")
+
+    async def close(self):
+        """Close idle connections and the HTTP session"""
+        while self._idle:
+            self._discard(self._idle.pop())
+        if self._closing:
+            await asyncio.gather(*self._closing, return_exceptions=True)
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    def get_stats(self) -> dict:
+        """Connection reuse and health-check counters"""
+        opened = self.stats['opened']
+        acquired = opened + self.stats['reused']
+        return {
+            **self.stats,
+            'idle': len(self._idle),
+            'reuse_rate': round(self.stats['reused'] / acquired * 100, 1) if acquired else 0.0,
+            'avg_handshake_ms': round(self._handshake_seconds / opened * 1000, 1) if opened else 0.0,
+        }
@@ -0,0 +1,187 @@
+"""
+Executor Registry for TTS Bot
+Named, sized thread pools for blocking work (database, network, audio, files) with queue and utilization metrics
+"""
+
+import os
+import time
+import asyncio
+import functools
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from structured_logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class Pool:
+    """Names of the shared executor pools"""
+    DB = "db"                   # Sync SQLAlchemy sessions
+    NETWORK_IO = "network-io"   # Blocking HTTP (gTTS, URL shortener)
+    CPU_AUDIO = "cpu-audio"     # Audio transcoding (pydub / ffmpeg)
+    FILE_IO = "file-io"         # CSV exports, database backups and restores
+
+    ALL = (DB, NETWORK_IO, CPU_AUDIO, FILE_IO)
+
+
+def _pool_size(name: str, default: int) -> int:
+    # EXECUTOR_DB_WORKERS, EXECUTOR_NETWORK_IO_WORKERS, EXECUTOR_CPU_AUDIO_WORKERS, EXECUTOR_FILE_IO_WORKERS
+    return max(1, int(os.getenv(f"EXECUTOR_{name.upper().replace('-', '_')}_WORKERS", str(default))))
+
+
+POOL_SIZES = {
+    Pool.DB: _pool_size(Pool.DB, 4),
+    Pool.NETWORK_IO: _pool_size(Pool.NETWORK_IO, 8),
+    # ffmpeg does the transcoding in a subprocess, so threads wait on it without holding the GIL
+    Pool.CPU_AUDIO: _pool_size(Pool.CPU_AUDIO, int(os.getenv('TRANSCODE_WORKERS', '2'))),
+    Pool.FILE_IO: _pool_size(Pool.FILE_IO, 2),
+}
+# Queued calls in one pool above which executor_queue_deep is logged
+EXECUTOR_QUEUE_WARN_DEPTH = int(os.getenv('EXECUTOR_QUEUE_WARN_DEPTH', '32'))
+# Queue-wait samples kept per pool for the rolling percentiles
+EXECUTOR_WAIT_WINDOW = 500
+
+
+class InstrumentedExecutor(ThreadPoolExecutor):
+    """
+    ThreadPoolExecutor that tracks queue depth, busy workers and queue wait
+
+    Every submitted call is wrapped so the pool knows when it starts and ends;
+    calls cancelled before they start leave the queue through a done callback.
+    Counters are guarded by a lock since workers and the event loop update them.
+    """
+
+    def __init__(self, name: str, max_workers: int):
+        super().__init__(max_workers=max_workers, thread_name_prefix=f"{name}-pool")
+        self.name = name
+        self.max_workers = max_workers
+        self.created_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._active = 0
+        self._busy_seconds = 0.0
+        self._wait_times: deque = deque(maxlen=EXECUTOR_WAIT_WINDOW)
+        self.stats = {'submitted': 0, 'completed': 0, 'failed': 0, 'cancelled': 0, 'peak_queued': 0}
+
+    def submit(self, fn: Callable, /, *args, **kwargs) -> Future:
+        submitted_at = time.perf_counter()
+
+        def run():
+            start = time.perf_counter()
+            with self._lock:
+                self._queued -= 1
+                self._active += 1
+                self._wait_times.append(start - submitted_at)
+            failed = False
+            try:
+                return fn(*args, **kwargs)
+            except BaseException:
+                failed = True
+                raise
+            finally:
+                with self._lock:
+                    self._active -= 1
+                    self._busy_seconds += time.perf_counter() - start
+                    self.stats['failed' if failed else 'completed'] += 1
+
+        def on_done(future: Future):
+            # A future can only be cancelled before its call starts
+            if future.cancelled():
+                with self._lock:
+                    self._queued -= 1
+                    self.stats['cancelled'] += 1
+
+        with self._lock:
+            self._queued += 1
+            self.stats['submitted'] += 1
+            queued = self._queued
+            self.stats['peak_queued'] = max(self.stats['peak_queued'], queued)
+        if queued > EXECUTOR_QUEUE_WARN_DEPTH:
+            logger.warning("executor_queue_deep", pool=self.name, queued=queued, workers=self.max_workers)
+
+        future = super().submit(run)
+        future.add_done_callback(on_done)
+        return future
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue depth, busy workers and utilization (share of worker time spent running calls)"""
+        with self._lock:
+            queued, active, busy_seconds = self._queued, self._active, self._busy_seconds
+            waits = sorted(self._wait_times)
+            stats = dict(self.stats)
+        uptime = max(time.monotonic() - self.created_at, 1e-9)
+        return {
+            **stats,
+            'workers': self.max_workers,
+            'queued': queued,
+            'active': active,
+            'utilization_now': round(active / self.max_workers * 100, 1),
+            'utilization': round(min(busy_seconds / (uptime * self.max_workers), 1.0) * 100, 1),
+            'queue_wait_p50_ms': round(waits[len(waits) // 2] * 1000, 1) if waits else 0.0,
+            'queue_wait_p95_ms': round(waits[min(len(waits) - 1, int(len(waits) * 0.95))] * 1000, 1) if waits else 0.0,
+        }
+
+
+class ExecutorRegistry:
+    """
+    Process-wide registry of named executor pools
+
+    Pools are created on first use with the size from POOL_SIZES, so importing a
+    module that offloads work does not start threads by itself.
+    """
+
+    def __init__(self, sizes: Optional[Dict[str, int]] = None):
+        self.sizes = dict(POOL_SIZES if sizes is None else sizes)
+        self._pools: Dict[str, InstrumentedExecutor] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> InstrumentedExecutor:
+        """The pool for name (created on first use)"""
+        pool = self._pools.get(name)
+        if pool is not None:
+            return pool
+        if name not in self.sizes:
+            raise ValueError(f"Unknown executor pool: {name} (available: {', '.join(self.sizes)})")
+        with self._lock:
+            pool = self._pools.get(name)
+            if pool is None:
+                pool = self._pools[name] = InstrumentedExecutor(name, self.sizes[name])
+                logger.debug("executor_pool_created", pool=name, workers=self.sizes[name])
+        return pool
+
+    async def run(self, name: str, func: Callable, *args, **kwargs) -> Any:
+        """
+        Run a blocking call on a named pool and await its result
+
+        The caller's context variables are copied to the worker thread, like asyncio.to_thread.
+        """
+        loop = asyncio.get_running_loop()
+        call = functools.partial(contextvars.copy_context().run, func, *args, **kwargs)
+        return await loop.run_in_executor(self.get(name), call)
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-pool metrics; pools that were never used report their configured size only"""
+        return {
+            name: self._pools[name].get_stats() if name in self._pools else {'workers': size, 'submitted': 0}
+            for name, size in self.sizes.items()
+        }
+
+    def shutdown(self, wait: bool = False):
+        """Shut down every pool, dropping calls that have not started"""
+        with self._lock:
+            pools, self._pools = list(self._pools.values()), {}
+        for pool in pools:
+            pool.shutdown(wait=wait, cancel_futures=True)
+
+
+# Global registry shared by the bot handlers, TTS backends and web dashboard
+executors = ExecutorRegistry()
+
+
+async def run_blocking(pool: str, func: Callable, *args, **kwargs) -> Any:
+    """Offload a blocking call from a handler: await run_blocking(Pool.DB, get_user_from_db, user_id)"""
+    return await executors.run(pool, func, *args, **kwargs)
@@ -3,6 +3,9 @@ import string
 import requests
 from datetime import datetime, timedelta
 from database import SessionLocal, User, CreditTransaction, ShortLinks, UserLinks
+from structured_logging import get_logger
+
+logger = get_logger(__name__)
 
 # Helper functions
 def generate_random_payload(length=12):
@@ -19,11 +22,11 @@ def call_shortener_api(long_url):
         shortener = db.query(LinkShortner).filter(LinkShortner.is_active == True).first()
         
         if not shortener:
-            print("No active shortener configured")
+            logger.warning("shortener_not_configured")
             return None
         
         # Universal API handler for any shortener
-        print(f"Trying to shorten URL with {shortener.domain}")
+        logger.debug("shortener_request", domain=shortener.domain)
         
         # Simple and fast API attempts - most common patterns
         try:
@@ -42,19 +45,18 @@ def call_shortener_api(long_url):
                 (f"https://{shortener.domain}/create?api={shortener.api_key}&url={encoded_url}", "GET"),
             ]
             
-            for test_url, method in quick_tests:
+            for attempt, (test_url, method) in enumerate(quick_tests, 1):
                 try:
-                    print(f"🔄 Trying: {test_url}")
+                    # URLs carry the API key, so only the domain and attempt number are logged
                     response = requests.get(test_url, timeout=5)
-                    print(f"📊 Status: {response.status_code}")
+                    logger.debug("shortener_response", domain=shortener.domain, attempt=attempt, status=response.status_code)
                     
                     if response.status_code == 200:
                         result = response.text.strip()
-                        print(f"📝 Response: {result[:100]}...")
                         
                         # Direct URL response
                         if result.startswith('http') and len(result) < 200 and '\n' not in result and not 'html' in result.lower():
-                            print(f"✅ SUCCESS: {result}")
+                            logger.info("shortener_success", domain=shortener.domain, attempt=attempt)
                             return result
                         
                         # JSON response
@@ -66,23 +68,21 @@ def call_shortener_api(long_url):
                                        json_data.get('url') or 
                                        json_data.get('link'))
                             if short_url and short_url != long_url:
-                                print(f"✅ SUCCESS: {short_url}")
+                                logger.info("shortener_success", domain=shortener.domain, attempt=attempt)
                                 return short_url
                         except:
                             pass
                         
                         # Check what kind of response we got
                         if 'html' in result.lower():
-                            print("❌ HTML response detected - not an API")
+                            logger.debug("shortener_html_response", domain=shortener.domain, attempt=attempt)
                         elif 'error' in result.lower():
-                            print(f"❌ Error response: {result}")
+                            logger.debug("shortener_error_response", domain=shortener.domain, attempt=attempt, response=result[:100])
                         else:
-                            print(f"❓ Unknown response format: {result[:50]}")
-                    else:
-                        print(f"❌ HTTP {response.status_code}")
+                            logger.debug("shortener_unknown_response", domain=shortener.domain, attempt=attempt, response=result[:50])
                         
                 except Exception as e:
-                    print(f"❌ Request failed: {e}")
+                    logger.debug("shortener_request_failed", domain=shortener.domain, attempt=attempt, error=type(e).__name__)
                     continue
             
             # POST API attempts
@@ -108,26 +108,26 @@ def call_shortener_api(long_url):
                                        result.get('url') or 
                                        result.get('link'))
                             if short_url and short_url != long_url:
-                                print(f"✅ SUCCESS: {short_url}")
+                                logger.info("shortener_success", domain=shortener.domain, endpoint=endpoint)
                                 return short_url
                         except:
                             result = response.text.strip()
                             if result.startswith('http') and len(result) < 200:
-                                print(f"✅ SUCCESS: {result}")
+                                logger.info("shortener_success", domain=shortener.domain, endpoint=endpoint)
                                 return result
                 except:
                     continue
                     
         except Exception as e:
-            print(f"API test failed: {e}")
+            logger.warning("shortener_api_error", domain=shortener.domain, error=str(e))
             pass
         
         # If configured API fails, return None
-        print(f"API shortening failed for {shortener.domain}")
+        logger.warning("shortener_failed", domain=shortener.domain)
         return None
             
     except Exception as e:
-        print(f"Error in shortener API: {e}")
+        logger.error("shortener_error", error=str(e))
         return None
     finally:
         if db:
@@ -143,7 +143,7 @@ def on_free_credit_button(user_id):
             db.execute(text("SELECT 1 FROM short_links LIMIT 1"))
             db.execute(text("SELECT 1 FROM user_links LIMIT 1"))
         except Exception as table_error:
-            print(f"Tables missing for free credit system: {table_error}")
+            logger.warning("free_credit_tables_missing", error=str(table_error))
             return None, "❌ Free credit system is being set up. Please try again in a few minutes!"
         
         # Check if user has any active link that hasn't expired yet
@@ -234,7 +234,7 @@ def on_free_credit_button(user_id):
             return short_url, "🔗 New link created! Click to earn 10 free credits! (Valid for 10 minutes)"
                 
     except Exception as e:
-        print(f"Error in free credit button handler: {e}")
+        logger.error("free_credit_button_error", user_id=user_id, error=str(e))
         if db:
             try:
                 db.rollback()
@@ -308,7 +308,7 @@ def on_credit_link_click(payload):
             return "❌ User not found."
             
     except Exception as e:
-        print(f"Error in credit link click handler: {e}")
+        logger.error("credit_link_click_error", error=str(e))
         db.rollback()
         return "❌ An error occurred while processing your request."
     finally:
@@ -323,7 +323,7 @@ def check_daily_limit(user_id):
             from sqlalchemy import text
             db.execute(text("SELECT 1 FROM user_links LIMIT 1"))
         except Exception as table_error:
-            print(f"UserLinks table missing in daily limit check: {table_error}")
+            logger.warning("user_links_table_missing", check="daily_limit", error=str(table_error))
             return False  # Allow if table doesn't exist yet
         
         # Count credits given today
@@ -340,7 +340,7 @@ def check_daily_limit(user_id):
         return credits_today >= daily_limit
         
     except Exception as e:
-        print(f"Error checking daily limit: {e}")
+        logger.error("daily_limit_check_error", user_id=user_id, error=str(e))
         return False  # Return False on error to allow user to proceed
     finally:
         if db:
@@ -359,7 +359,7 @@ def get_user_credit_stats(user_id):
             db.execute(text("SELECT 1 FROM user_links LIMIT 1"))
             tables_exist = True
         except Exception as table_error:
-            print(f"UserLinks table missing in credit stats: {table_error}")
+            logger.warning("user_links_table_missing", check="credit_stats", error=str(table_error))
             tables_exist = False
         
         if not tables_exist:
@@ -402,7 +402,7 @@ def get_user_credit_stats(user_id):
         }
         
     except Exception as e:
-        print(f"Error getting credit stats: {e}")
+        logger.error("credit_stats_error", user_id=user_id, error=str(e))
         # Return safe default values
         try:
             user = db.query(User).filter(User.user_id == user_id).first()
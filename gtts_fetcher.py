@@ -0,0 +1,154 @@
+"""
+gTTS Token Fetcher for TTS Bot
+Fetches the ~100-character gTTS tokens of a text concurrently over one pooled HTTP session and joins them in order
+"""
+
+import os
+import re
+import ssl
+import time
+import base64
+import asyncio
+from typing import List, Optional
+
+import aiohttp
+import certifi
+from gtts import gTTS
+
+from audio_buffer import AudioBuffer
+from structured_logging import get_logger
+
+logger = get_logger(__name__)
+
+# Tokens of one text fetched at a time (0 disables the fetcher: gTTS fetches them one by one in a worker thread)
+GTTS_CONCURRENCY = int(os.getenv('GTTS_CONCURRENCY', '6'))
+# Connections to Google kept across all requests (the session's connection pool)
+GTTS_MAX_CONNECTIONS = int(os.getenv('GTTS_MAX_CONNECTIONS', '16'))
+GTTS_TOKEN_TIMEOUT = float(os.getenv('GTTS_TOKEN_TIMEOUT', '15'))
+# Google Translate domain, and an endpoint override, e.g. a local stand-in server for benchmarks
+GTTS_TLD = os.getenv('GTTS_TLD', 'com')
+GTTS_URL = os.getenv('GTTS_URL', '')
+# Endpoint gTTS posts the tokens to, on translate.google.<tld>
+GTTS_BATCHEXECUTE_URL = "https://translate.google.{tld}/_/TranslateWebserverUi/data/batchexecute"
+
+_SSL_CTX = ssl.create_default_context(cafile=certifi.where())
+# Same pattern gTTS uses to find the base64 audio in the batchexecute response
+_AUDIO_PATTERN = re.compile(r'jQ1olc","\[\\"(.*)\\"]')
+
+
+class GTTSFetchError(Exception):
+    """Raised when Google Translate returns an error or no audio for a token"""
+
+
+class GTTSTokenFetcher:
+    """
+    Concurrent replacement for gTTS.write_to_fp()
+
+    gTTS splits text into tokens of at most 100 characters and posts them one after
+    another, each on a new requests.Session. Here gTTS still builds the request bodies
+    (same tokenizer, pre-processors and RPC format), but the bodies are posted at most
+    `concurrency` at a time over one keep-alive aiohttp session shared by all requests.
+    Responses are kept in token order and joined frame by frame into one MP3 with a
+    duration header. A failed token cancels the rest of its request.
+    """
+
+    def __init__(
+        self,
+        url: str = GTTS_URL,
+        concurrency: int = GTTS_CONCURRENCY,
+        max_connections: int = GTTS_MAX_CONNECTIONS,
+        token_timeout: float = GTTS_TOKEN_TIMEOUT,
+        tld: str = GTTS_TLD
+    ):
+        self.url = url or GTTS_BATCHEXECUTE_URL.format(tld=tld)
+        self.concurrency = max(1, concurrency)
+        self.max_connections = max_connections
+        self.token_timeout = token_timeout
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._in_flight = 0
+        self._fetch_seconds = 0.0
+        self.stats = {'requests': 0, 'tokens': 0, 'failed': 0, 'peak_in_flight': 0}
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections, ssl=_SSL_CTX, ttl_dns_cache=300),
+                headers=gTTS.GOOGLE_TTS_HEADERS,
+                trust_env=True,
+                timeout=aiohttp.ClientTimeout(total=self.token_timeout)
+            )
+        return self._session
+
+    @staticmethod
+    def request_bodies(text: str, lang: str) -> List[str]:
+        """batchexecute form bodies of the gTTS tokens of text, in order"""
+        # lang_check would look the language up in gTTS's table on every call; callers pass 'hi' / 'en'
+        return gTTS(text=text, lang=lang, lang_check=False).get_bodies()
+
+    async def _fetch_token(self, session: aiohttp.ClientSession, semaphore: asyncio.Semaphore, body: str, index: int) -> bytes:
+        async with semaphore:
+            self._in_flight += 1
+            self.stats['peak_in_flight'] = max(self.stats['peak_in_flight'], self._in_flight)
+            try:
+                async with session.post(self.url, data=body) as response:
+                    if response.status != 200:
+                        raise GTTSFetchError(f"gTTS token {index + 1}: HTTP {response.status} {response.reason}")
+                    payload = await response.text()
+            except aiohttp.ClientError as e:
+                raise GTTSFetchError(f"gTTS token {index + 1}: {type(e).__name__}: {e}") from e
+            finally:
+                self._in_flight -= 1
+
+        audio = [base64.b64decode(match.group(1)) for match in _AUDIO_PATTERN.finditer(payload)]
+        if not audio:
+            raise GTTSFetchError(f"gTTS token {index + 1}: no audio in the response")
+        return b"".join(audio)
+
+    async def fetch(self, text: str, lang: str) -> AudioBuffer:
+        """
+        Synthesize text: fetch all tokens concurrently and join them in token order
+
+        Raises:
+            GTTSFetchError: If any token failed (the other tokens are cancelled)
+        """
+        bodies = self.request_bodies(text, lang)
+        session = self._get_session()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        self.stats['requests'] += 1
+        start = time.perf_counter()
+
+        tasks = [asyncio.ensure_future(self._fetch_token(session, semaphore, body, index)) for index, body in enumerate(bodies)]
+        try:
+            parts = await asyncio.gather(*tasks)
+        except BaseException as e:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if not isinstance(e, asyncio.CancelledError):
+                self.stats['failed'] += 1
+                logger.warning("gtts_fetch_failed", tokens=len(bodies), lang=lang, error=str(e))
+            raise
+
+        elapsed = time.perf_counter() - start
+        self._fetch_seconds += elapsed
+        self.stats['tokens'] += len(parts)
+        logger.debug("gtts_fetched", tokens=len(parts), lang=lang, elapsed_ms=round(elapsed * 1000))
+        try:
+            return AudioBuffer.join(parts, name=f"gtts_{lang}.mp3")
+        except ValueError as e:
+            raise GTTSFetchError(f"gTTS returned audio that can't be joined: {e}") from e
+
+    async def close(self):
+        """Close the HTTP session and its pooled connections"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    def get_stats(self) -> dict:
+        """Tokens per request and fetch time"""
+        requests = self.stats['requests'] - self.stats['failed']
+        return {
+            **self.stats,
+            'concurrency': self.concurrency,
+            'avg_tokens': round(self.stats['tokens'] / requests, 1) if requests else 0.0,
+            'avg_fetch_ms': round(self._fetch_seconds / requests * 1000, 1) if requests else 0.0,
+        }
@@ -331,6 +331,14 @@ def get_back_to_user():
     keyboard = [[InlineKeyboardButton("⬅️ Back to Main", callback_data="back_to_user")]]
     return InlineKeyboardMarkup(keyboard)
 
+# TTS text prompt: Long Document mode + back
+def get_tts_text_options(is_owner=False):
+    keyboard = [
+        [InlineKeyboardButton("📚 Long Document (3000+ characters)", callback_data="long_doc_mode")],
+        [InlineKeyboardButton("⬅️ Back to Main", callback_data="back_to_owner" if is_owner else "back_to_user")]
+    ]
+    return InlineKeyboardMarkup(keyboard)
+
 # Help section keyboard with contact support
 def get_help_section_keyboard():
     keyboard = [
@@ -383,6 +391,12 @@ def get_voice_selection():
             # Female Voices Row 3: Melodic Angel (Hindi)
             [InlineKeyboardButton("🎶 Melodic Angel ", callback_data="voice_female5")],
             
+            # Free sample clip of every voice
+            [InlineKeyboardButton("🔊 Voice Preview suno (Free)", callback_data="preview_menu")],
+            
+            # Output format (MP3 audio file / Opus voice note)
+            [InlineKeyboardButton("🎧 Output Format", callback_data="audio_format_menu")],
+            
             # Back button
             [InlineKeyboardButton("⬅️ Back to Main", callback_data="back_to_user")]
         ]
@@ -396,6 +410,32 @@ def get_voice_selection():
             [InlineKeyboardButton("⬅️ Back", callback_data="back_to_user")]
         ])
 
+# Voice previews: one button per voice, each sends that voice's sample clip
+def get_voice_preview_panel(voices, is_owner=False):
+    keyboard = []
+    for index in range(0, len(voices), 2):
+        keyboard.append([
+            InlineKeyboardButton(f"▶️ {name}", callback_data=f"preview_{voice_type}")
+            for voice_type, name in voices[index:index + 2]
+        ])
+    keyboard.append([InlineKeyboardButton("⬅️ Back to Voices", callback_data="owner_tts" if is_owner else "user_tts")])
+    return InlineKeyboardMarkup(keyboard)
+
+# Audio output format selection (MP3 audio file or Opus voice note)
+def get_audio_format_panel(current_format='audio', is_owner=False):
+    keyboard = [
+        [InlineKeyboardButton(
+            f"{'✅ ' if current_format == 'voice' else ''}🎙️ Voice Note (chhota, fast upload)",
+            callback_data="audio_format_voice"
+        )],
+        [InlineKeyboardButton(
+            f"{'✅ ' if current_format != 'voice' else ''}🎵 Audio File (MP3)",
+            callback_data="audio_format_audio"
+        )],
+        [InlineKeyboardButton("⬅️ Back to Voices", callback_data="owner_tts" if is_owner else "user_tts")]
+    ]
+    return InlineKeyboardMarkup(keyboard)
+
 # Enhanced Voice Selection for Owner - Premium TTS Panel
 def get_voice_selection_owner():
     """Get voice selection keyboard for owner - perfectly synced with backend"""
@@ -433,6 +473,12 @@ def get_voice_selection_owner():
             ],
             [InlineKeyboardButton("🎶 Melodic Angel", callback_data="voice_female5")], # KavyaNeural
             
+            # Free sample clip of every voice
+            [InlineKeyboardButton("🔊 Voice Preview suno (Free)", callback_data="preview_menu")],
+            
+            # Output format (MP3 audio file / Opus voice note)
+            [InlineKeyboardButton("🎧 Output Format", callback_data="audio_format_menu")],
+            
             # Owner controls
             [InlineKeyboardButton("⬅️ Back to Owner Panel", callback_data="back_to_owner")]
         ]
@@ -0,0 +1,229 @@
+"""
+Language Detector for TTS Bot
+Precompiled single-pass script/language detection for Hindi (Devanagari + Roman), English and other Indic scripts
+"""
+
+import re
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Roman Hindi detection - strictly Hindi words only (ambiguous English words removed)
+ROMAN_HINDI_WORDS = frozenset({
+    # Greetings and common expressions
+    'namaste', 'namaskar', 'dhanyawad', 'shukriya', 'alvida', 'jai', 'hind',
+    # Basic Hindi words
+    'kya', 'hai', 'hain', 'ka', 'ki', 'ke', 'ko', 'se', 'me', 'par', 'mein',
+    'aur', 'ya', 'nahi', 'nahin', 'haan', 'han', 'ji', 'sahab', 'bhai', 'didi', 'papa', 'mama',
+    # Hindi-specific words (not commonly used in English)
+    'ghar', 'paisa', 'paise', 'rupya', 'rupee', 'samay', 'din', 'rat', 'subah', 'sham', 'dopahar',
+    'khana', 'paani', 'chai', 'doodh', 'roti', 'chawal', 'dal', 'sabzi', 'acha', 'accha',
+    'bura', 'burra', 'thik', 'theek', 'sahi', 'galat', 'kaise', 'kahan', 'kab', 'kyun', 'kyu', 'kaun',
+    'kitna', 'kitni', 'kitne', 'bohot', 'bahut', 'thoda', 'zyada', 'jyada', 'kam', 'jaldi', 'der',
+    'chalo', 'aao', 'jao', 'ruko', 'dekho', 'suno', 'bolo', 'kaho', 'batao', 'poocho', 'pucho',
+    'samjha', 'samjhi', 'samjhe', 'pata', 'malum', 'jaanta', 'jaanti', 'jaante', 'karta', 'karti', 'karte',
+    'hota', 'hoti', 'hote', 'deta', 'deti', 'dete', 'leta', 'leti', 'lete', 'aata', 'aati', 'aate',
+    'jaata', 'jaati', 'jaate', 'rahta', 'rahti', 'rahte', 'khelna', 'padhna', 'likhna', 'dekhna',
+    'sunna', 'bolna', 'kehna', 'batana', 'puchna', 'samajhna', 'seekhna', 'sikhna', 'karna', 'hona',
+    'dena', 'lena', 'aana', 'jana', 'rehna', 'rahna', 'kyunki', 'isliye', 'lekin',
+    # Additional distinctly Hindi words
+    'bharat', 'hindustan', 'desh', 'sarkar', 'vidya', 'gyan', 'shaadi', 'byah', 'ganga', 'yamuna'
+})
+
+# Language spans shorter than this many words are folded into the neighbouring span,
+# so a single borrowed word ("मैं office जा रहा हूँ") does not switch voices
+SEGMENT_MIN_WORDS = 3
+
+# Words with their trailing whitespace, so spans re-join exactly
+_TOKEN_RE = re.compile(r'\S+\s*')
+
+# Unicode blocks of Indic scripts: language code -> (first code point, last code point)
+INDIC_SCRIPTS = {
+    'hi': (0x0900, 0x097F),  # Devanagari
+    'bn': (0x0980, 0x09FF),  # Bengali
+    'pa': (0x0A00, 0x0A7F),  # Gurmukhi
+    'gu': (0x0A80, 0x0AFF),  # Gujarati
+    'or': (0x0B00, 0x0B7F),  # Odia
+    'ta': (0x0B80, 0x0BFF),  # Tamil
+    'te': (0x0C00, 0x0C7F),  # Telugu
+    'kn': (0x0C80, 0x0CFF),  # Kannada
+    'ml': (0x0D00, 0x0D7F),  # Malayalam
+}
+
+# Marker characters used in the classified string. Markers are never ASCII letters,
+# so Latin words survive classification untouched and can be matched directly.
+_SCRIPT_MARKERS = {lang: chr(0x01 + index) for index, lang in enumerate(INDIC_SCRIPTS)}
+_OTHER_LETTER = '\x0e'
+_WORD_CHAR = '\x0f'
+
+
+class _CodePointTable(dict):
+    """
+    Lazy str.translate table that classifies each code point once and remembers it
+
+    Latin letters map to lowercase, Indic code points to their script marker, other
+    letters and digits to word-character markers, everything else to a space.
+    """
+
+    def __missing__(self, code_point: int) -> str:
+        char = chr(code_point)
+        if char.isascii():
+            if char.isalpha():
+                value = char.lower()
+            elif char.isdigit() or char == '_':
+                value = _WORD_CHAR
+            else:
+                value = ' '
+        else:
+            value = None
+            for lang, (first, last) in INDIC_SCRIPTS.items():
+                if first <= code_point <= last:
+                    value = _SCRIPT_MARKERS[lang]
+                    break
+            if value is None:
+                if char.isalpha():
+                    value = _OTHER_LETTER
+                elif char.isalnum():
+                    value = _WORD_CHAR
+                else:
+                    value = ' '
+        self[code_point] = value
+        return value
+
+
+class LanguageDetector:
+    """
+    Single-pass language detector
+
+    The text is classified with one str.translate call against a cached code-point table;
+    character classes are then counted with C-level str.count scans and Roman Hindi words
+    are looked up in a precompiled frozenset.
+    """
+
+    def __init__(self, enabled_scripts: Iterable[str] = ('hi',), roman_hindi_words: frozenset = ROMAN_HINDI_WORDS):
+        unknown = set(enabled_scripts) - set(INDIC_SCRIPTS)
+        if unknown:
+            raise ValueError(f"Unsupported scripts: {', '.join(sorted(unknown))}")
+        self.enabled_scripts = tuple(enabled_scripts)
+        self.roman_hindi_words = roman_hindi_words
+        self._table = _CodePointTable()
+        for code_point in range(0x0D80):  # Pre-classify ASCII, Latin-1 and all Indic blocks
+            self._table[code_point]
+
+    def analyze(self, text: str) -> Dict[str, float]:
+        """Return script ratios (per Indic script, Latin) and the Roman Hindi word ratio"""
+        classified = (text or '').translate(self._table)
+
+        # Every non-letter collapses to a space or the word-char marker, so Latin letters are what is left over
+        script_chars = {lang: classified.count(marker) for lang, marker in _SCRIPT_MARKERS.items()}
+        other_letters = classified.count(_OTHER_LETTER)
+        latin_chars = (
+            len(classified) - classified.count(' ') - classified.count(_WORD_CHAR)
+            - other_letters - sum(script_chars.values())
+        )
+        total_chars = latin_chars + sum(script_chars.values()) + other_letters
+
+        tokens = classified.split()
+        latin_words = sum(map(str.isalpha, tokens))
+        roman_hindi_count = sum(map(self.roman_hindi_words.__contains__, tokens))
+
+        ratios = {
+            lang: (count / total_chars if total_chars else 0.0)
+            for lang, count in script_chars.items()
+        }
+        ratios['latin'] = latin_chars / total_chars if total_chars else 0.0
+        ratios['roman_hindi'] = roman_hindi_count / latin_words if latin_words else 0.0
+        ratios['total_chars'] = total_chars
+        return ratios
+
+    def detect(self, text: str, ratios: Optional[Dict[str, float]] = None) -> str:
+        """Detect the language code of text ('en' unless an enabled Indic script or Roman Hindi dominates)"""
+        try:
+            if ratios is None:
+                ratios = self.analyze(text)
+            if not ratios['total_chars']:
+                return 'en'  # Default to English for non-alphabetic text
+
+            dominant = max(self.enabled_scripts, key=lambda lang: ratios[lang], default=None)
+            dominant_ratio = ratios[dominant] if dominant else 0.0
+
+            logger.debug(f"Language analysis: {dominant}={dominant_ratio:.2f}, roman_hindi={ratios['roman_hindi']:.2f}")
+
+            if dominant_ratio > 0.6:  # 60% characters in one Indic script
+                return dominant
+            if 'hi' in self.enabled_scripts and ratios['roman_hindi'] >= 0.4:  # 40% Roman Hindi words
+                return 'hi'
+            if dominant_ratio > 0.3:  # Substantial Indic script presence
+                return dominant
+            return 'en'
+        except Exception as e:
+            logger.warning(f"Language detection error: {e}")
+            return 'en'
+
+    def segment(self, text: str, min_words: int = SEGMENT_MIN_WORDS) -> List[Tuple[str, str]]:
+        """
+        Split code-switched text into ordered (language, text) spans
+
+        Words are labelled by script (Devanagari -> 'hi', Latin -> 'en'); digits and
+        punctuation join the span they belong to. Runs shorter than min_words are folded
+        into the preceding span, and Latin spans that read as Roman Hindi are labelled 'hi'.
+        Monolingual text comes back as a single span.
+        """
+        hi_marker = _SCRIPT_MARKERS['hi']
+        runs = []  # [language, tokens, word_count]
+        for match in _TOKEN_RE.finditer(text or ''):
+            token = match.group()
+            classified = token.translate(self._table)
+            if hi_marker in classified:
+                lang = 'hi'
+            elif any('a' <= char <= 'z' for char in classified):
+                lang = 'en'
+            else:
+                lang = None  # Digits / punctuation: neutral
+
+            if runs and runs[-1][0] is None and lang:
+                runs[-1][0] = lang  # Leading neutral tokens adopt the first real language
+            if runs and (lang is None or lang == runs[-1][0]):
+                runs[-1][1].append(token)
+                runs[-1][2] += lang is not None
+            else:
+                runs.append([lang, [token], int(lang is not None)])
+
+        if not runs:
+            return []
+
+        def merge(spans):
+            merged = []
+            for lang, tokens, words in spans:
+                if merged and (lang == merged[-1][0] or words < min_words):
+                    merged[-1][1].extend(tokens)
+                    merged[-1][2] += words
+                else:
+                    merged.append([lang, list(tokens), words])
+            if len(merged) > 1 and merged[0][2] < min_words:
+                first = merged.pop(0)
+                merged[0][1][:0] = first[1]
+                merged[0][2] += first[2]
+            return merged
+
+        spans = merge(runs)
+        for span in spans:
+            if span[0] == 'en' and self.detect(''.join(span[1])) == 'hi':
+                span[0] = 'hi'  # Roman Hindi is read by the Hindi voice, as with whole messages
+        spans = merge(spans)
+        return [(lang or 'en', ''.join(tokens).strip()) for lang, tokens, _ in spans]
+
+
+# Default detector shared by the TTS service (Hindi / English)
+default_detector = LanguageDetector()
+
+
+def detect_language(text: str) -> str:
+    """Detect language with the shared default detector"""
+    return default_detector.detect(text)
+
+
+def segment_languages(text: str) -> List[Tuple[str, str]]:
+    """Split code-switched text into (language, text) spans with the shared default detector"""
+    return default_detector.segment(text)
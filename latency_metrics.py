@@ -0,0 +1,119 @@
+"""
+Latency Metrics for TTS Bot
+Per-stage timing of the TTS request path with rolling p50/p95/p99 per stage and per voice
+"""
+
+import os
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Any, Optional
+
+# Samples kept per stage (and per voice/stage pair) for the rolling percentiles
+WINDOW_SIZE = int(os.getenv('LATENCY_WINDOW_SIZE', '1000'))
+
+
+class Stage:
+    """Timed stages of a TTS request, in request order"""
+    CREDIT_CHECK = "credit_check"        # get_user_from_db balance lookup
+    QUEUE_WAIT = "queue_wait"            # Waiting for a scheduler slot
+    LANGUAGE_DETECT = "language_detect"  # Script / Roman Hindi detection
+    FIRST_BYTE = "edge_first_byte"       # Request sent -> first audio byte
+    STREAMING = "edge_streaming"         # First audio byte -> stream complete
+    SYNTHESIS = "synthesis"              # Whole text_to_speech call (cache, retries, fallbacks)
+    UPLOAD = "upload"                    # reply_audio / reply_voice
+    FEEDBACK_DELAY = "feedback_delay"    # Fixed sleep before the feedback keyboard
+    CREDIT_COMMIT = "credit_commit"      # Credit deduction + request log commit
+    TOTAL = "total"                      # Text received -> credits committed
+
+    ORDER = (
+        CREDIT_CHECK, QUEUE_WAIT, LANGUAGE_DETECT, FIRST_BYTE, STREAMING,
+        SYNTHESIS, UPLOAD, FEEDBACK_DELAY, CREDIT_COMMIT, TOTAL
+    )
+
+
+def _percentiles(samples) -> Dict[str, float]:
+    values = sorted(samples)
+    count = len(values)
+
+    def pick(percent):
+        return round(values[min(count - 1, int(count * percent / 100))] * 1000, 1)
+
+    return {
+        'count': count,
+        'p50_ms': pick(50),
+        'p95_ms': pick(95),
+        'p99_ms': pick(99),
+    }
+
+
+class LatencyRecorder:
+    """
+    Rolling latency windows keyed by stage and by (voice, stage)
+
+    Recording happens on the bot's event loop while the web dashboard reads from its
+    own thread, so windows are guarded by a lock and copied before sorting.
+    """
+
+    def __init__(self, window_size: int = WINDOW_SIZE):
+        self.window_size = window_size
+        self._stages: Dict[str, deque] = {}
+        self._voices: Dict[str, Dict[str, deque]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float, voice: Optional[str] = None):
+        """Record one duration (seconds) for a stage, optionally attributed to a voice"""
+        with self._lock:
+            window = self._stages.get(stage)
+            if window is None:
+                window = self._stages[stage] = deque(maxlen=self.window_size)
+            window.append(seconds)
+
+            if voice:
+                voice_stages = self._voices.setdefault(voice, {})
+                window = voice_stages.get(stage)
+                if window is None:
+                    window = voice_stages[stage] = deque(maxlen=self.window_size)
+                window.append(seconds)
+
+    @contextmanager
+    def measure(self, stage: str, voice: Optional[str] = None):
+        """Time the enclosed block with the monotonic clock (also usable inside coroutines)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start, voice)
+
+    @staticmethod
+    def _ordered(stages: Dict[str, Any]) -> Dict[str, Any]:
+        known = [stage for stage in Stage.ORDER if stage in stages]
+        return {stage: stages[stage] for stage in known + sorted(set(stages) - set(known))}
+
+    def get_stats(self) -> Dict[str, Dict[str, float]]:
+        """Per-stage count and p50/p95/p99 in milliseconds"""
+        with self._lock:
+            snapshot = {stage: list(window) for stage, window in self._stages.items() if window}
+        return self._ordered({stage: _percentiles(samples) for stage, samples in snapshot.items()})
+
+    def get_voice_stats(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """Per-voice, per-stage count and p50/p95/p99 in milliseconds"""
+        with self._lock:
+            snapshot = {
+                voice: {stage: list(window) for stage, window in stages.items() if window}
+                for voice, stages in self._voices.items()
+            }
+        return {
+            voice: self._ordered({stage: _percentiles(samples) for stage, samples in stages.items()})
+            for voice, stages in sorted(snapshot.items())
+        }
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+            self._voices.clear()
+
+
+# Global recorder shared by the bot handlers, TTS service and web dashboard
+latency_metrics = LatencyRecorder()
@@ -0,0 +1,441 @@
+"""
+Long Document TTS for TTS Bot
+Durable, resumable jobs for texts beyond the 3000-character message cap, delivered and billed chunk by chunk
+"""
+
+import os
+import time
+import asyncio
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from pyrogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+
+from database import SessionLocal, TTSJob, TTSJobChunk, User, TTSRequest
+from text_chunker import split_text_chunks
+from tts_scheduler import tts_scheduler
+from audio_output import audio_output, DeliveryFormat
+from latency_metrics import latency_metrics, Stage
+from structured_logging import get_logger
+
+logger = get_logger(__name__)
+
+LONG_DOC_MAX_CHARS = int(os.getenv('LONG_DOC_MAX_CHARS', '200000'))
+LONG_DOC_MAX_FILE_BYTES = LONG_DOC_MAX_CHARS * 4  # UTF-8 upper bound for the character limit
+# Characters per delivered part (same as the single-message limit)
+LONG_DOC_CHUNK_CHARS = int(os.getenv('LONG_DOC_CHUNK_CHARS', '3000'))
+# Parts synthesized ahead of the one being uploaded
+LONG_DOC_PREFETCH = int(os.getenv('LONG_DOC_PREFETCH', '2'))
+LONG_DOC_MAX_ACTIVE_JOBS = int(os.getenv('LONG_DOC_MAX_ACTIVE_JOBS', '3'))
+LONG_DOC_MAX_ATTEMPTS = int(os.getenv('LONG_DOC_MAX_ATTEMPTS', '3'))
+# How often paused jobs are re-checked for credits (and missed wake-ups are picked up)
+LONG_DOC_POLL_SECONDS = float(os.getenv('LONG_DOC_POLL_SECONDS', '30'))
+# Minimum seconds between progress message edits (Telegram rate-limits edits)
+LONG_DOC_PROGRESS_INTERVAL = float(os.getenv('LONG_DOC_PROGRESS_INTERVAL', '3'))
+CREDITS_PER_WORD = 0.05
+
+
+class JobStatus:
+    """Lifecycle of a long-document job"""
+    PENDING = "pending"        # Created, not picked up yet
+    RUNNING = "running"        # Worker is delivering parts
+    PAUSED = "paused"          # Out of credits; resumes automatically once topped up
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+    ACTIVE = (PENDING, RUNNING, PAUSED)
+
+
+class ChunkStatus:
+    PENDING = "pending"
+    DELIVERED = "delivered"
+    FAILED = "failed"
+
+
+class LongDocumentError(Exception):
+    """Raised when a long document cannot be accepted (message is shown to the user)"""
+
+
+def chunk_credits(text: str) -> float:
+    return len(text.split()) * CREDITS_PER_WORD
+
+
+def get_cancel_keyboard(job_id: int) -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup([[InlineKeyboardButton("❌ Cancel Job", callback_data=f"long_doc_cancel_{job_id}")]])
+
+
+def get_active_job(user_id: int) -> Optional[TTSJob]:
+    """The user's unfinished job, if any (one active job per user)"""
+    db = SessionLocal()
+    try:
+        return db.query(TTSJob).filter(
+            TTSJob.user_id == user_id,
+            TTSJob.status.in_(JobStatus.ACTIVE)
+        ).first()
+    except Exception as e:
+        logger.error("long_doc_active_job_error", user_id=user_id, error=str(e))
+        return None
+    finally:
+        db.close()
+
+
+def create_job(
+    user_id: int,
+    chat_id: int,
+    text: str,
+    voice_type: str,
+    audio_format: str,
+    is_free: bool,
+    title: Optional[str] = None,
+    status_message_id: Optional[int] = None
+) -> Tuple[int, int, float]:
+    """
+    Persist a job and all of its parts in one transaction
+
+    Returns:
+        tuple: (job_id, total_chunks, estimated_credits)
+    """
+    text = text.strip()
+    if not text:
+        raise LongDocumentError("Document me koi text nahi mila.")
+    if len(text) > LONG_DOC_MAX_CHARS:
+        raise LongDocumentError(f"Document bahut lamba hai! Maximum {LONG_DOC_MAX_CHARS} characters allowed hai (aapka {len(text)} hai).")
+
+    chunks = split_text_chunks(text, LONG_DOC_CHUNK_CHARS)
+    estimated = 0.0 if is_free else sum(chunk_credits(chunk) for chunk in chunks)
+
+    db = SessionLocal()
+    try:
+        job = TTSJob(
+            user_id=user_id,
+            chat_id=chat_id,
+            voice_type=voice_type,
+            audio_format=audio_format,
+            title=title,
+            status=JobStatus.PENDING,
+            total_chunks=len(chunks),
+            total_chars=len(text),
+            is_free=is_free,
+            status_message_id=status_message_id
+        )
+        db.add(job)
+        db.flush()
+        db.add_all([
+            TTSJobChunk(
+                job_id=job.id,
+                chunk_index=index,
+                text=chunk,
+                credits=0.0 if is_free else chunk_credits(chunk)
+            )
+            for index, chunk in enumerate(chunks)
+        ])
+        db.commit()
+        logger.info("long_doc_job_created", job_id=job.id, user_id=user_id, chunks=len(chunks), chars=len(text))
+        return job.id, len(chunks), estimated
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def cancel_job(job_id: int, user_id: int) -> bool:
+    """Cancel the user's active job; parts already delivered stay billed"""
+    db = SessionLocal()
+    try:
+        job = db.query(TTSJob).filter(TTSJob.id == job_id, TTSJob.user_id == user_id).first()
+        if not job or job.status not in JobStatus.ACTIVE:
+            return False
+        job.status = JobStatus.CANCELLED
+        job.updated_at = datetime.utcnow()
+        db.commit()
+        logger.info("long_doc_job_cancelled", job_id=job_id, user_id=user_id)
+        return True
+    except Exception as e:
+        logger.error("long_doc_cancel_error", job_id=job_id, error=str(e))
+        db.rollback()
+        return False
+    finally:
+        db.close()
+
+
+class LongDocumentWorker:
+    """
+    Background worker that delivers long-document jobs part by part
+
+    All progress lives in the tts_jobs / tts_job_chunks tables: each part is marked
+    delivered and billed in the same commit right after its upload, so after a
+    restart a job continues from its first undelivered part. A crash between upload
+    and commit re-sends that one part (at-least-once delivery). Parts are uploaded
+    strictly in order while the next LONG_DOC_PREFETCH parts are synthesized ahead.
+    """
+
+    def __init__(self, bot, tts_service, max_active_jobs: int = LONG_DOC_MAX_ACTIVE_JOBS, prefetch: int = LONG_DOC_PREFETCH):
+        self.bot = bot
+        self.tts_service = tts_service
+        self.max_active_jobs = max_active_jobs
+        self.prefetch = max(0, prefetch)
+        self._wake = asyncio.Event()
+        self._running: Dict[int, asyncio.Task] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._last_progress: Dict[int, float] = {}
+        self.stats = {
+            'jobs_completed': 0,
+            'jobs_failed': 0,
+            'jobs_paused': 0,
+            'chunks_delivered': 0,
+            'chunk_retries': 0,
+        }
+
+    async def start(self):
+        """Start the worker loop; unfinished jobs from a previous run are resumed"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logger.info("long_doc_worker_started")
+
+    def notify(self):
+        """Wake the worker for a new or resumed job"""
+        self._wake.set()
+
+    def _active_job_ids(self):
+        db = SessionLocal()
+        try:
+            rows = db.query(TTSJob.id).filter(
+                TTSJob.status.in_(JobStatus.ACTIVE)
+            ).order_by(TTSJob.created_at).all()
+            return [row[0] for row in rows]
+        except Exception as e:
+            logger.error("long_doc_poll_error", error=str(e))
+            return []
+        finally:
+            db.close()
+
+    async def _run(self):
+        # Delivery needs a connected client; the worker is started before app.run()
+        while not getattr(self.bot, 'is_connected', False):
+            await asyncio.sleep(1)
+
+        while True:
+            for job_id in self._active_job_ids():
+                if len(self._running) >= self.max_active_jobs:
+                    break
+                if job_id not in self._running:
+                    task = asyncio.create_task(self._process_job(job_id))
+                    self._running[job_id] = task
+                    task.add_done_callback(lambda _, job_id=job_id: self._finished(job_id))
+
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=LONG_DOC_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    def _finished(self, job_id: int):
+        self._running.pop(job_id, None)
+        # A slot freed up: let queued jobs start without waiting for the next poll
+        self._wake.set()
+
+    def _load_job(self, db, job_id: int) -> Optional[TTSJob]:
+        db.expire_all()
+        return db.query(TTSJob).filter(TTSJob.id == job_id).first()
+
+    async def _synthesize(self, job: TTSJob, chunk: TTSJobChunk):
+        voice_id = self.tts_service.get_voice_id(job.voice_type)
+        async with tts_scheduler.slot(job.user_id):
+            with latency_metrics.measure(Stage.SYNTHESIS, voice_id):
+                return await self.tts_service.text_to_speech_with_voice(chunk.text, job.voice_type)
+
+    async def _process_job(self, job_id: int):
+        db = SessionLocal()
+        prefetched: Dict[int, asyncio.Task] = {}
+        try:
+            job = self._load_job(db, job_id)
+            if not job or job.status not in JobStatus.ACTIVE:
+                return
+
+            chunks = db.query(TTSJobChunk).filter(
+                TTSJobChunk.job_id == job_id,
+                TTSJobChunk.status == ChunkStatus.PENDING
+            ).order_by(TTSJobChunk.chunk_index).all()
+
+            was_paused = job.status == JobStatus.PAUSED
+            if chunks and not job.is_free and not self._has_credits(db, job.user_id, chunks[0].credits):
+                if not was_paused:
+                    await self._pause(db, job)
+                return
+
+            job.status = JobStatus.RUNNING
+            job.updated_at = datetime.utcnow()
+            db.commit()
+            if was_paused:
+                await self._update_progress(job, "▶️ Credits mil gaye, job resume ho raha hai...", force=True)
+
+            for position, chunk in enumerate(chunks):
+                # Keep the next parts synthesizing while this one is uploaded
+                for ahead in chunks[position:position + 1 + self.prefetch]:
+                    if ahead.chunk_index not in prefetched:
+                        prefetched[ahead.chunk_index] = asyncio.create_task(self._synthesize(job, ahead))
+
+                job = self._load_job(db, job_id)
+                if not job or job.status == JobStatus.CANCELLED:
+                    await self._update_progress(job, "❌ Job cancel ho gaya.", force=True, final=True)
+                    return
+
+                if not job.is_free and not self._has_credits(db, job.user_id, chunk.credits):
+                    await self._pause(db, job)
+                    return
+
+                try:
+                    audio_data = await prefetched.pop(chunk.chunk_index)
+                    if not audio_data:
+                        raise RuntimeError("no audio generated")
+                    audio_msg = await self._deliver(job, chunk, audio_data)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    chunk.attempts = (chunk.attempts or 0) + 1
+                    chunk.error = str(e)[:500]
+                    if chunk.attempts >= LONG_DOC_MAX_ATTEMPTS:
+                        chunk.status = ChunkStatus.FAILED
+                        job.status = JobStatus.FAILED
+                        job.error = f"part {chunk.chunk_index + 1}: {chunk.error}"
+                        self.stats['jobs_failed'] += 1
+                    job.updated_at = datetime.utcnow()
+                    db.commit()
+                    logger.warning("long_doc_chunk_failed", job_id=job_id, part=chunk.chunk_index + 1, attempts=chunk.attempts, error=str(e))
+                    if job.status == JobStatus.FAILED:
+                        await self._update_progress(
+                            job,
+                            f"❌ Part {chunk.chunk_index + 1} ka audio nahi ban paya. Job ruk gaya hai "
+                            f"({job.completed_chunks}/{job.total_chunks} parts bhej diye).",
+                            force=True, final=True
+                        )
+                    else:
+                        self.stats['chunk_retries'] += 1
+                        # Retried on the next poll, from this same part
+                    return
+
+                self._commit_chunk(db, job, chunk, audio_msg)
+                await self._update_progress(job)
+
+            job.status = JobStatus.COMPLETED
+            job.completed_at = datetime.utcnow()
+            job.updated_at = job.completed_at
+            if not job.is_free:
+                db.add(TTSRequest(
+                    user_id=job.user_id,
+                    text=f"[long document {job.total_chunks} parts, {job.total_chars} chars] {job.title or ''}".strip(),
+                    language='hi',
+                    credits_used=job.credits_charged
+                ))
+            db.commit()
+            self.stats['jobs_completed'] += 1
+            logger.info("long_doc_job_completed", job_id=job_id, user_id=job.user_id, parts=job.total_chunks, credits=job.credits_charged)
+            await self._update_progress(
+                job,
+                f"✅ **Long Document Complete!**\n"
+                f"🧩 **Parts:** {job.total_chunks}\n"
+                f"{'💰 **Cost:** ' + format(job.credits_charged, '.2f') + ' credits' if not job.is_free else '⭐ **Owner Access**'}",
+                force=True, final=True
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            db.rollback()
+            logger.error("long_doc_job_error", job_id=job_id, error=str(e))
+        finally:
+            for task in prefetched.values():
+                task.cancel()
+            db.close()
+
+    def _has_credits(self, db, user_id: int, credits_needed: float) -> bool:
+        # Column query: reads the current balance instead of a User object the session may keep stale
+        credits = db.query(User.credits).filter(User.user_id == user_id).scalar()
+        return credits is not None and float(credits) >= credits_needed
+
+    async def _pause(self, db, job: TTSJob):
+        job.status = JobStatus.PAUSED
+        job.updated_at = datetime.utcnow()
+        db.commit()
+        self.stats['jobs_paused'] += 1
+        logger.info("long_doc_job_paused", job_id=job.id, user_id=job.user_id, delivered=job.completed_chunks)
+        await self._update_progress(job, force=True)
+        try:
+            await self.bot.send_message(
+                job.chat_id,
+                f"⏸️ **Long Document Paused**\n\n"
+                f"Credits khatam ho gaye! {job.completed_chunks}/{job.total_chunks} parts bhej diye hai.\n"
+                f"💳 Credits add karte hi baaki parts apne aap aane lagenge.",
+                reply_markup=get_cancel_keyboard(job.id)
+            )
+        except Exception as e:
+            logger.warning("long_doc_pause_notice_failed", job_id=job.id, error=str(e))
+
+    async def _deliver(self, job: TTSJob, chunk: TTSJobChunk, audio_data):
+        part = chunk.chunk_index + 1
+        caption = f"📚 **{job.title or 'Long Document'}**\n🧩 **Part:** {part}/{job.total_chunks}"
+        voice_id = self.tts_service.get_voice_id(job.voice_type)
+        audio_data.seek(0)
+        if job.audio_format == DeliveryFormat.VOICE:
+            voice_note = await audio_output.to_voice_note(audio_data)
+            if voice_note:
+                voice_data, duration = voice_note
+                with latency_metrics.measure(Stage.UPLOAD, voice_id):
+                    return await self.bot.send_voice(job.chat_id, voice_data, caption=caption, duration=duration)
+            audio_data.seek(0)
+
+        audio_data.name = f"part_{part:0{len(str(job.total_chunks))}d}.mp3"
+        with latency_metrics.measure(Stage.UPLOAD, voice_id):
+            return await self.bot.send_audio(job.chat_id, audio_data, caption=caption, title=f"{job.title or 'Long Document'} - Part {part}")
+
+    def _commit_chunk(self, db, job: TTSJob, chunk: TTSJobChunk, audio_msg):
+        """Mark the part delivered, bill it and advance the job in one transaction"""
+        media = getattr(audio_msg, 'voice', None) or getattr(audio_msg, 'audio', None)
+        now = datetime.utcnow()
+        chunk.status = ChunkStatus.DELIVERED
+        chunk.file_id = media.file_id if media else None
+        chunk.error = None
+        chunk.completed_at = now
+        job.completed_chunks = (job.completed_chunks or 0) + 1
+        job.updated_at = now
+        if not job.is_free and chunk.credits:
+            # Deduct in SQL: other handlers may have charged the user while this part was synthesized
+            db.query(User).filter(User.user_id == job.user_id).update(
+                {User.credits: User.credits - chunk.credits}, synchronize_session=False
+            )
+            job.credits_charged = float(job.credits_charged or 0) + chunk.credits
+        db.commit()
+        self.stats['chunks_delivered'] += 1
+
+    async def _update_progress(self, job: Optional[TTSJob], text: Optional[str] = None, force: bool = False, final: bool = False):
+        if not job or not job.status_message_id:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_progress.get(job.id, 0.0) < LONG_DOC_PROGRESS_INTERVAL:
+            return
+        if final:
+            self._last_progress.pop(job.id, None)
+        else:
+            self._last_progress[job.id] = now
+
+        if text is None:
+            filled = job.completed_chunks * 10 // max(1, job.total_chunks)
+            state = "⏸️ Paused (credits kam hai)" if job.status == JobStatus.PAUSED else "🔄 Processing"
+            text = (
+                f"📚 **Long Document:** {job.completed_chunks}/{job.total_chunks} parts\n"
+                f"{'▓' * filled}{'░' * (10 - filled)}\n"
+                f"{state}"
+            )
+        try:
+            await self.bot.edit_message_text(
+                job.chat_id,
+                job.status_message_id,
+                text,
+                reply_markup=None if final else get_cancel_keyboard(job.id)
+            )
+        except Exception as e:
+            logger.debug("long_doc_progress_update_failed", job_id=job.id, error=str(e))
+
+    def get_stats(self) -> dict:
+        return {**self.stats, 'running_jobs': len(self._running)}
@@ -5,13 +5,15 @@ import shutil
 import random
 import string
 import subprocess
+import time
 import urllib.parse
 from datetime import datetime, timedelta
 from pyrogram.client import Client
 from pyrogram import filters
 from pyrogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
+from pyrogram.errors import BadRequest
 from sqlalchemy.orm import Session
-from database import create_tables, get_db, User, TTSRequest, LinkShortner, BotSettings, BotStatus, BotRating, CreditTransaction, ReferralSystem, SessionLocal, get_setting, update_setting, QRCodeSettings, PaymentRequest, MessageTracking # Import QRCodeSettings and MessageTracking
+from database import create_tables, get_db, User, TTSRequest, LinkShortner, BotSettings, BotStatus, BotRating, CreditTransaction, ReferralSystem, SessionLocal, get_setting, update_setting, QRCodeSettings, PaymentRequest, MessageTracking, get_audio_format, set_audio_format, get_cached_file_id, store_cached_file_id, invalidate_cached_file_id # Import QRCodeSettings and MessageTracking
 from credit_history import create_credit_history_tables, log_credit_history, get_user_credit_history, get_user_credit_summary, get_credit_history_db
 from transaction_history import transaction_manager
 from keyboards import (
@@ -26,9 +28,21 @@ from keyboards import (
     get_user_about_keyboard, get_owner_details_keyboard, get_referral_settings_panel,
     get_transaction_history_panel, get_custom_date_panel, get_my_transaction_panel,
     get_support_confirmation_keyboard, get_contact_support_keyboard, get_help_section_keyboard,
-    get_credit_handler_panel, get_buy_credit_management_panel, get_buy_credit_setup_panel
+    get_credit_handler_panel, get_buy_credit_management_panel, get_buy_credit_setup_panel,
+    get_audio_format_panel, get_tts_text_options, get_voice_preview_panel
 )
-from tts_service import TTSService
+from tts_service import TTSService, TTSDeadlineExceeded
+from tts_scheduler import tts_scheduler, TTSQueueFull
+from executors import executors, run_blocking, Pool
+from audio_output import audio_output, DeliveryFormat
+from audio_cache import make_text_hash
+from mp3_frames import mp3_duration
+from voice_preview import VoicePreviews, VOICE_PREVIEWS_ENABLED
+from latency_metrics import latency_metrics, Stage
+from structured_logging import configure_logging, get_logger
+from long_document import LongDocumentWorker, LongDocumentError, create_job, cancel_job, get_active_job, get_cancel_keyboard, chunk_credits, LONG_DOC_MAX_CHARS, LONG_DOC_MAX_FILE_BYTES, LONG_DOC_CHUNK_CHARS
+from text_chunker import split_text_chunks
+from bulk_tts import is_bulk_file, parse_bulk_lines, split_bulk_batches, run_bulk_tts, build_bulk_archives, BulkInputError, BULK_CONCURRENCY, BULK_MAX_FILE_BYTES, BULK_MAX_LINES, BULK_MAX_ARCHIVE_BYTES
 from referral_system import get_user_referral_link, get_user_referral_stats, process_referral
 from message_deletion import (
     initialize_deletion_service, get_deletion_service,
@@ -43,13 +57,22 @@ API_HASH = os.getenv('API_HASH', '')
 OWNER_ID = int(os.getenv('OWNER_ID', '0'))
 CHANNEL_ID = os.getenv('CHANNEL_ID')  # Channel for admin data and payment requests
 
+# Structured logging (structlog) for this module and every logging.getLogger() module
+configure_logging()
+logger = get_logger(__name__)
+
 # Initialize bot and services
 app = Client("tts_bot", api_id=API_ID, api_hash=API_HASH, bot_token=BOT_TOKEN)
 tts_service = TTSService()
+voice_previews = VoicePreviews(tts_service)
+long_document_worker = LongDocumentWorker(app, tts_service)
 
 # User states for TTS
 user_states = {}
 
+# Texts at least this long are delivered progressively in parts
+PROGRESSIVE_MIN_CHARS = int(os.getenv('TTS_PROGRESSIVE_MIN_CHARS', '600'))
+
 # Connected channel for notifications (runtime variable)
 connected_channel_id = None
 
@@ -161,7 +184,7 @@ async def create_and_send_db_backup():
             main_backup_name = f"main_bot_backup_{timestamp}.sql"
             try:
                 # Use secure pg_dump function to prevent credential exposure
-                success, error_msg = secure_pg_dump(database_url, main_backup_name)
+                success, error_msg = await run_blocking(Pool.FILE_IO, secure_pg_dump, database_url, main_backup_name)
                 
                 if success and os.path.exists(main_backup_name):
                     file_size = os.path.getsize(main_backup_name)
@@ -189,7 +212,7 @@ async def create_and_send_db_backup():
             
             try:
                 if os.path.exists(sqlite_file) and os.path.getsize(sqlite_file) > 0:
-                    shutil.copy(sqlite_file, main_backup_name)
+                    await run_blocking(Pool.FILE_IO, shutil.copy, sqlite_file, main_backup_name)
                     backup_files.append(main_backup_name)
                     file_size = os.path.getsize(sqlite_file)
                     size_kb = file_size / 1024
@@ -210,7 +233,7 @@ async def create_and_send_db_backup():
             if os.path.exists(credit_history_file):
                 file_size = os.path.getsize(credit_history_file)
                 if file_size > 0:
-                    shutil.copy(credit_history_file, credit_backup_name)
+                    await run_blocking(Pool.FILE_IO, shutil.copy, credit_history_file, credit_backup_name)
                     backup_files.append(credit_backup_name)
                     size_kb = file_size / 1024
                     backup_info.append(f"📊 **Credit History:** {size_kb:.1f} KB")
@@ -355,11 +378,12 @@ class UserState:
     WAITING_QR_CODE_FILE = 32 # New state for QR code file upload
     WAITING_UPI_ID_ONLY = 33 # New state for UPI ID only input
     WAITING_QR_UPI_SETUP = 34 # New state for setting up both QR and UPI
+    WAITING_LONG_DOCUMENT = 35 # New state for long document text/.txt upload
 
 def get_user_from_db(user_id: int) -> User:
     """Get or create user from database with enhanced error handling"""
     if not isinstance(user_id, int) or user_id <= 0:
-        print(f"Invalid user_id provided: {user_id}")
+        logger.warning("invalid_user_id", user_id=user_id)
         return User(user_id=user_id or 0, is_active=True, credits=10.0)
 
     db = None
@@ -371,15 +395,15 @@ def get_user_from_db(user_id: int) -> User:
             db.add(user)
             db.commit()
             db.refresh(user)
-            print(f"Created new user: {user_id}")
+            logger.info("user_created", user_id=user_id)
         return user
     except Exception as e:
-        print(f"Database error in get_user_from_db for user {user_id}: {e}")
+        logger.error("get_user_db_error", user_id=user_id, error=str(e))
         if db:
             try:
                 db.rollback()
             except Exception as rollback_error:
-                print(f"Error during rollback: {rollback_error}")
+                logger.error("get_user_rollback_error", user_id=user_id, error=str(rollback_error))
         # Return a default user object if database fails
         return User(user_id=user_id, is_active=True, credits=10.0)
     finally:
@@ -387,12 +411,12 @@ def get_user_from_db(user_id: int) -> User:
             try:
                 db.close()
             except Exception as close_error:
-                print(f"Error closing database connection: {close_error}")
+                logger.error("get_user_close_error", user_id=user_id, error=str(close_error))
 
 def update_user_info(message: Message):
     """Update user information in database with enhanced error handling"""
     if not message or not message.from_user or not message.from_user.id:
-        print("Invalid message or user data provided to update_user_info")
+        logger.warning("update_user_info_invalid_message")
         return
 
     db = None
@@ -408,25 +432,25 @@ def update_user_info(message: Message):
                 user.last_active = datetime.utcnow()
                 db.commit()
             except UnicodeError as unicode_error:
-                print(f"Unicode error updating user info: {unicode_error}")
+                logger.warning("update_user_info_unicode_error", user_id=message.from_user.id, error=str(unicode_error))
                 # Use safe defaults if unicode fails
                 user.first_name = "User"
                 user.last_name = None
                 user.last_active = datetime.utcnow()
                 db.commit()
     except Exception as e:
-        print(f"Error updating user info for user {message.from_user.id}: {e}")
+        logger.error("update_user_info_error", user_id=message.from_user.id, error=str(e))
         if db:
             try:
                 db.rollback()
             except Exception as rollback_error:
-                print(f"Error during rollback in update_user_info: {rollback_error}")
+                logger.error("update_user_info_rollback_error", user_id=message.from_user.id, error=str(rollback_error))
     finally:
         if db:
             try:
                 db.close()
             except Exception as close_error:
-                print(f"Error closing database in update_user_info: {close_error}")
+                logger.error("update_user_info_close_error", error=str(close_error))
 
 def log_credit_transaction(user_id: int, amount: float, transaction_type: str, description: str = None):
     """Log credit transaction for tracking with enhanced error handling"""
@@ -809,7 +833,7 @@ async def start_command(client: Client, message: Message):
         if param.startswith("credit_"):
             from free_credit import on_credit_link_click
             token = param.replace("credit_", "")
-            result_message = on_credit_link_click(token)
+            result_message = await run_blocking(Pool.DB, on_credit_link_click, token)
             await message.reply(result_message)
             return
         elif param.startswith("ref_"):
@@ -931,6 +955,36 @@ async def start_command(client: Client, message: Message):
                 reply_markup=get_user_panel()
             )
 
+def write_transactions_csv(user_transactions) -> str:
+    """Write a user's credit history to a temporary CSV file and return its path (runs on the file-io pool)"""
+    import csv
+    import tempfile
+
+    temp_file = tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.csv', encoding='utf-8')
+    csv_writer = csv.writer(temp_file)
+    
+    # Write CSV headers
+    csv_writer.writerow([
+        'Transaction ID', 'Date & Time', 'Amount', 'Type', 'Source', 
+        'Description', 'Balance Before', 'Balance After'
+    ])
+    
+    # Write transaction data
+    for trans in user_transactions:
+        csv_writer.writerow([
+            trans.transaction_id or 'N/A',
+            trans.timestamp.strftime('%d/%m/%Y %H:%M:%S') if trans.timestamp else 'N/A',
+            f"{trans.amount:.2f}",
+            trans.transaction_type or 'N/A',
+            trans.source or 'N/A',
+            trans.description or 'N/A',
+            f"{trans.balance_before:.2f}",
+            f"{trans.balance_after:.2f}"
+        ])
+    
+    temp_file.close()
+    return temp_file.name
+
 @app.on_callback_query()
 async def callback_handler(client: Client, callback_query: CallbackQuery):
     """Handle all callback queries"""
@@ -1089,6 +1143,24 @@ async def callback_handler(client: Client, callback_query: CallbackQuery):
             
             # System uptime
             uptime_text = "System running normally"
+
+            # TTS queue metrics
+            queue_stats = tts_scheduler.get_stats()
+
+            # Per-stage latency (rolling p50/p95/p99) and slowest voices by first audio byte
+            latency_text = ""
+            for stage, stage_stats in latency_metrics.get_stats().items():
+                latency_text += f"• {stage}: {stage_stats['p50_ms']:.0f}/{stage_stats['p95_ms']:.0f}/{stage_stats['p99_ms']:.0f}ms (n={stage_stats['count']})\n"
+            if not latency_text:
+                latency_text = "• Abhi koi TTS request measure nahi hui\n"
+            voice_latency = [
+                (voice, stages[Stage.FIRST_BYTE])
+                for voice, stages in latency_metrics.get_voice_stats().items()
+                if Stage.FIRST_BYTE in stages
+            ]
+            voice_latency.sort(key=lambda item: item[1]['p95_ms'], reverse=True)
+            for voice, stage_stats in voice_latency[:5]:
+                latency_text += f"🎙️ {voice} first byte: {stage_stats['p50_ms']:.0f}/{stage_stats['p95_ms']:.0f}/{stage_stats['p99_ms']:.0f}ms\n"
             
             db.close()
             
@@ -1144,7 +1216,18 @@ async def callback_handler(client: Client, callback_query: CallbackQuery):
                 f"🔥 **User Retention:** {(week_users/total_users*100 if total_users > 0 else 0):.1f}% weekly\n"
                 f"⚡ **Daily Growth:** +{today_users - week_users + today_users if week_users > 0 else 0} new today\n"
                 f"💡 **TTS Adoption:** {(total_tts_requests > 0)}, {total_users} users tried TTS\n"
-                f"🎯 **Revenue/User:** ₹{(total_revenue/confirmed_payments if confirmed_payments > 0 else 0):.0f} avg\n"
+                f"🎯 **Revenue/User:** ₹{(total_revenue/confirmed_payments if confirmed_payments > 0 else 0):.0f} avg\n\n"
+                f"━━━━━━━━━━━━━━━━━━━━━━\n"
+                f"🚦 **TTS QUEUE:**\n"
+                f"━━━━━━━━━━━━━━━━━━━━━━\n"
+                f"⚙️ **In Flight:** {queue_stats['in_flight']}/{queue_stats['max_in_flight']} (per user: {queue_stats['per_user_limit']})\n"
+                f"📥 **Queue Depth:** {queue_stats['queue_depth']} (max seen: {queue_stats['max_queue_depth_seen']})\n"
+                f"⏱️ **Wait:** avg {queue_stats['avg_wait_ms']:.0f}ms • p95 {queue_stats['p95_wait_ms']:.0f}ms\n"
+                f"🚫 **Rejected:** {queue_stats['rejected']}\n\n"
+                f"━━━━━━━━━━━━━━━━━━━━━━\n"
+                f"⏱️ **TTS LATENCY (p50/p95/p99):**\n"
+                f"━━━━━━━━━━━━━━━━━━━━━━\n"
+                f"{latency_text}"
                 f"{top_users_text}\n"
                 f"━━━━━━━━━━━━━━━━━━━━━━\n"
                 "✅ **Status: All Systems Operational** ✅\n"
@@ -1599,9 +1682,67 @@ async def callback_handler(client: Client, callback_query: CallbackQuery):
             reply_markup=get_voice_selection()
         )
 
+    elif data == "audio_format_menu":
+        current_format = get_audio_format(user_id)
+        await callback_query.edit_message_text(
+            "🎧 **Output Format**\n\n"
+            "🎙️ **Voice Note:** Chhoti file (Opus), mobile par fast upload/download\n"
+            "🎵 **Audio File:** MP3 file, kisi bhi player me chalegi\n\n"
+            f"✅ **Current:** {'Voice Note' if current_format == DeliveryFormat.VOICE else 'Audio File (MP3)'}",
+            reply_markup=get_audio_format_panel(current_format, is_owner=(user_id == OWNER_ID))
+        )
+
+    elif data in ("audio_format_voice", "audio_format_audio"):
+        new_format = DeliveryFormat.VOICE if data == "audio_format_voice" else DeliveryFormat.AUDIO
+        if set_audio_format(user_id, new_format):
+            await callback_query.answer(
+                "✅ Ab aapko voice note milega!" if new_format == DeliveryFormat.VOICE else "✅ Ab aapko MP3 audio file milegi!"
+            )
+        else:
+            await callback_query.answer("❌ Setting save nahi hui, kripaya dobara try kare.", show_alert=True)
+        await callback_query.edit_message_text(
+            "🎧 **Output Format**\n\n"
+            "🎙️ **Voice Note:** Chhoti file (Opus), mobile par fast upload/download\n"
+            "🎵 **Audio File:** MP3 file, kisi bhi player me chalegi\n\n"
+            f"✅ **Current:** {'Voice Note' if new_format == DeliveryFormat.VOICE else 'Audio File (MP3)'}",
+            reply_markup=get_audio_format_panel(new_format, is_owner=(user_id == OWNER_ID))
+        )
+
+    elif data == "preview_menu":
+        await callback_query.edit_message_text(
+            "🔊 **Voice Preview**\n\n"
+            "Kisi bhi voice ka chhota sample suno - bilkul free, koi credit nahi katega.\n"
+            "Pasand aane par Back dabakar wahi voice select karo:",
+            reply_markup=get_voice_preview_panel(voice_previews.voice_list(), is_owner=(user_id == OWNER_ID))
+        )
+
+    elif data.startswith("preview_"):
+        voice_type = data.replace("preview_", "")
+        if voice_type not in tts_service.voice_mapping:
+            await callback_query.answer("❌ Ye voice available nahi hai.", show_alert=True)
+            return
+        await callback_query.answer("🔊 Preview bhej rahe hai...")
+        try:
+            preview_msg = await voice_previews.send(callback_query.message, voice_type)
+        except Exception as e:
+            logger.warning("voice_preview_send_failed", voice_type=voice_type, error=str(e))
+            preview_msg = None
+        if preview_msg:
+            await track_sent_message(
+                preview_msg,
+                message_type=MessageType.TTS_RESULT,
+                user_id=user_id,
+                custom_delay=60,
+                context="voice_preview"
+            )
+        else:
+            await callback_query.message.reply("❌ Preview abhi ready nahi hai, thodi der baad try kare.")
+
     elif data.startswith("voice_"):
         voice_type = data.replace("voice_", "")
         user_states[user_id] = {'state': UserState.WAITING_TTS_TEXT, 'voice': voice_type}
+        # The user is reading the prompt now: open the synthesis connection before their text arrives
+        tts_service.warm_up(user_id, voice_type)
 
         voice_names = {
             'male1': 'Male Voice 1 (Deep)', 'male2': 'Male Voice 2 (Calm)',
@@ -1616,17 +1757,51 @@ async def callback_handler(client: Client, callback_query: CallbackQuery):
             await callback_query.edit_message_text(
                 f"🎤 **Owner TTS - {voice_names.get(voice_type, 'Unknown')}**\n\n"
                 "Kripaya अपना text bheje (Maximum 3000 characters):\n\n"
+                f"📦 **Bulk:** .txt/.csv file bhejo (har line ek audio, max {BULK_MAX_LINES} lines) - ZIP milega\n"
+                "📚 **Long Document:** 3000+ characters ke liye neeche button dabao\n\n"
                 "⭐ **Owner:** Free unlimited access",
-                reply_markup=get_back_to_owner()
+                reply_markup=get_tts_text_options(is_owner=True)
             )
         else:
             await callback_query.edit_message_text(
                 f"🎤 **TTS - {voice_names.get(voice_type, 'Unknown')}**\n\n"
                 "Kripaya अपना text bheje (Maximum 3000 characters):\n\n"
+                f"📦 **Bulk:** .txt/.csv file bhejo (har line ek audio, max {BULK_MAX_LINES} lines) - ZIP milega\n"
+                "📚 **Long Document:** 3000+ characters ke liye neeche button dabao\n\n"
                 "💰 **Charges:** 0.05 credits per word",
-                reply_markup=get_back_to_user()
+                reply_markup=get_tts_text_options()
             )
 
+    elif data == "long_doc_mode":
+        tts_state = user_states.get(user_id)
+        voice_type = tts_state.get('voice', 'male1') if isinstance(tts_state, dict) else 'male1'
+        user_states[user_id] = {'state': UserState.WAITING_LONG_DOCUMENT, 'voice': voice_type}
+        await callback_query.edit_message_text(
+            "📚 **Long Document Mode**\n\n"
+            f"📄 .txt file bhejo ya text message bhejo (maximum {LONG_DOC_MAX_CHARS} characters).\n\n"
+            f"🧩 Audio {LONG_DOC_CHUNK_CHARS} characters ke parts me, sahi order me aayega\n"
+            "💰 Har part ke credits uske bhejne par hi katenge\n"
+            "⏸️ Credits khatam hone par job ruk jayega aur top-up ke baad apne aap continue hoga\n"
+            "🔁 Bot restart hone par bhi job wahi se continue hoga",
+            reply_markup=get_back_to_owner() if user_id == OWNER_ID else get_back_to_user()
+        )
+
+    elif data.startswith("long_doc_cancel_"):
+        try:
+            job_id = int(data.replace("long_doc_cancel_", ""))
+        except ValueError:
+            await callback_query.answer("❌ Invalid job!", show_alert=True)
+            return
+        if await run_blocking(Pool.DB, cancel_job, job_id, user_id):
+            await callback_query.answer("✅ Job cancel ho gaya!")
+            try:
+                await callback_query.edit_message_text("❌ **Long Document job cancel ho gaya.**\n\nJo parts bhej diye gaye unke hi credits kate hai.")
+            except Exception:
+                pass
+            long_document_worker.notify()
+        else:
+            await callback_query.answer("ℹ️ Ye job already complete ya cancel ho chuka hai.", show_alert=True)
+
     elif data == "user_profile":
         user = get_user_from_db(user_id)
         db = SessionLocal()
@@ -1734,8 +1909,8 @@ async def callback_handler(client: Client, callback_query: CallbackQuery):
         try:
             from free_credit import on_free_credit_button
             
-            # Get free credit link from the free_credit.py module
-            link, message = on_free_credit_button(user_id)
+            # Get free credit link from the free_credit.py module (may call the shortener API over HTTP)
+            link, message = await run_blocking(Pool.NETWORK_IO, on_free_credit_button, user_id)
             
             if link:
                 await callback_query.edit_message_text(
@@ -1842,17 +2017,13 @@ async def callback_handler(client: Client, callback_query: CallbackQuery):
 
     elif data == "download_transactions":
         try:
-            import csv
-            import tempfile
-            from pyrogram.types import InputMediaDocument
-            
             # Get user transactions from credit_history
             db_credit = get_credit_history_db()
             from credit_history import CreditHistory
             
-            user_transactions = db_credit.query(CreditHistory).filter(
+            user_transactions = await run_blocking(Pool.DB, db_credit.query(CreditHistory).filter(
                 CreditHistory.user_id == user_id
-            ).order_by(CreditHistory.timestamp.desc()).all()
+            ).order_by(CreditHistory.timestamp.desc()).all)
             
             if not user_transactions:
                 await callback_query.edit_message_text(
@@ -1866,29 +2037,7 @@ async def callback_handler(client: Client, callback_query: CallbackQuery):
                 return
             
             # Create temporary CSV file
-            temp_file = tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.csv', encoding='utf-8')
-            csv_writer = csv.writer(temp_file)
-            
-            # Write CSV headers
-            csv_writer.writerow([
-                'Transaction ID', 'Date & Time', 'Amount', 'Type', 'Source', 
-                'Description', 'Balance Before', 'Balance After'
-            ])
-            
-            # Write transaction data
-            for trans in user_transactions:
-                csv_writer.writerow([
-                    trans.transaction_id or 'N/A',
-                    trans.timestamp.strftime('%d/%m/%Y %H:%M:%S') if trans.timestamp else 'N/A',
-                    f"{trans.amount:.2f}",
-                    trans.transaction_type or 'N/A',
-                    trans.source or 'N/A',
-                    trans.description or 'N/A',
-                    f"{trans.balance_before:.2f}",
-                    f"{trans.balance_after:.2f}"
-                ])
-            
-            temp_file.close()
+            csv_path = await run_blocking(Pool.FILE_IO, write_transactions_csv, user_transactions)
             
             # Send file to user
             current_time = datetime.now().strftime('%d-%m-%Y_%H-%M')
@@ -1904,7 +2053,7 @@ async def callback_handler(client: Client, callback_query: CallbackQuery):
             # Send the file
             await app.send_document(
                 user_id,
-                temp_file.name,
+                csv_path,
                 file_name=filename,
                 caption=(
                     f"📄 **Your Transaction History**\n\n"
@@ -1922,7 +2071,7 @@ async def callback_handler(client: Client, callback_query: CallbackQuery):
             
             # Clean up temporary file
             import os
-            os.unlink(temp_file.name)
+            os.unlink(csv_path)
             
             await callback_query.edit_message_text(
                 f"✅ **Transaction File Sent!**\n\n"
@@ -2448,7 +2597,7 @@ async def callback_handler(client: Client, callback_query: CallbackQuery):
     
     # Transaction History Handlers
     elif data == "transaction_history":
-        summary = transaction_manager.get_today_transactions_summary()
+        summary = await run_blocking(Pool.DB, transaction_manager.get_today_transactions_summary)
         
         await callback_query.edit_message_text(
             f"📊 **Today's Transactions Summary**\n\n"
@@ -2466,11 +2615,13 @@ async def callback_handler(client: Client, callback_query: CallbackQuery):
     elif data == "tx_today":
         from datetime import datetime, timedelta
         import os
-        transactions = transaction_manager.get_transactions_by_date_range(
+        transactions = await run_blocking(
+            Pool.DB,
+            transaction_manager.get_transactions_by_date_range,
             datetime.combine(datetime.utcnow().date(), datetime.min.time())
         )
         filename = f"transactions_today_{datetime.now().strftime('%Y%m%d_%H%M')}.csv"
-        filepath = transaction_manager.create_transaction_file(transactions, filename)
+        filepath = await run_blocking(Pool.FILE_IO, transaction_manager.create_transaction_file, transactions, filename)
         
         if filepath and os.path.exists(filepath):
             await callback_query.answer("📄 Generating today's transaction file...", show_alert=True)
@@ -2487,9 +2638,9 @@ async def callback_handler(client: Client, callback_query: CallbackQuery):
     elif data == "tx_yesterday":
         from datetime import datetime, timedelta
         import os
-        transactions = transaction_manager.get_yesterday_transactions()
+        transactions = await run_blocking(Pool.DB, transaction_manager.get_yesterday_transactions)
         filename = f"transactions_yesterday_{datetime.now().strftime('%Y%m%d_%H%M')}.csv"
-        filepath = transaction_manager.create_transaction_file(transactions, filename)
+        filepath = await run_blocking(Pool.FILE_IO, transaction_manager.create_transaction_file, transactions, filename)
         
         if filepath and os.path.exists(filepath):
             await callback_query.answer("📄 Generating yesterday's transaction file...", show_alert=True)
@@ -2506,9 +2657,9 @@ async def callback_handler(client: Client, callback_query: CallbackQuery):
     elif data == "tx_last_week":
         from datetime import datetime, timedelta
         import os
-        transactions = transaction_manager.get_last_week_transactions()
+        transactions = await run_blocking(Pool.DB, transaction_manager.get_last_week_transactions)
         filename = f"transactions_last_week_{datetime.now().strftime('%Y%m%d_%H%M')}.csv"
-        filepath = transaction_manager.create_transaction_file(transactions, filename)
+        filepath = await run_blocking(Pool.FILE_IO, transaction_manager.create_transaction_file, transactions, filename)
         
         if filepath and os.path.exists(filepath):
             await callback_query.answer("📄 Generating last week's transaction file...", show_alert=True)
@@ -2525,9 +2676,9 @@ async def callback_handler(client: Client, callback_query: CallbackQuery):
     elif data == "tx_last_month":
         from datetime import datetime, timedelta
         import os
-        transactions = transaction_manager.get_last_month_transactions()
+        transactions = await run_blocking(Pool.DB, transaction_manager.get_last_month_transactions)
         filename = f"transactions_last_month_{datetime.now().strftime('%Y%m%d_%H%M')}.csv"
-        filepath = transaction_manager.create_transaction_file(transactions, filename)
+        filepath = await run_blocking(Pool.FILE_IO, transaction_manager.create_transaction_file, transactions, filename)
         
         if filepath and os.path.exists(filepath):
             await callback_query.answer("📄 Generating last month's transaction file...", show_alert=True)
@@ -2555,9 +2706,9 @@ async def callback_handler(client: Client, callback_query: CallbackQuery):
         if user_id in user_states and user_states[user_id].get('first_date'):
             import os
             first_date = user_states[user_id]['first_date']
-            transactions = transaction_manager.get_transactions_by_date_range(first_date)
+            transactions = await run_blocking(Pool.DB, transaction_manager.get_transactions_by_date_range, first_date)
             filename = f"transactions_custom_{first_date.strftime('%Y%m%d')}_{datetime.now().strftime('%H%M')}.csv"
-            filepath = transaction_manager.create_transaction_file(transactions, filename)
+            filepath = await run_blocking(Pool.FILE_IO, transaction_manager.create_transaction_file, transactions, filename)
             
             if filepath and os.path.exists(filepath):
                 await app.send_document(
@@ -2827,6 +2978,7 @@ async def callback_handler(client: Client, callback_query: CallbackQuery):
     elif data.startswith("tts_lang_"):
         lang = data.replace("tts_lang_", "")
         user_states[user_id] = {'state': UserState.WAITING_TTS_TEXT, 'lang': lang, 'voice': 'male1'}
+        tts_service.warm_up(user_id, 'male1')
 
         lang_names = {'hi': 'Hindi', 'en': 'English', 'es': 'Spanish', 'fr': 'French', 'de': 'German'}
 
@@ -2834,6 +2986,7 @@ async def callback_handler(client: Client, callback_query: CallbackQuery):
             await callback_query.edit_message_text(
                 f"🎤 **Owner TTS - {lang_names.get(lang, 'Unknown')}**\n\n"
                 "Kripaya अपना text bheje (Maximum 3000 characters):\n\n"
+                f"📦 **Bulk:** .txt/.csv file bhejo (har line ek audio, max {BULK_MAX_LINES} lines) - ZIP milega\n\n"
                 "⭐ **Owner:** Free unlimited access",
                 reply_markup=get_back_to_owner()
             )
@@ -2841,6 +2994,7 @@ async def callback_handler(client: Client, callback_query: CallbackQuery):
             await callback_query.edit_message_text(
                 f"🎤 **TTS - {lang_names.get(lang, 'Unknown')}**\n\n"
                 "Kripaya अपना text bheje (Maximum 3000 characters):\n\n"
+                f"📦 **Bulk:** .txt/.csv file bhejo (har line ek audio, max {BULK_MAX_LINES} lines) - ZIP milega\n\n"
                 "💰 **Charges:** 0.05 credits per word",
                 reply_markup=get_back_to_user()
             )
@@ -3138,6 +3292,196 @@ async def callback_handler(client: Client, callback_query: CallbackQuery):
         )
 
 
+async def send_tts_audio(message: Message, audio_data, caption: str, title: str = "TTS Audio", delivery_format: str = DeliveryFormat.AUDIO, voice: str = None) -> Message:
+    """Send TTS audio as an MP3 audio file, or as an OGG/Opus voice note when the user prefers it"""
+    audio_data.seek(0)
+    audio_msg = None
+    if delivery_format == DeliveryFormat.VOICE:
+        voice_note = await audio_output.to_voice_note(audio_data)
+        if voice_note:
+            voice_data, duration = voice_note
+            with latency_metrics.measure(Stage.UPLOAD, voice):
+                audio_msg = await message.reply_voice(voice_data, caption=caption, duration=duration)
+        else:
+            audio_data.seek(0)
+
+    if audio_msg is None:
+        # Joined audio carries an Info frame with its frame count, so this is a header read, not a scan
+        with audio_data.getbuffer() as audio_view:
+            duration = int(round(mp3_duration(audio_view)))
+        with latency_metrics.measure(Stage.UPLOAD, voice):
+            audio_msg = await message.reply_audio(audio_data, caption=caption, title=title, duration=duration)
+
+    # Track TTS audio result - keep longer for user to download
+    await track_sent_message(
+        audio_msg,
+        message_type=MessageType.TTS_RESULT,
+        user_id=message.from_user.id,
+        custom_delay=120,  # Keep for 2 minutes
+        context="tts_result"
+    )
+    return audio_msg
+
+async def remember_tts_file_id(audio_msg: Message, audio_data, text: str, voice_type: str):
+    """Store the Telegram file_id of a sent TTS result so repeats can be re-sent without uploading"""
+    # Only primary-voice audio is reusable; fallback / hedged audio used a different voice
+    if not audio_msg or not getattr(audio_data, 'cacheable', False):
+        return
+    media = audio_msg.voice or audio_msg.audio
+    if not media:
+        return
+    # Record the format actually delivered (voice notes fall back to MP3 if transcoding fails)
+    delivered_format = DeliveryFormat.VOICE if audio_msg.voice else DeliveryFormat.AUDIO
+    await run_blocking(
+        Pool.DB,
+        store_cached_file_id,
+        tts_service.get_voice_id(voice_type),
+        make_text_hash(text),
+        delivered_format,
+        media.file_id,
+        media.file_size
+    )
+
+async def send_cached_tts_audio(message: Message, text: str, voice_type: str, caption: str, delivery_format: str = DeliveryFormat.AUDIO) -> bool:
+    """Re-send previously uploaded TTS audio by file_id (no synthesis, zero upload bytes)"""
+    voice_id = tts_service.get_voice_id(voice_type)
+    text_hash = make_text_hash(text)
+    file_id = await run_blocking(Pool.DB, get_cached_file_id, voice_id, text_hash, delivery_format)
+    if not file_id:
+        return False
+
+    try:
+        if delivery_format == DeliveryFormat.VOICE:
+            audio_msg = await message.reply_voice(file_id, caption=caption)
+        else:
+            audio_msg = await message.reply_audio(file_id, caption=caption)
+    except BadRequest as e:
+        # file_id no longer accepted by Telegram (expired reference, invalid id, ...) - drop it and regenerate
+        logger.info("file_id_invalidated", voice=voice_id, error=str(e))
+        await run_blocking(Pool.DB, invalidate_cached_file_id, voice_id, text_hash, delivery_format)
+        return False
+    except Exception as e:
+        logger.warning("file_id_send_failed", voice=voice_id, error=str(e))
+        return False
+
+    logger.debug("file_id_resent", voice=voice_id)
+    await track_sent_message(
+        audio_msg,
+        message_type=MessageType.TTS_RESULT,
+        user_id=message.from_user.id,
+        custom_delay=120,  # Keep for 2 minutes
+        context="tts_result"
+    )
+    return True
+
+async def send_progressive_tts(message: Message, text: str, voice_type: str, caption: str, processing_msg: Message, delivery_format: str = DeliveryFormat.AUDIO) -> tuple:
+    """
+    Send long-text TTS as ordered audio parts, the first one as soon as it is synthesized
+
+    If the stream fails after some parts were sent, the rest of the text is synthesized
+    in one go on the regular path (with its fallbacks) and sent as a last part. If that
+    fails too, the user is told which parts arrived.
+
+    Returns:
+        (audio_sent, words_delivered): words_delivered is what the user is billed for
+    """
+    parts_sent = 0
+    total_parts = 0
+    delivered_end = 0
+    try:
+        async for part_number, total_parts, audio_data, text_end in tts_service.stream_text_to_speech(text, voice_type):
+            audio_msg = await send_tts_audio(
+                message,
+                audio_data,
+                caption=caption if total_parts == 1 else f"{caption}\n🧩 **Part:** {part_number}/{total_parts}",
+                title="TTS Audio" if total_parts == 1 else f"TTS Audio - Part {part_number}",
+                delivery_format=delivery_format,
+                voice=tts_service.get_voice_id(voice_type)
+            )
+            parts_sent += 1
+            delivered_end = text_end
+            if total_parts == 1:
+                await remember_tts_file_id(audio_msg, audio_data, text, voice_type)
+
+            if part_number < total_parts:
+                try:
+                    await processing_msg.edit_text(f"📶 Part {part_number}/{total_parts} bhej diya, baaki audio ban raha hai...")
+                except Exception:
+                    pass
+        return True, len(text.split())
+    except Exception as e:
+        logger.warning("progressive_tts_error", voice_type=voice_type, parts_sent=parts_sent, total_parts=total_parts, error=str(e))
+        if isinstance(e, TTSDeadlineExceeded):
+            if parts_sent == 0:
+                raise  # Budget spent: tell the user now instead of starting a second synthesis
+            deadline_spent = True
+        else:
+            deadline_spent = False
+
+    if parts_sent == 0:
+        # Nothing delivered yet - fall back to the regular single-file path
+        audio_data = await tts_service.text_to_speech_with_voice(text, voice_type)
+        if audio_data:
+            audio_data.name = "tts_audio.mp3"
+            audio_msg = await send_tts_audio(message, audio_data, caption, delivery_format=delivery_format, voice=tts_service.get_voice_id(voice_type))
+            await remember_tts_file_id(audio_msg, audio_data, text, voice_type)
+            return True, len(text.split())
+        return False, 0
+
+    # Parts cover text in order, so the undelivered rest is the source after the last delivered part
+    words = text.split()
+    delivered_words = len(text[:delivered_end].split())
+    remaining_text = text[delivered_end:].strip()
+    if remaining_text and not deadline_spent:
+        try:
+            audio_data = await tts_service.text_to_speech_with_voice(remaining_text, voice_type)
+        except Exception as e:
+            logger.warning("progressive_tts_resume_failed", voice_type=voice_type, parts_sent=parts_sent, error=str(e))
+            audio_data = None
+        if audio_data:
+            audio_data.name = "tts_audio.mp3"
+            await send_tts_audio(
+                message,
+                audio_data,
+                caption=f"{caption}\n🧩 **Part:** {parts_sent + 1}/{parts_sent + 1} (baaki text)",
+                title=f"TTS Audio - Part {parts_sent + 1}",
+                delivery_format=delivery_format,
+                voice=tts_service.get_voice_id(voice_type)
+            )
+            logger.info("progressive_tts_resumed", voice_type=voice_type, parts_sent=parts_sent, words=len(words) - delivered_words)
+            return True, len(words)
+
+    notice = await message.reply(
+        f"⚠️ **Audio adhoora reh gaya!**\n"
+        f"🧩 Part 1-{parts_sent} (of {total_parts}) bhej diye, baaki text ka audio nahi ban paya.\n"
+        f"📝 {delivered_words}/{len(words)} words ka audio mila - charge sirf inhi ka hoga."
+    )
+    await track_sent_message(notice, message_type=MessageType.ERROR, user_id=message.from_user.id, custom_delay=300, context="tts_partial")
+    return True, delivered_words
+
+def charge_tts_request(user_id: int, text: str, credits_needed: float):
+    """Deduct credits for a delivered TTS request and log it; returns the remaining balance (None if the user is missing)"""
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.user_id == user_id).first()
+        if user:
+            user.credits = float(user.credits) - credits_needed
+
+        # Log request
+        db.add(TTSRequest(
+            user_id=user_id,
+            text=text,
+            language='hi',
+            credits_used=credits_needed
+        ))
+        db.commit()
+        return float(user.credits) if user else None
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
 @app.on_message(filters.text & ~filters.command(["start", "/cancel"])) # Added /cancel command
 async def handle_text(client: Client, message: Message):
     """Handle text messages based on user state"""
@@ -3150,13 +3494,16 @@ async def handle_text(client: Client, message: Message):
 
     if isinstance(user_state_data, dict) and user_state_data.get('state') == UserState.WAITING_TTS_TEXT:
         # Handle TTS request
+        request_start = time.perf_counter()
         try:
             text = message.text.strip()
             voice_type = user_state_data.get('voice', 'male1')
+            voice_id = tts_service.get_voice_id(voice_type or 'male1')
+            tts_service.end_warm_up(user_id)
 
             # Check text length
             if len(text) > 3000:
-                await message.reply("❌ Text bahut lamba hai! Maximum 3000 characters allowed hai.")
+                await message.reply("❌ Text bahut lamba hai! Maximum 3000 characters allowed hai.\n📚 Lambe text ke liye voice select karke **Long Document** mode use kare.")
                 user_states.pop(user_id, None)
                 return
 
@@ -3171,7 +3518,8 @@ async def handle_text(client: Client, message: Message):
 
             # Check user credits (only for non-owners)
             if user_id != OWNER_ID:
-                user = get_user_from_db(user_id)
+                with latency_metrics.measure(Stage.CREDIT_CHECK, voice_id):
+                    user = await run_blocking(Pool.DB, get_user_from_db, user_id)
                 if user.credits < credits_needed:
                     error_msg = await message.reply(f"❌ Credits kam hai! Aapko {credits_needed:.2f} credits chahiye lekin aapke paas {user.credits:.2f} hai")
                     # Track error message for quick deletion
@@ -3210,34 +3558,60 @@ async def handle_text(client: Client, message: Message):
             voice_type = user_state_data.get('voice', 'male1')
             lang = user_state_data.get('lang', 'hi')
 
-            # Use voice-specific TTS if voice is selected, otherwise use language-based
-            if voice_type and voice_type != 'male1':
-                audio_data = await tts_service.text_to_speech_with_voice(text, voice_type)
-            else:
-                audio_data = await tts_service.text_to_speech(text, lang)
-
-            if audio_data:
-                # Reset buffer position and add name attribute
-                audio_data.seek(0)
-                audio_data.name = "tts_audio.mp3"
-
-                # Send audio file
-                audio_msg = await message.reply_audio(
-                    audio_data,
-                    caption=f"🎤 **Text:** {text[:50]}{'...' if len(text) > 50 else ''}\n🌐 **Language:** {lang.upper()}\n{'💰 **Cost:** ' + str(credits_needed) + ' credits' if user_id != OWNER_ID else '⭐ **Owner Access**'}",
-                    title="TTS Audio"
-                )
-                # Track TTS audio result - keep longer for user to download
-                await track_sent_message(
-                    audio_msg,
-                    message_type=MessageType.TTS_RESULT,
-                    user_id=user_id,
-                    custom_delay=120,  # Keep for 2 minutes
-                    context="tts_result"
+            delivery_format = await run_blocking(Pool.DB, get_audio_format, user_id)
+
+            caption = f"🎤 **Text:** {text[:50]}{'...' if len(text) > 50 else ''}\n🌐 **Language:** {lang.upper()}\n{'💰 **Cost:** ' + str(credits_needed) + ' credits' if user_id != OWNER_ID else '⭐ **Owner Access**'}"
+
+            async def show_queue_position(position):
+                await processing_msg.edit_text(
+                    f"⏳ Aapka request queue me hai - position #{position}\n"
+                    f"🔄 Turn aate hi processing shuru ho jayegi..."
                 )
 
+            # Repeat request: re-send the earlier upload by file_id, skipping synthesis and upload
+            audio_sent = await send_cached_tts_audio(message, text, voice_type or 'male1', caption, delivery_format)
+
+            try:
+                if not audio_sent:
+                    queue_start = time.perf_counter()
+                    async with tts_scheduler.slot(user_id, on_queued=show_queue_position):
+                        latency_metrics.record(Stage.QUEUE_WAIT, time.perf_counter() - queue_start, voice_id)
+                        if len(text) >= PROGRESSIVE_MIN_CHARS:
+                            # Long text: send the first part as soon as it is ready, then the rest
+                            audio_sent, words_delivered = await send_progressive_tts(message, text, voice_type or 'male1', caption, processing_msg, delivery_format)
+                            if words_delivered < word_count:
+                                # Incomplete audio: bill only the words that were delivered
+                                credits_needed = words_delivered * 0.05
+                        else:
+                            # Use voice-specific TTS if voice is selected, otherwise use language-based
+                            with latency_metrics.measure(Stage.SYNTHESIS, voice_id):
+                                if voice_type and voice_type != 'male1':
+                                    audio_data = await tts_service.text_to_speech_with_voice(text, voice_type)
+                                else:
+                                    audio_data = await tts_service.text_to_speech(text, lang)
+
+                            audio_sent = False
+                            if audio_data:
+                                # send_tts_audio rewinds the buffer and uploads it as-is (no copy)
+                                audio_data.name = "tts_audio.mp3"
+
+                                # Send audio file (or voice note)
+                                audio_msg = await send_tts_audio(message, audio_data, caption, delivery_format=delivery_format, voice=voice_id)
+                                await remember_tts_file_id(audio_msg, audio_data, text, voice_type or 'male1')
+                                audio_sent = True
+            except TTSQueueFull:
+                await processing_msg.edit_text("⏳ Bot abhi bahut busy hai! Kripaya thodi der baad try kare.")
+                user_states.pop(user_id, None)
+                return
+            except TTSDeadlineExceeded:
+                await processing_msg.edit_text("⌛ Audio banane me bahut time lag raha hai, isliye request rok di gayi. Koi credit nahi kata - kripaya thodi der baad try kare.")
+                user_states.pop(user_id, None)
+                return
+
+            if audio_sent:
                 # Wait 2 seconds then show feedback buttons
-                await asyncio.sleep(2)
+                with latency_metrics.measure(Stage.FEEDBACK_DELAY, voice_id):
+                    await asyncio.sleep(2)
 
     
                 feedback_keyboard = InlineKeyboardMarkup([
@@ -3263,45 +3637,42 @@ async def handle_text(client: Client, message: Message):
 
                 # Deduct credits and log request (only for non-owners)
                 if user_id != OWNER_ID:
-                    db = SessionLocal()
                     try:
-                        user = db.query(User).filter(User.user_id == user_id).first()
-                        if user:
-                            user.credits = float(user.credits) - credits_needed
-                            db.commit()
-                            db.refresh(user)
-
-                        # Log request
-                        tts_request = TTSRequest(
-                            user_id=user_id,
-                            text=text,
-                            language='hi',
-                            credits_used=credits_needed
-                        )
-                        db.add(tts_request)
-                        db.commit()
+                        with latency_metrics.measure(Stage.CREDIT_COMMIT, voice_id):
+                            remaining_credits = await run_blocking(Pool.DB, charge_tts_request, user_id, text, credits_needed)
 
-                        await processing_msg.edit_text(
-                            f"✅ **Success!**\n"
-                            f"💰 Remaining Credits: {user.credits:.2f}"
-                        )
+                        if remaining_credits is None:
+                            await processing_msg.edit_text("✅ Audio generated successfully!")
+                        else:
+                            await processing_msg.edit_text(
+                                f"✅ **Success!**\n"
+                                f"💰 Remaining Credits: {remaining_credits:.2f}"
+                            )
                     except Exception as db_error:
-                        print(f"Database error: {db_error}")
+                        logger.error("tts_credit_commit_error", user_id=user_id, error=str(db_error))
                         await processing_msg.edit_text("✅ Audio generated successfully!")
-                    finally:
-                        db.close()
                 else:
                     await processing_msg.edit_text("✅ **Success!** (Owner - Free)")
+
+                latency_metrics.record(Stage.TOTAL, time.perf_counter() - request_start, voice_id)
             else:
                 await processing_msg.edit_text("❌ Error generating audio. Please try again.")
 
         except Exception as e:
-            print(f"TTS processing error: {e}")
+            logger.error("tts_processing_error", user_id=user_id, voice_type=voice_type, error=str(e))
             await message.reply(f"❌ Error processing your request. Please try again.")
 
         # Reset user state
         user_states.pop(user_id, None)
 
+    elif isinstance(user_state_data, dict) and user_state_data.get('state') == UserState.WAITING_LONG_DOCUMENT:
+        try:
+            await submit_long_document(message, message.text, user_state_data.get('voice') or 'male1')
+        except Exception as e:
+            logger.error("long_doc_submit_error", user_id=user_id, error=str(e))
+            await message.reply("❌ Long document job banate samay error aaya. Please try again.")
+        user_states.pop(user_id, None)
+
     # Handle owner panel states
     elif user_state_data == UserState.WAITING_GIVE_CREDIT_USER_ID and user_id == OWNER_ID:
         try:
@@ -3912,9 +4283,9 @@ async def handle_text(client: Client, message: Message):
             
             # Generate transaction history for date range
             import os
-            transactions = transaction_manager.get_transactions_by_date_range(first_date, second_date + timedelta(days=1))
+            transactions = await run_blocking(Pool.DB, transaction_manager.get_transactions_by_date_range, first_date, second_date + timedelta(days=1))
             filename = f"transactions_range_{first_date.strftime('%Y%m%d')}_{second_date.strftime('%Y%m%d')}_{datetime.now().strftime('%H%M')}.csv"
-            filepath = transaction_manager.create_transaction_file(transactions, filename)
+            filepath = await run_blocking(Pool.FILE_IO, transaction_manager.create_transaction_file, transactions, filename)
             
             if filepath and os.path.exists(filepath):
                 await app.send_document(
@@ -3944,7 +4315,7 @@ async def handle_text(client: Client, message: Message):
     # Payment Tracking Handler
     elif isinstance(user_state_data, dict) and user_state_data.get('state') == 'waiting_payment_id':
         transaction_id = message.text.strip()
-        payment_info = transaction_manager.get_payment_by_transaction_id(transaction_id)
+        payment_info = await run_blocking(Pool.DB, transaction_manager.get_payment_by_transaction_id, transaction_id)
         
         if payment_info:
             await message.reply(
@@ -4513,11 +4884,245 @@ async def handle_photo(client: Client, message: Message):
         
         user_states.pop(user_id, None)
 
+async def handle_bulk_tts(message: Message, voice_type: str):
+    """Bulk TTS: synthesize every line of an uploaded .txt/.csv and reply with a ZIP of audio files"""
+    user_id = message.from_user.id
+    file_name = message.document.file_name
+
+    if message.document.file_size and message.document.file_size > BULK_MAX_FILE_BYTES:
+        await message.reply(f"❌ File bahut badi hai! Maximum {BULK_MAX_FILE_BYTES // 1024} KB allowed hai.")
+        user_states.pop(user_id, None)
+        return
+
+    try:
+        content = (await message.download(in_memory=True)).getvalue()
+        lines = parse_bulk_lines(file_name, content)
+    except BulkInputError as e:
+        await message.reply(f"❌ {e}")
+        user_states.pop(user_id, None)
+        return
+
+    # Same per-word rate as single messages; checked for the whole batch up front
+    word_count = sum(len(line.split()) for line in lines)
+    credits_needed = word_count * 0.05
+    if user_id != OWNER_ID:
+        user = await run_blocking(Pool.DB, get_user_from_db, user_id)
+        if user.credits < credits_needed:
+            error_msg = await message.reply(
+                f"❌ Credits kam hai! {len(lines)} lines ke liye {credits_needed:.2f} credits chahiye lekin aapke paas {user.credits:.2f} hai"
+            )
+            await track_sent_message(error_msg, message_type=MessageType.ERROR, user_id=user_id, context="tts_error")
+            user_states.pop(user_id, None)
+            return
+
+    # Lines are split into groups whose audio fits one archive under Telegram's upload limit;
+    # each group is synthesized, zipped and sent before the next one starts
+    batches = split_bulk_batches(lines)
+    archive_note = f"🗂️ **ZIP files:** ~{len(batches)} (har ZIP {BULK_MAX_ARCHIVE_BYTES // (1024 * 1024)} MB tak)\n" if len(batches) > 1 else ""
+    status_msg = await message.reply(
+        f"📦 **Bulk TTS shuru ho raha hai...**\n"
+        f"📄 **File:** {file_name}\n"
+        f"📝 **Lines:** {len(lines)} ({word_count} words)\n"
+        f"{archive_note}"
+        f"{'💰 **Cost:** ' + format(credits_needed, '.2f') + ' credits' if user_id != OWNER_ID else '⭐ **Owner Access**'}"
+    )
+
+    lines_done = 0
+    lines_failed = 0
+    queue_notice = True
+
+    async def show_progress(done, failed, total):
+        nonlocal queue_notice
+        queue_notice = False
+        done += lines_done
+        filled = done * 10 // len(lines)
+        await status_msg.edit_text(
+            f"📦 **Bulk TTS:** {done}/{len(lines)} lines ho gayi"
+            f"{f' ({failed + lines_failed} failed)' if failed + lines_failed else ''}\n"
+            f"{'▓' * filled}{'░' * (10 - filled)}"
+        )
+
+    async def show_queue_position(position):
+        await status_msg.edit_text(f"⏳ Aapka bulk request queue me hai - position #{position}")
+
+    async def synthesize_line(text):
+        # Every line takes its own scheduler slot, so a batch shares the global limit and round-robin with single
+        # messages; the batch may hold up to BULK_CONCURRENCY of them instead of the per-user limit of one
+        async with tts_scheduler.slot(user_id, on_queued=show_queue_position if queue_notice else None, user_limit=BULK_CONCURRENCY):
+            return await tts_service.text_to_speech_with_voice(text, voice_type)
+
+    succeeded_count = 0
+    archives_sent = 0
+    credits_used = 0.0
+    try:
+        for batch in batches:
+            results = await run_bulk_tts([lines[index] for index in batch], synthesize_line, on_progress=show_progress, start=batch.start)
+            lines_done += len(results)
+            lines_failed += sum(1 for result in results if not result.audio)
+            if not any(result.audio for result in results):
+                continue
+
+            archives = await run_blocking(Pool.FILE_IO, build_bulk_archives, results, len(lines))
+            archives = [(archive, group, [result for result in group if result.audio]) for archive, group in archives]
+            for result in results:
+                result.audio = None  # The archives hold the audio now
+            for archive, group, sent in archives:
+                try:
+                    archives_sent += 1
+                    archive_msg = await message.reply_document(
+                        archive,
+                        file_name=f"tts_batch_{archives_sent:02d}_lines_{group[0].index + 1}-{group[-1].index + 1}.zip",
+                        caption=(
+                            f"📦 **Bulk TTS Ready!**"
+                            f"{f' (ZIP {archives_sent})' if len(batches) > 1 or len(archives) > 1 else ''}\n"
+                            f"📝 **Lines:** {group[0].index + 1}-{group[-1].index + 1}\n"
+                            f"✅ **Audio files:** {len(sent)}/{len(group)}"
+                            f"{f' • ❌ Failed: {len(group) - len(sent)} (manifest.csv dekhe)' if len(sent) < len(group) else ''}"
+                        )
+                    )
+                finally:
+                    archive.close()
+                # Charged per delivered archive, only for lines that produced audio
+                succeeded_count += len(sent)
+                credits_used += sum(len(result.text.split()) for result in sent) * 0.05
+                await track_sent_message(
+                    archive_msg,
+                    message_type=MessageType.TTS_RESULT,
+                    user_id=user_id,
+                    custom_delay=600,  # Keep the archive for 10 minutes
+                    context="tts_bulk_result"
+                )
+    finally:
+        # Archives already sent are billed even if a later one fails
+        remaining = None
+        if user_id != OWNER_ID and credits_used:
+            try:
+                remaining = await run_blocking(
+                    Pool.DB, charge_tts_request, user_id, f"[bulk {succeeded_count} lines] {file_name}", credits_used
+                )
+            except Exception as db_error:
+                logger.error("bulk_credit_commit_error", user_id=user_id, error=str(db_error))
+        user_states.pop(user_id, None)
+
+    if not archives_sent:
+        await status_msg.edit_text("❌ Koi bhi line ka audio nahi ban paya. Kripaya baad me try kare.")
+        return
+
+    if user_id == OWNER_ID:
+        await status_msg.edit_text("✅ **Bulk TTS Success!** (Owner - Free)")
+    else:
+        await status_msg.edit_text(
+            f"✅ **Bulk TTS Success!** {archives_sent} ZIP, {succeeded_count}/{len(lines)} lines\n"
+            f"💰 **Cost:** {credits_used:.2f} credits"
+            + (f"\n💰 Remaining Credits: {remaining:.2f}" if remaining is not None else "")
+        )
+
+    logger.info("bulk_tts_completed", user_id=user_id, lines=len(lines), failed=lines_failed, archives=archives_sent, credits=credits_used)
+
+async def submit_long_document(message: Message, text: str, voice_type: str, title: str = None):
+    """Create a durable long-document job; the background worker delivers and bills it part by part"""
+    user_id = message.from_user.id
+    text = (text or '').strip()
+    if not text:
+        await message.reply("❌ Kripaya kuch text send karo jo speech me convert karna hai.")
+        return
+    if len(text) > LONG_DOC_MAX_CHARS:
+        await message.reply(f"❌ Document bahut lamba hai! Maximum {LONG_DOC_MAX_CHARS} characters allowed hai (aapka {len(text)} hai).")
+        return
+
+    active_job = await run_blocking(Pool.DB, get_active_job, user_id)
+    if active_job:
+        await message.reply(
+            f"⏳ Aapka ek long document job already chal raha hai ({active_job.completed_chunks}/{active_job.total_chunks} parts).\n"
+            "Pehle use complete ya cancel hone de.",
+            reply_markup=get_cancel_keyboard(active_job.id)
+        )
+        return
+
+    # Only the first part has to be affordable up front; later parts are billed as they are delivered
+    is_free = user_id == OWNER_ID
+    if not is_free:
+        first_part_credits = chunk_credits(split_text_chunks(text, LONG_DOC_CHUNK_CHARS)[0])
+        user = await run_blocking(Pool.DB, get_user_from_db, user_id)
+        if user.credits < first_part_credits:
+            error_msg = await message.reply(f"❌ Credits kam hai! Pehle part ke liye {first_part_credits:.2f} credits chahiye lekin aapke paas {user.credits:.2f} hai")
+            await track_sent_message(error_msg, message_type=MessageType.ERROR, user_id=user_id, context="tts_error")
+            return
+
+    status_msg = await message.reply("📚 Long document job ban raha hai...")
+    try:
+        audio_format = await run_blocking(Pool.DB, get_audio_format, user_id)
+        job_id, total_chunks, estimated_credits = await run_blocking(
+            Pool.DB,
+            create_job,
+            user_id,
+            message.chat.id,
+            text,
+            voice_type,
+            audio_format,
+            is_free,
+            title=title,
+            status_message_id=status_msg.id
+        )
+    except LongDocumentError as e:
+        await status_msg.edit_text(f"❌ {e}")
+        return
+
+    await status_msg.edit_text(
+        f"📚 **Long Document Job #{job_id}**\n"
+        f"{'📄 **File:** ' + title + chr(10) if title else ''}"
+        f"📝 **Characters:** {len(text)}\n"
+        f"🧩 **Parts:** {total_chunks}\n"
+        f"{'💰 **Estimated Cost:** ' + format(estimated_credits, '.2f') + ' credits (har part bhejne par katega)' if not is_free else '⭐ **Owner Access**'}\n\n"
+        "🔄 Parts ek-ek karke order me aayenge...",
+        reply_markup=get_cancel_keyboard(job_id)
+    )
+    long_document_worker.notify()
+
+async def handle_long_document_file(message: Message, voice_type: str):
+    """Long document mode: read an uploaded .txt file as one document"""
+    file_name = message.document.file_name or "document.txt"
+    if not file_name.lower().endswith('.txt'):
+        await message.reply("❌ Sirf .txt file supported hai.")
+        return
+    if message.document.file_size and message.document.file_size > LONG_DOC_MAX_FILE_BYTES:
+        await message.reply(f"❌ File bahut badi hai! Maximum {LONG_DOC_MAX_CHARS} characters allowed hai.")
+        return
+    try:
+        text = (await message.download(in_memory=True)).getvalue().decode('utf-8-sig')
+    except UnicodeDecodeError:
+        await message.reply("❌ File UTF-8 text honi chahiye.")
+        return
+    await submit_long_document(message, text, voice_type, title=os.path.splitext(file_name)[0])
+
 @app.on_message(filters.document)
 async def handle_document(client: Client, message: Message):
     """Handle document uploads for backup restore with PostgreSQL and SQLite support"""
     user_id = message.from_user.id
     
+    # Long document mode: a .txt file is read as one document and delivered in parts
+    long_doc_state = user_states.get(user_id)
+    if isinstance(long_doc_state, dict) and long_doc_state.get('state') == UserState.WAITING_LONG_DOCUMENT and message.document:
+        try:
+            await handle_long_document_file(message, long_doc_state.get('voice') or 'male1')
+        except Exception as e:
+            logger.error("long_doc_submit_error", user_id=user_id, error=str(e))
+            await message.reply("❌ Long document job banate samay error aaya. Please try again.")
+        user_states.pop(user_id, None)
+        return
+    
+    # Bulk TTS: any user in the TTS state can upload a .txt/.csv of lines
+    tts_state = user_states.get(user_id)
+    if (isinstance(tts_state, dict) and tts_state.get('state') == UserState.WAITING_TTS_TEXT
+            and message.document and is_bulk_file(message.document.file_name)):
+        try:
+            await handle_bulk_tts(message, tts_state.get('voice') or 'male1')
+        except Exception as e:
+            logger.error("bulk_tts_error", user_id=user_id, error=str(e))
+            await message.reply("❌ Bulk file process karte samay error aaya. Please try again.")
+            user_states.pop(user_id, None)
+        return
+    
     # Only owner can upload backup files
     if user_id != OWNER_ID:
         return
@@ -4708,7 +5313,9 @@ async def handle_document(client: Client, message: Message):
                             )
                             
                             # Use subprocess for better error handling
-                            restore_process = subprocess.run(
+                            restore_process = await run_blocking(
+                                Pool.FILE_IO,
+                                subprocess.run,
                                 f"psql '{database_url}' < {file_path}",
                                 shell=True,
                                 capture_output=True,
@@ -4862,10 +5469,10 @@ async def handle_document(client: Client, message: Message):
                         from datetime import datetime as dt3
                         if os.path.exists('bot.db'):
                             backup_name = f"bot_backup_{dt3.now().strftime('%Y%m%d_%H%M%S')}.db"
-                            shutil.copy('bot.db', backup_name)
+                            await run_blocking(Pool.FILE_IO, shutil.copy, 'bot.db', backup_name)
                             os.remove('bot.db')  # Remove current database
                         
-                        shutil.move(file_path, 'bot.db')  # Move uploaded file to bot.db
+                        await run_blocking(Pool.FILE_IO, shutil.move, file_path, 'bot.db')  # Move uploaded file to bot.db
                         
                     except Exception as file_error:
                         await downloading_msg.edit_text(
@@ -4954,11 +5561,11 @@ async def handle_document(client: Client, message: Message):
                 # Create backup of current file if it exists
                 if os.path.exists('credit_history.db'):
                     backup_name = f"credit_history_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.db"
-                    shutil.copy('credit_history.db', backup_name)
+                    await run_blocking(Pool.FILE_IO, shutil.copy, 'credit_history.db', backup_name)
                     backup_created = True
                     os.remove('credit_history.db')  # Remove current database
                 
-                shutil.move(file_path, 'credit_history.db')  # Move uploaded file
+                await run_blocking(Pool.FILE_IO, shutil.move, file_path, 'credit_history.db')  # Move uploaded file
                 
                 # Calculate total time taken
                 backup_start_time = user_state_data.get('backup_start_time')
@@ -5123,6 +5730,15 @@ def main():
         loop.run_until_complete(deletion_service.start_deletion_service())
         print("✅ Message deletion service started successfully")
         
+        # Long document worker - resumes unfinished jobs from the database
+        loop.run_until_complete(long_document_worker.start())
+        print("📚 Long document worker started")
+        
+        # Voice preview clips are synthesized in the background; the first tap per voice uploads, later taps re-send by file_id
+        if VOICE_PREVIEWS_ENABLED:
+            loop.create_task(voice_previews.generate_all())
+            print("🔊 Voice preview generation started")
+        
         # Start database backup scheduler if channel is available
         target_channel = connected_channel_id or CHANNEL_ID
         if target_channel:
@@ -5135,6 +5751,9 @@ def main():
 
         print("🚀 Starting Telegram bot...")
         app.run()
+        loop.run_until_complete(tts_service.primary_backend.close())
+        loop.run_until_complete(tts_service.fallback_backend.close())
+        executors.shutdown()
     except Exception as e:
         print(f"Bot startup error: {e}")
         raise e
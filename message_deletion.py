@@ -33,6 +33,7 @@ class MessageType:
     ADMIN = "admin"                     # Owner/admin operations
     
     # Long-term - keep longer for reference
+    TTS_RESULT = "tts_result"           # Generated TTS audio / voice notes
     WELCOME = "welcome"                 # Welcome/onboarding messages
     HELP = "help"                       # Help and documentation
 
@@ -51,6 +52,7 @@ class MessageDeletionService:
             MessageType.INFO: 45,        # 45 seconds
             MessageType.PAYMENT: 120,      # 8 seconds (quick for privacy)
             MessageType.ADMIN: 20,       # 20 seconds
+            MessageType.TTS_RESULT: 120, # 2 minutes
             MessageType.WELCOME: 300,    # 5 minutes
             MessageType.HELP: 180,       # 3 minutes
         }
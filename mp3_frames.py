@@ -0,0 +1,306 @@
+"""
+MP3 Frames for TTS Bot
+MPEG Layer III frame parser and joiner: stitches synthesized parts without decoding or re-encoding
+"""
+
+from typing import List, Optional, Tuple
+
+# MPEG version ids from the frame header (1 is reserved)
+MPEG_2_5, MPEG_2, MPEG_1 = 0, 2, 3
+
+# Layer III bitrates in kbps by bitrate index (0 = free format and 15 are not supported)
+_BITRATES = {
+    MPEG_1: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    MPEG_2: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+_BITRATES[MPEG_2_5] = _BITRATES[MPEG_2]
+_SAMPLE_RATES = {
+    MPEG_1: (44100, 48000, 32000),
+    MPEG_2: (22050, 24000, 16000),
+    MPEG_2_5: (11025, 12000, 8000),
+}
+MONO = 3  # Channel mode of single-channel streams (Edge TTS and gTTS output)
+
+ID3V1_SIZE = 128
+# Tag frames written by encoders in place of the first audio frame (no audio in them)
+_INFO_TAGS = (b"Xing", b"Info")
+_VBRI_OFFSET = 4 + 32
+_XING_FRAMES_FLAG = 0x1
+_XING_BYTES_FLAG = 0x2
+
+
+class FrameHeader:
+    """Fields of one MPEG-1/2/2.5 Layer III frame header"""
+    __slots__ = ('version', 'bitrate_index', 'sample_rate_index', 'padding', 'channel_mode',
+                 'bitrate', 'sample_rate', 'length', 'samples')
+
+    def __init__(self, version: int, bitrate_index: int, sample_rate_index: int, padding: int, channel_mode: int):
+        self.version = version
+        self.bitrate_index = bitrate_index
+        self.sample_rate_index = sample_rate_index
+        self.padding = padding
+        self.channel_mode = channel_mode
+        self.bitrate = _BITRATES[version][bitrate_index] * 1000
+        self.sample_rate = _SAMPLE_RATES[version][sample_rate_index]
+        # MPEG-1 frames carry 1152 samples, MPEG-2 / 2.5 frames 576
+        self.samples = 1152 if version == MPEG_1 else 576
+        self.length = self.samples // 8 * self.bitrate // self.sample_rate + padding
+
+    @property
+    def side_info_size(self) -> int:
+        if self.version == MPEG_1:
+            return 17 if self.channel_mode == MONO else 32
+        return 9 if self.channel_mode == MONO else 17
+
+    @property
+    def duration(self) -> float:
+        return self.samples / self.sample_rate
+
+    def compatible(self, other: "FrameHeader") -> bool:
+        """Whether frames of both streams can follow each other in one file (bitrates may differ)"""
+        return (self.version, self.sample_rate_index, self.channel_mode == MONO) == \
+            (other.version, other.sample_rate_index, other.channel_mode == MONO)
+
+    def to_bytes(self, bitrate_index: Optional[int] = None) -> bytes:
+        """Header bytes without CRC, padding or flags, optionally with another bitrate"""
+        return bytes((
+            0xFF,
+            0xE0 | self.version << 3 | 0b01 << 1 | 1,  # Layer III, not CRC-protected
+            (self.bitrate_index if bitrate_index is None else bitrate_index) << 4 | self.sample_rate_index << 2,
+            self.channel_mode << 6,
+        ))
+
+
+# Parsed headers by their second to fourth byte: a stream repeats a handful of headers thousands of times
+_header_cache = {}
+
+
+def parse_header(data, offset: int = 0) -> Optional[FrameHeader]:
+    """Parse the Layer III frame header at offset, or None if there is no valid one"""
+    if offset + 4 > len(data) or data[offset] != 0xFF:
+        return None
+    key = data[offset + 1] << 16 | data[offset + 2] << 8 | data[offset + 3]
+    header = _header_cache.get(key)
+    if header is not None:
+        return header
+    b1, b2, b3 = key >> 16, key >> 8 & 0xFF, key & 0xFF
+    version = b1 >> 3 & 0b11
+    bitrate_index = b2 >> 4
+    sample_rate_index = b2 >> 2 & 0b11
+    if b1 & 0xE0 != 0xE0 or version == 1 or b1 >> 1 & 0b11 != 0b01 or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+    header = _header_cache[key] = FrameHeader(version, bitrate_index, sample_rate_index, b2 >> 1 & 1, b3 >> 6)
+    return header
+
+
+def id3v2_size(data) -> int:
+    """Size of a leading ID3v2 tag (0 if there is none)"""
+    if len(data) < 10 or bytes(data[:3]) != b"ID3":
+        return 0
+    # Tag size is a 28-bit synchsafe integer, plus a 10-byte footer when flagged
+    size = 10 + (data[6] << 21 | data[7] << 14 | data[8] << 7 | data[9])
+    return size + 10 if data[5] & 0x10 else size
+
+
+def _info_tag_offset(data, offset: int, header: FrameHeader) -> int:
+    """Offset of a Xing / Info / VBRI tag inside the frame at offset, or -1"""
+    xing = offset + 4 + header.side_info_size
+    if bytes(data[xing:xing + 4]) in _INFO_TAGS:
+        return xing
+    if bytes(data[offset + _VBRI_OFFSET:offset + _VBRI_OFFSET + 4]) == b"VBRI":
+        return offset + _VBRI_OFFSET
+    return -1
+
+
+class FrameScan:
+    """Audio frames found in one MP3 part: byte ranges of contiguous frames plus totals"""
+    __slots__ = ('runs', 'frames', 'samples', 'header', 'bitrates', 'skipped_bytes')
+
+    def __init__(self):
+        self.runs: List[Tuple[int, int]] = []
+        self.frames = 0
+        self.samples = 0
+        self.header: Optional[FrameHeader] = None
+        self.bitrates = set()
+        self.skipped_bytes = 0
+
+    @property
+    def audio_bytes(self) -> int:
+        return sum(end - start for start, end in self.runs)
+
+    @property
+    def duration(self) -> float:
+        return self.samples / self.header.sample_rate if self.header else 0.0
+
+
+def scan_frames(data) -> FrameScan:
+    """
+    Find the audio frames of an MP3 (bytes or memoryview)
+
+    ID3v2 / ID3v1 tags and a leading Xing / Info / VBRI frame are left out, as are
+    bytes between frames and a truncated last frame. After garbage, a header is
+    only trusted if the next frame follows it, so stray 0xFF bytes do not resync.
+    Frames whose format differs from the first frame are treated as garbage.
+    """
+    scan = FrameScan()
+    position = id3v2_size(data)
+    end = len(data)
+    if end - position >= ID3V1_SIZE and bytes(data[end - ID3V1_SIZE:end - ID3V1_SIZE + 3]) == b"TAG":
+        end -= ID3V1_SIZE
+    run_start = None
+    checked_first = False
+
+    while position + 4 <= end:
+        header = parse_header(data, position)
+        valid = header is not None and position + header.length <= end \
+            and (header is scan.header or scan.header is None or header.compatible(scan.header))
+        if valid and run_start is None and position + header.length < end:
+            following = parse_header(data, position + header.length)
+            valid = following is not None and following.compatible(header)
+        if not valid:
+            if run_start is not None:
+                scan.runs.append((run_start, position))
+                run_start = None
+            position += 1
+            scan.skipped_bytes += 1
+            continue
+
+        if not checked_first:
+            checked_first = True
+            if _info_tag_offset(data, position, header) >= 0:
+                position += header.length
+                continue
+
+        if run_start is None:
+            run_start = position
+        if scan.header is None:
+            scan.header = header
+        scan.frames += 1
+        scan.samples += header.samples
+        scan.bitrates.add(header.bitrate_index)
+        position += header.length
+
+    if run_start is not None:
+        scan.runs.append((run_start, position))
+    scan.skipped_bytes += end - position
+    return scan
+
+
+def silence_frame(header: FrameHeader) -> bytes:
+    """One silent frame in the given format (zeroed side info: no main data, decodes as silence)"""
+    frame_header = header.to_bytes()
+    return frame_header + bytes(parse_header(frame_header).length - 4)
+
+
+def info_frame(header: FrameHeader, frames: int, stream_bytes: int, vbr: bool = False) -> bytes:
+    """
+    Xing (VBR) / Info (CBR) tag frame with the frame and byte counts, so players get the duration
+
+    The tag frame uses the stream's format at the smallest bitrate that fits the tag.
+    """
+    tag_offset = 4 + header.side_info_size
+    needed = tag_offset + 16
+    for bitrate_index in range(header.bitrate_index, 15):
+        frame_header = header.to_bytes(bitrate_index)
+        length = parse_header(frame_header).length
+        if length >= needed:
+            break
+    frame = bytearray(frame_header + bytes(length - 4))
+    frame[tag_offset:needed] = (
+        (b"Xing" if vbr else b"Info")
+        + (_XING_FRAMES_FLAG | _XING_BYTES_FLAG).to_bytes(4, "big")
+        + frames.to_bytes(4, "big")
+        + stream_bytes.to_bytes(4, "big")
+    )
+    return bytes(frame)
+
+
+def mp3_duration(data) -> float:
+    """Duration in seconds: read from a Xing / Info frame count when present, else by scanning the frames"""
+    position = id3v2_size(data)
+    header = parse_header(data, position)
+    if header is not None:
+        tag = _info_tag_offset(data, position, header)
+        if tag >= 0 and bytes(data[tag:tag + 4]) in _INFO_TAGS and int.from_bytes(data[tag + 4:tag + 8], "big") & _XING_FRAMES_FLAG:
+            return int.from_bytes(data[tag + 8:tag + 12], "big") * header.duration
+    return scan_frames(data).duration
+
+
+class MP3Joiner:
+    """
+    Joins MP3 parts into one stream frame by frame, without decoding
+
+    Each part's audio frames are appended as-is (tags and encoder header frames are
+    dropped), optionally with gap_ms of silent frames between parts. With
+    duration_header, a placeholder Info frame is written first and patched with the
+    final frame and byte counts in finish(). Parts must share version, sample rate and
+    channel count; bitrates may differ (the tag then says Xing, i.e. VBR).
+
+    The output is an AudioBuffer (anything with write() and overwrite()), so frames
+    are copied once, straight from each part into the joined audio.
+    """
+
+    def __init__(self, output, gap_ms: int = 0, duration_header: bool = True):
+        self.output = output
+        self.gap_ms = gap_ms
+        self.duration_header = duration_header
+        self.header: Optional[FrameHeader] = None
+        self.frames = 0
+        self.samples = 0
+        self.parts = 0
+        self.skipped_bytes = 0
+        self._bitrates = set()
+        self._tag_length = 0
+        self._bytes = 0
+
+    @property
+    def duration(self) -> float:
+        return self.samples / self.header.sample_rate if self.header else 0.0
+
+    def _write(self, data):
+        self._bytes += self.output.write(data)
+
+    def append(self, data):
+        """
+        Append one part (bytes or memoryview)
+
+        Raises:
+            ValueError: If the part has no audio frames or a format the stream can't continue with
+        """
+        scan = scan_frames(data)
+        if not scan.frames:
+            raise ValueError(f"No MP3 audio frames in part {self.parts + 1} ({len(data)} bytes)")
+        if self.header is None:
+            self.header = scan.header
+            if self.duration_header:
+                tag = info_frame(self.header, 0, 0)
+                self._tag_length = len(tag)
+                self._write(tag)
+        elif not scan.header.compatible(self.header):
+            raise ValueError(
+                f"MP3 part {self.parts + 1} is {scan.header.sample_rate} Hz, the stream is {self.header.sample_rate} Hz; "
+                "parts in different formats can't be joined without re-encoding"
+            )
+        elif self.gap_ms:
+            silence_frames = round(self.gap_ms / 1000 / self.header.duration)
+            if silence_frames:
+                self._write(silence_frame(self.header) * silence_frames)
+                self.frames += silence_frames
+                self.samples += silence_frames * self.header.samples
+                self._bitrates.add(self.header.bitrate_index)
+
+        with memoryview(data) as view:
+            for start, end in scan.runs:
+                self._write(view[start:end])
+        self.frames += scan.frames
+        self.samples += scan.samples
+        self._bitrates |= scan.bitrates
+        self.skipped_bytes += scan.skipped_bytes
+        self.parts += 1
+
+    def finish(self):
+        """Write the final duration header and return the output"""
+        if self._tag_length:
+            tag = info_frame(self.header, self.frames, self._bytes, vbr=len(self._bitrates) > 1)
+            self.output.overwrite(0, tag)
+        return self.output
@@ -0,0 +1,225 @@
+"""
+Structured Logging for TTS Bot
+structlog-based event logging with per-module levels, sampling of noisy events and user-text redaction
+"""
+
+import os
+import sys
+import hashlib
+import logging
+import threading
+from typing import Any, Dict
+
+try:
+    import structlog
+except ImportError:  # structlog is in requirements.txt; plain stdlib logging keeps tools working without it
+    structlog = None
+
+# Root level and per-module overrides, e.g. LOG_LEVELS="tts_service=DEBUG,free_credit=WARNING"
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_LEVELS = os.getenv('LOG_LEVELS', '')
+# 'console' for human-readable lines, 'json' for log shipping
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'console')
+# Keep 1 in N of high-volume events (per event name); debug events default to 1 in 10
+LOG_SAMPLE_RATES = os.getenv('LOG_SAMPLE_RATES', '')
+LOG_DEBUG_SAMPLE_EVERY = int(os.getenv('LOG_DEBUG_SAMPLE_EVERY', '10'))
+# User text is replaced by its length and a short hash unless explicitly enabled
+LOG_USER_TEXT = os.getenv('LOG_USER_TEXT', '0') == '1'
+
+# Event fields that may carry user-provided text
+REDACTED_FIELDS = frozenset({'text', 'part_text', 'user_text', 'caption', 'chunk_text'})
+
+
+def _parse_pairs(spec: str) -> Dict[str, str]:
+    pairs = {}
+    for item in spec.split(','):
+        if '=' in item:
+            key, value = item.split('=', 1)
+            pairs[key.strip()] = value.strip()
+    return pairs
+
+
+def _sample_every() -> Dict[str, int]:
+    return {event: max(1, int(every)) for event, every in _parse_pairs(LOG_SAMPLE_RATES).items()}
+
+
+class EventSampler:
+    """
+    Deterministic 1-in-N sampling per event name
+
+    A counter per event keeps every Nth occurrence (the first one always passes), so
+    rare events are never lost and bursts are thinned evenly. Kept events carry the
+    sampling rate so counts can be scaled back up.
+    """
+
+    def __init__(self, sample_every: Dict[str, int], debug_sample_every: int = LOG_DEBUG_SAMPLE_EVERY):
+        self.sample_every = sample_every
+        self.debug_sample_every = max(1, debug_sample_every)
+        self._counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, logger, method_name: str, event_dict: Dict[str, Any]) -> Dict[str, Any]:
+        event = event_dict.get('event')
+        every = self.sample_every.get(event)
+        if every is None:
+            every = self.debug_sample_every if method_name == 'debug' else 1
+        if every == 1:
+            return event_dict
+
+        with self._lock:
+            count = self._counts.get(event, 0)
+            self._counts[event] = count + 1
+        if count % every:
+            raise _drop_event()
+        event_dict['sampled'] = f"1/{every}"
+        return event_dict
+
+
+class _DropEvent(Exception):
+    """Stand-in for structlog.DropEvent when structlog is not installed"""
+
+
+def _drop_event() -> Exception:
+    return structlog.DropEvent() if structlog else _DropEvent()
+
+
+def redact_user_text(logger, method_name: str, event_dict: Dict[str, Any]) -> Dict[str, Any]:
+    """Replace user-provided text fields with their length and a short hash"""
+    if LOG_USER_TEXT:
+        return event_dict
+    for field in REDACTED_FIELDS.intersection(event_dict):
+        value = event_dict[field]
+        if isinstance(value, str):
+            digest = hashlib.sha256(value.encode('utf-8')).hexdigest()[:8]
+            event_dict[field] = f"<redacted {len(value)} chars #{digest}>"
+    return event_dict
+
+
+_sampler = EventSampler(_sample_every())
+_configured = False
+
+
+def configure_logging():
+    """
+    Configure structlog and route stdlib logging (logging.getLogger modules) through it
+
+    Safe to call more than once; replaces any handlers installed by logging.basicConfig.
+    """
+    global _configured
+    if _configured:
+        return
+    _configured = True
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.setLevel(LOG_LEVEL)
+    for module, level in _parse_pairs(LOG_LEVELS).items():
+        logging.getLogger(module).setLevel(level.upper())
+
+    handler = logging.StreamHandler(sys.stdout)
+    root.addHandler(handler)
+
+    if structlog is None:
+        handler.setFormatter(logging.Formatter('%(asctime)s [%(levelname)s] %(name)s: %(message)s'))
+        return
+
+    shared_processors = [
+        structlog.stdlib.add_logger_name,
+        structlog.stdlib.add_log_level,
+        structlog.processors.TimeStamper(fmt='iso'),
+    ]
+    renderer = (
+        structlog.processors.JSONRenderer() if LOG_FORMAT == 'json'
+        else structlog.dev.ConsoleRenderer(colors=False)
+    )
+    handler.setFormatter(structlog.stdlib.ProcessorFormatter(
+        foreign_pre_chain=shared_processors,
+        processors=[structlog.stdlib.ProcessorFormatter.remove_processors_meta, renderer],
+    ))
+
+    structlog.configure(
+        processors=[
+            # Level check first: disabled events are dropped before any formatting work
+            structlog.stdlib.filter_by_level,
+            _sampler,
+            redact_user_text,
+            *shared_processors,
+            structlog.processors.format_exc_info,
+            structlog.stdlib.ProcessorFormatter.wrap_for_formatter,
+        ],
+        logger_factory=structlog.stdlib.LoggerFactory(),
+        wrapper_class=structlog.stdlib.BoundLogger,
+        cache_logger_on_first_use=True,
+    )
+
+
+def _apply_safe_defaults():
+    """
+    Level filter, sampling and redaction for processes that never call configure_logging()
+
+    Benchmarks and one-off scripts import the service modules directly; without this they
+    would get structlog's defaults, which print every debug event with raw user text.
+    Loggers are not cached, so a later configure_logging() still takes over.
+    """
+    if structlog is None or structlog.is_configured():
+        return
+    structlog.configure(
+        processors=[
+            _sampler,
+            redact_user_text,
+            structlog.processors.add_log_level,
+            structlog.processors.TimeStamper(fmt='iso'),
+            structlog.processors.format_exc_info,
+            structlog.dev.ConsoleRenderer(colors=False),
+        ],
+        wrapper_class=structlog.make_filtering_bound_logger(logging.getLevelName(LOG_LEVEL)),
+        logger_factory=structlog.PrintLoggerFactory(),
+        cache_logger_on_first_use=False,
+    )
+
+
+_apply_safe_defaults()
+
+
+class _StdlibEventLogger:
+    """Minimal structlog-style logger (event + key/value fields) used when structlog is missing"""
+
+    def __init__(self, name: str):
+        self._logger = logging.getLogger(name)
+
+    def _log(self, method_name: str, level: int, event: str, **fields):
+        if not self._logger.isEnabledFor(level):
+            return
+        event_dict = {'event': event, **fields}
+        try:
+            event_dict = redact_user_text(None, method_name, _sampler(None, method_name, event_dict))
+        except _DropEvent:
+            return
+        exc_info = event_dict.pop('exc_info', None)
+        message = event_dict.pop('event')
+        if event_dict:
+            message += ' ' + ' '.join(f"{key}={value!r}" for key, value in event_dict.items())
+        self._logger.log(level, message, exc_info=exc_info)
+
+    def debug(self, event: str, **fields):
+        self._log('debug', logging.DEBUG, event, **fields)
+
+    def info(self, event: str, **fields):
+        self._log('info', logging.INFO, event, **fields)
+
+    def warning(self, event: str, **fields):
+        self._log('warning', logging.WARNING, event, **fields)
+
+    def error(self, event: str, **fields):
+        self._log('error', logging.ERROR, event, **fields)
+
+    def exception(self, event: str, **fields):
+        self._log('error', logging.ERROR, event, exc_info=True, **fields)
+
+
+def get_logger(name: str):
+    """Get a structured logger: logger.info("event_name", key=value, ...)"""
+    if structlog is None:
+        return _StdlibEventLogger(name)
+    return structlog.stdlib.get_logger(name)
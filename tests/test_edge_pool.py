@@ -0,0 +1,112 @@
+"""
+Edge TTS connection pool tests for TTS Bot
+Frames the pool sends, checked against a local WebSocket server that records them
+"""
+
+import re
+import asyncio
+
+import aiohttp
+import pytest
+from aiohttp import web
+
+from edge_pool import EdgeConnectionPool, parse_text_message
+
+VOICE = 'hi-IN-MadhurNeural'
+FULL_VOICE = 'Microsoft Server Speech Text to Speech Voice (hi-IN, MadhurNeural)'
+AUDIO = b'\xff\xf3' + b'\x00' * 200
+
+
+class RecordingServer:
+    """Answers every ssml frame with one audio message and records all text frames"""
+
+    def __init__(self):
+        self.frames = []
+        self._runner = None
+
+    async def start(self) -> str:
+        app = web.Application()
+        app.router.add_get('/edge', self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, '127.0.0.1', 0)
+        await site.start()
+        return f"ws://127.0.0.1:{site._server.sockets[0].getsockname()[1]}/edge"
+
+    async def stop(self):
+        await self._runner.cleanup()
+
+    async def _handle(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        async for msg in ws:
+            if msg.type != aiohttp.WSMsgType.TEXT:
+                continue
+            self.frames.append(msg.data)
+            headers = parse_text_message(msg.data)
+            if headers.get('Path') != 'ssml':
+                continue
+            request_id = headers['X-RequestId']
+            header = f"X-RequestId:{request_id}\r\nContent-Type:audio/mpeg\r\nPath:audio\r\n".encode('ascii')
+            await ws.send_bytes(len(header).to_bytes(2, 'big') + header + AUDIO)
+            await ws.send_str(f"X-RequestId:{request_id}\r\nContent-Type:application/json; charset=utf-8\r\nPath:turn.end\r\n\r\n{{}}")
+        return ws
+
+
+async def _synthesize(texts):
+    server = RecordingServer()
+    pool = EdgeConnectionPool(url=await server.start(), size=2)
+    try:
+        audio = [b"".join([chunk async for chunk in pool.stream(text, VOICE)]) for text in texts]
+    finally:
+        await pool.close()
+        await server.stop()
+    return audio, server.frames
+
+
+def test_speech_config_frame_sent_once_per_connection():
+    audio, frames = asyncio.run(_synthesize(["Namaste", "Phir milenge"]))
+    assert audio == [AUDIO, AUDIO]
+
+    configs = [frame for frame in frames if parse_text_message(frame).get('Path') == 'speech.config']
+    assert len(configs) == 1
+    headers, body = configs[0].split('\r\n\r\n', 1)
+    assert 'Content-Type:application/json; charset=utf-8' in headers.split('\r\n')
+    assert re.search(r'X-Timestamp:\w{3} \w{3} \d{2} \d{4} \d{2}:\d{2}:\d{2} GMT\+0000 \(Coordinated Universal Time\)$', headers.split('\r\n')[0])
+    assert body == (
+        '{"context":{"synthesis":{"audio":{"metadataoptions":{'
+        '"sentenceBoundaryEnabled":"false","wordBoundaryEnabled":"false"},'
+        '"outputFormat":"audio-24khz-48kbitrate-mono-mp3"}}}}\r\n'
+    )
+
+
+def test_ssml_frame_uses_full_voice_name_and_escaped_text():
+    _, frames = asyncio.run(_synthesize(["Tom & Jerry <3 'bolo'"]))
+    ssml_frames = [frame for frame in frames if parse_text_message(frame).get('Path') == 'ssml']
+    assert len(ssml_frames) == 1
+
+    headers, body = ssml_frames[0].split('\r\n\r\n', 1)
+    header_lines = headers.split('\r\n')
+    assert re.fullmatch(r'X-RequestId:[0-9a-f]{32}', header_lines[0])
+    assert header_lines[1] == 'Content-Type:application/ssml+xml'
+    assert header_lines[2].endswith('(Coordinated Universal Time)Z')
+    assert header_lines[3] == 'Path:ssml'
+    assert body == (
+        "<speak version='1.0' xmlns='http://www.w3.org/2001/10/synthesis' xml:lang='en-US'>"
+        f"<voice name='{FULL_VOICE}'>"
+        "<prosody pitch='+0Hz' rate='+0%' volume='+0%'>Tom &amp; Jerry &lt;3 'bolo'</prosody>"
+        "</voice></speak>"
+    )
+
+
+def test_malformed_voice_is_rejected_before_connecting():
+    async def run():
+        pool = EdgeConnectionPool(url='ws://127.0.0.1:9/unused')
+        try:
+            async for _ in pool.stream("Namaste", "not a voice"):
+                pass
+        finally:
+            await pool.close()
+
+    with pytest.raises(ValueError):
+        asyncio.run(run())
@@ -0,0 +1,129 @@
+"""
+gTTS token fetcher tests for TTS Bot
+Token order, connection pooling and failure handling against a local stand-in batchexecute server
+"""
+
+import json
+import base64
+import asyncio
+from urllib.parse import parse_qs
+
+import pytest
+from aiohttp import web
+
+from gtts_fetcher import GTTSTokenFetcher, GTTSFetchError
+from mp3_frames import scan_frames
+from tts_backends import OfflineTTSBackend
+
+TEXT = "Aaj subah office mein meeting thi, jisme naye project ke baare mein baat hui. " * 8
+
+
+def _token_text(body: str) -> str:
+    rpc = json.loads(parse_qs(body)['f.req'][0])
+    return json.loads(rpc[0][0][1])[0]
+
+
+def _frames(audio: bytes) -> bytes:
+    """MP3 frames of audio, without the joiner's duration header"""
+    return b"".join(audio[start:end] for start, end in scan_frames(audio).runs)
+
+
+class StandInServer:
+    """
+    Answers batchexecute posts with offline-rendered MP3 per token
+
+    Later tokens answer sooner, so concurrent tokens finish out of order; failing_token
+    answers HTTP 500 and every other token then hangs until the server stops.
+    """
+
+    def __init__(self, tokens, failing_token=None):
+        self.tokens = tokens
+        self.failing_token = failing_token
+        self.transports = set()
+        self.posts = 0
+        self._stopped = None
+        self._runner = None
+
+    async def start(self) -> str:
+        self._stopped = asyncio.Event()
+        app = web.Application()
+        app.router.add_post('/batchexecute', self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, '127.0.0.1', 0)
+        await site.start()
+        return f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}/batchexecute"
+
+    async def stop(self):
+        self._stopped.set()
+        await self._runner.cleanup()
+
+    async def _handle(self, request):
+        self.posts += 1
+        self.transports.add(id(request.transport))
+        text = _token_text(await request.text())
+        index = self.tokens.index(text)
+        if index == self.failing_token:
+            return web.Response(status=500)
+        if self.failing_token is not None:
+            await self._stopped.wait()
+            return web.Response(status=503)
+        await asyncio.sleep(0.01 * (len(self.tokens) - index))
+        audio = base64.b64encode(OfflineTTSBackend.render(text, 'hi')).decode('ascii')
+        line = json.dumps([["wrb.fr", "jQ1olc", f'["{audio}"]', None, None, None, "generic"]], separators=(',', ':'))
+        return web.Response(text=f")]}}'\n\n{len(line)}\n{line}\n", content_type='application/json')
+
+
+def _tokens():
+    return [_token_text(body) for body in GTTSTokenFetcher.request_bodies(TEXT, 'hi')]
+
+
+def test_tokens_joined_in_order_over_pooled_connections():
+    tokens = _tokens()
+    assert len(tokens) > 4
+
+    async def run():
+        server = StandInServer(tokens)
+        fetcher = GTTSTokenFetcher(url=await server.start(), concurrency=3)
+        try:
+            first = await fetcher.fetch(TEXT, 'hi')
+            connections = len(server.transports)
+            second = await fetcher.fetch(TEXT, 'hi')
+        finally:
+            await fetcher.close()
+            await server.stop()
+        return first.getvalue(), second.getvalue(), connections, server, fetcher
+
+    first, second, connections, server, fetcher = asyncio.run(run())
+    expected = b"".join(_frames(OfflineTTSBackend.render(token, 'hi')) for token in tokens)
+    assert _frames(first) == expected
+    assert _frames(second) == expected
+    # At most `concurrency` connections, and the second request reuses them
+    assert connections <= 3
+    assert len(server.transports) == connections
+    assert server.posts == 2 * len(tokens)
+    assert fetcher.stats['peak_in_flight'] == 3
+
+
+def test_failed_token_raises_and_cancels_the_rest():
+    tokens = _tokens()
+
+    async def run():
+        server = StandInServer(tokens, failing_token=1)
+        fetcher = GTTSTokenFetcher(url=await server.start(), concurrency=len(tokens))
+        try:
+            with pytest.raises(GTTSFetchError, match="HTTP 500"):
+                await asyncio.wait_for(fetcher.fetch(TEXT, 'hi'), 5)
+            in_flight = fetcher._in_flight
+            pending = [task for task in asyncio.all_tasks() if task.get_coro().__name__ == '_fetch_token']
+        finally:
+            await fetcher.close()
+            await server.stop()
+        return in_flight, pending, server, fetcher
+
+    in_flight, pending, server, fetcher = asyncio.run(run())
+    # The other tokens never answer: they were cancelled, not awaited
+    assert server.posts > 1
+    assert in_flight == 0
+    assert pending == []
+    assert fetcher.stats['failed'] == 1
@@ -0,0 +1,42 @@
+"""
+Text chunker tests for TTS Bot
+Source offsets of chunks, used to resume a progressive request from the exact undelivered text
+"""
+
+from text_chunker import split_text_chunks, split_sentence_fragments, source_end_offsets
+
+
+def _words(count: int) -> str:
+    # Clause dashes are dropped by the chunker, and a 150-character word is hard-cut
+    sentence = "Aaj ki meeting - project par baat karenge, phir lunch {}. "
+    return "".join(sentence.format(index) for index in range(count // 9)) + "x" * 150 + " khatam."
+
+
+def test_chunks_drop_words_that_offsets_keep():
+    text = _words(320)
+    chunks = split_text_chunks(text, 120)
+    assert sum(len(chunk.split()) for chunk in chunks) != len(text.split())
+
+    ends = source_end_offsets(text, chunks)
+    assert ends == sorted(ends)
+    assert ends[-1] == len(text)
+
+
+def test_offsets_split_text_into_consecutive_slices():
+    text = _words(320)
+    for split in (split_text_chunks, split_sentence_fragments):
+        chunks = split(text, 120)
+        start = 0
+        for chunk, end in zip(chunks, source_end_offsets(text, chunks)):
+            source = text[start:end]
+            # The slice is the chunk plus dropped separators only
+            assert "".join(source.split()).replace("-", "") == "".join(chunk.split()).replace("-", "")
+            start = end
+
+
+def test_resume_slice_is_undelivered_text():
+    text = "Pehla vakya yahan hai. Doosra vakya - thoda lamba hai. Teesra vakya."
+    chunks = split_sentence_fragments(text, 400)
+    ends = source_end_offsets(text, chunks)
+    assert text[ends[0]:].strip() == "Doosra vakya - thoda lamba hai. Teesra vakya."
+    assert len(text[:ends[0]].split()) == 4
@@ -0,0 +1,109 @@
+"""
+TTS scheduler tests for TTS Bot
+Cancelled jobs leave no slot held and nothing queued, wherever the cancellation lands
+"""
+
+import asyncio
+
+import pytest
+
+from tts_scheduler import TTSScheduler
+
+
+async def _cancel_queued_job(cancel_in: str) -> TTSScheduler:
+    """
+    One slot held by user 1 while user 2 queues; user 2's job is cancelled
+
+    cancel_in: 'queued' (waiting, no callback), 'callback' (inside on_queued) or
+    'granted' (inside on_queued after the slot was already handed to the job)
+    """
+    scheduler = TTSScheduler(max_in_flight=1, per_user_limit=1)
+    release_first = asyncio.Event()
+    callback_started = asyncio.Event()
+    entered = False
+
+    async def on_queued(position):
+        assert position == 1
+        callback_started.set()
+        await asyncio.sleep(1)  # Editing the status message
+
+    async def holder():
+        async with scheduler.slot(1):
+            await release_first.wait()
+
+    async def waiter():
+        nonlocal entered
+        async with scheduler.slot(2, on_queued=None if cancel_in == 'queued' else on_queued):
+            entered = True
+
+    first = asyncio.create_task(holder())
+    await asyncio.sleep(0)
+    queued = asyncio.create_task(waiter())
+    if cancel_in == 'queued':
+        await asyncio.sleep(0.01)
+    else:
+        await callback_started.wait()
+    if cancel_in == 'granted':
+        release_first.set()  # The slot is granted while the callback is still running
+        await asyncio.sleep(0.01)
+        assert scheduler.get_stats()['in_flight'] == 1
+    assert scheduler.get_stats()['queue_depth'] == (0 if cancel_in == 'granted' else 1)
+
+    queued.cancel()
+    await asyncio.gather(queued, return_exceptions=True)
+    assert queued.cancelled()
+    assert not entered
+    # Dequeued right away, not left for the next dispatch to skip
+    stats = scheduler.get_stats()
+    assert stats['queue_depth'] == 0
+    assert stats['waiting_users'] == 0
+    assert stats['in_flight'] == (0 if cancel_in == 'granted' else 1)
+    release_first.set()
+    await first
+    return scheduler
+
+
+@pytest.mark.parametrize('cancel_in', ['queued', 'callback', 'granted'])
+def test_cancelled_job_leaves_no_slot_or_queue_entry(cancel_in):
+    async def run():
+        scheduler = await asyncio.wait_for(_cancel_queued_job(cancel_in), 5)
+        stats = scheduler.get_stats()
+        assert stats['in_flight'] == 0
+        assert stats['queue_depth'] == 0
+        assert stats['waiting_users'] == 0
+        assert stats['cancelled'] == 1
+        assert scheduler._queues == {}
+        assert scheduler._user_in_flight == {}
+
+        # Both users get a slot straight away afterwards
+        for user_id in (1, 2):
+            async with scheduler.slot(user_id):
+                assert scheduler.get_stats()['in_flight'] == 1
+        return scheduler.get_stats()
+
+    stats = asyncio.run(run())
+    assert stats['in_flight'] == 0
+
+
+
+def test_user_limit_lets_one_job_run_beside_the_users_others():
+    async def run():
+        scheduler = TTSScheduler(max_in_flight=8, per_user_limit=1)
+        peak = 0
+        running = 0
+
+        async def line():
+            nonlocal peak, running
+            async with scheduler.slot(1, user_limit=4):
+                running += 1
+                peak = max(peak, running)
+                await asyncio.sleep(0.01)
+                running -= 1
+
+        await asyncio.gather(*(line() for _ in range(10)))
+        return peak, scheduler.get_stats()
+
+    peak, stats = asyncio.run(run())
+    assert peak == 4
+    assert stats['in_flight'] == 0
+    assert stats['queue_depth'] == 0
@@ -0,0 +1,103 @@
+"""
+Half-open voice circuit tests for TTS Bot
+The single trial request of a recovering voice is always given back or resolved, and probes one request at a time
+"""
+
+import asyncio
+
+import pytest
+
+from audio_cache import AudioCache
+from tts_backends import OfflineTTSBackend
+from tts_service import TTSService
+from voice_health import FAILURE_THRESHOLD, BASE_COOLDOWN, CircuitState
+
+TRIAL_TEXT = "Namaste, yeh trial request hai."
+LONG_TEXT = " ".join(f"Line {index}: aaj ki meeting mein hum project par baat karenge." for index in range(12))
+
+
+class ProbeBackend:
+    """Offline backend counting requests in flight at once"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.in_flight = 0
+        self.peak = 0
+        self.requests = 0
+
+    async def stream(self, text, voice):
+        self.requests += 1
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            async for chunk in self.backend.stream(text, voice):
+                yield chunk
+        finally:
+            self.in_flight -= 1
+
+
+def _half_open_service(failing: bool = False):
+    """Service whose selected voice has just gone half-open"""
+    service = TTSService(primary_backend=OfflineTTSBackend(failure_rate=0), fallback_backend=OfflineTTSBackend(failure_rate=0))
+    voice = service.get_voice_id('male1')
+    backend = OfflineTTSBackend(first_byte_seconds=0.05, jitter=0, failure_rate=0, failing_voices={voice} if failing else None)
+    service.primary_backend = ProbeBackend(backend)
+    service.audio_cache = AudioCache(disk_budget_bytes=0)
+    service.fragment_cache = AudioCache(disk_budget_bytes=0)
+    health = service.voice_health
+    for _ in range(FAILURE_THRESHOLD):
+        health.record_failure(voice)
+    health._voices[voice].opened_at -= health._voices[voice].cooldown  # Cooldown over
+    assert health.get_stats()[voice]['state'] == CircuitState.HALF_OPEN
+    return service, voice
+
+
+def test_cancelled_trial_is_released():
+    async def run():
+        service, voice = _half_open_service()
+        trial = asyncio.create_task(service._stream_edge_chunk(TRIAL_TEXT, voice))
+        await asyncio.sleep(0.01)
+        assert not service.voice_health.is_available(voice)  # The trial is taken while it runs
+        trial.cancel()
+        await asyncio.gather(trial, return_exceptions=True)
+        assert trial.cancelled()
+
+        # No verdict: the voice is still half-open, and the next request may probe it
+        assert service.voice_health.get_stats()[voice]['state'] == CircuitState.HALF_OPEN
+        assert service.voice_health.is_available(voice)
+        await service._stream_edge_chunk("Namaste, yeh agla request hai.", voice)
+        return service.voice_health.get_stats()[voice]['state']
+
+    assert asyncio.run(run()) == CircuitState.CLOSED
+
+
+def test_failed_trial_reopens_the_circuit_and_probes_again_after_cooldown():
+    async def run():
+        service, voice = _half_open_service(failing=True)
+        health = service.voice_health
+        with pytest.raises(Exception):
+            await service._stream_edge_chunk(TRIAL_TEXT, voice)
+
+        record = health._voices[voice]
+        assert record.state == CircuitState.OPEN
+        assert record.cooldown == BASE_COOLDOWN * 2
+        assert not health.is_available(voice)
+
+        # After the longer cooldown the voice gets a new trial, not a stuck one
+        record.opened_at -= record.cooldown
+        assert health.is_available(voice)
+        assert health.acquire_trial(voice)
+
+    asyncio.run(run())
+
+
+def test_long_text_probes_a_half_open_voice_one_chunk_at_a_time():
+    async def run():
+        service, voice = _half_open_service()
+        audio = await service._generate_chunked_edge_tts(LONG_TEXT, voice)
+        return service, voice, audio
+
+    service, voice, audio = asyncio.run(run())
+    assert audio.nbytes
+    assert service.primary_backend.peak == 1
+    assert service.voice_health.get_stats()[voice]['state'] == CircuitState.CLOSED
@@ -0,0 +1,105 @@
+"""
+Text Chunker for TTS Bot
+Splits long text at sentence and clause boundaries into synthesis-sized chunks
+"""
+
+import re
+from typing import List
+
+# Sentence terminators for English and Hindi (danda / double danda), plus hard line breaks
+SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?।॥])\s+|\s*\n+\s*')
+# Clause boundaries used when a single sentence is still too long
+CLAUSE_SPLIT_RE = re.compile(r'(?<=[,;:])\s+|\s+[-–—]\s+')
+
+DEFAULT_MAX_CHUNK_CHARS = 400
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split text into sentences, keeping terminators attached"""
+    return [part.strip() for part in SENTENCE_SPLIT_RE.split(text or '') if part and part.strip()]
+
+
+def _split_oversized(sentence: str, max_chars: int) -> List[str]:
+    """Break one oversized sentence at clause boundaries, then at word boundaries"""
+    pieces = []
+    for clause in (part.strip() for part in CLAUSE_SPLIT_RE.split(sentence) if part and part.strip()):
+        if len(clause) <= max_chars:
+            pieces.append(clause)
+            continue
+
+        # Last resort: pack words, hard-cutting words longer than the limit
+        current = ''
+        for word in clause.split():
+            while len(word) > max_chars:
+                if current:
+                    pieces.append(current)
+                    current = ''
+                pieces.append(word[:max_chars])
+                word = word[max_chars:]
+            candidate = f"{current} {word}" if current else word
+            if len(candidate) > max_chars:
+                pieces.append(current)
+                current = word
+            else:
+                current = candidate
+        if current:
+            pieces.append(current)
+    return pieces
+
+
+def split_text_chunks(text: str, max_chars: int = DEFAULT_MAX_CHUNK_CHARS) -> List[str]:
+    """
+    Split text into ordered chunks of at most max_chars characters
+
+    Whole sentences are packed together where they fit; sentences longer than
+    the limit are broken at clause boundaries first.
+    """
+    chunks = []
+    current = ''
+    for sentence in split_sentences(text):
+        pieces = [sentence] if len(sentence) <= max_chars else _split_oversized(sentence, max_chars)
+        for piece in pieces:
+            candidate = f"{current} {piece}" if current else piece
+            if len(candidate) > max_chars:
+                chunks.append(current)
+                current = piece
+            else:
+                current = candidate
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def split_sentence_fragments(text: str, max_chars: int = DEFAULT_MAX_CHUNK_CHARS) -> List[str]:
+    """
+    Split text into one fragment per sentence (oversized sentences broken at clause boundaries)
+
+    Unlike split_text_chunks, sentences are never packed together, so a fragment does
+    not depend on its neighbours: editing one sentence leaves every other fragment
+    of the text unchanged.
+    """
+    fragments = []
+    for sentence in split_sentences(text):
+        fragments.extend([sentence] if len(sentence) <= max_chars else _split_oversized(sentence, max_chars))
+    return fragments
+
+
+def source_end_offsets(text: str, pieces: List[str]) -> List[int]:
+    """
+    End offset in text of each piece, for pieces split from text in order by the functions above
+
+    Splitting only drops separators (whitespace, clause dashes) and re-joins with single
+    spaces, so a piece's other characters appear in text in the same order; text[:offset]
+    is exactly the source covered by the pieces up to that one, even when a piece ends
+    inside a hard-cut word.
+    """
+    offsets = []
+    position = 0
+    for piece in pieces:
+        for char in piece:
+            if char.isspace():
+                continue
+            found = text.find(char, position)
+            position = found + 1 if found >= 0 else len(text)
+        offsets.append(position)
+    return offsets
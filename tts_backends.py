@@ -0,0 +1,248 @@
+"""
+TTS Backends for TTS Bot
+Pluggable synthesis engines behind one interface: Edge TTS, gTTS and an offline deterministic engine
+"""
+
+import os
+import random
+import asyncio
+import hashlib
+import logging
+from io import BytesIO
+from concurrent.futures import Executor
+from typing import AsyncIterator, Optional
+
+from executors import executors, Pool
+
+logger = logging.getLogger(__name__)
+
+# Backend names used for the primary (neural voice) and fallback engines
+PRIMARY_BACKEND = os.getenv('TTS_BACKEND', 'edge')
+FALLBACK_BACKEND = os.getenv('TTS_FALLBACK_BACKEND', 'gtts')
+
+# Offline engine: simulated latency and failure injection
+OFFLINE_FIRST_BYTE_SECONDS = float(os.getenv('TTS_OFFLINE_FIRST_BYTE_SECONDS', '0.3'))
+OFFLINE_SECONDS_PER_100_CHARS = float(os.getenv('TTS_OFFLINE_SECONDS_PER_100_CHARS', '0.2'))
+OFFLINE_LATENCY_JITTER = float(os.getenv('TTS_OFFLINE_LATENCY_JITTER', '0.1'))
+OFFLINE_FAILURE_RATE = float(os.getenv('TTS_OFFLINE_FAILURE_RATE', '0'))
+OFFLINE_SEED = int(os.getenv('TTS_OFFLINE_SEED', '42'))
+# Spoken duration of one character of text in the generated audio
+OFFLINE_MS_PER_CHAR = 60
+
+# One silent MPEG-2 Layer III frame: 24 kHz, 48 kbps, mono - the same format Edge TTS returns.
+# Header FF F3 64 C0, zeroed side info and main data (part2_3_length = 0 decodes as silence).
+MP3_FRAME_BYTES = 144
+MP3_FRAME_MS = 24
+SILENT_MP3_FRAME = bytes([0xFF, 0xF3, 0x64, 0xC0]) + bytes(MP3_FRAME_BYTES - 4)
+
+
+class TTSBackendError(Exception):
+    """Raised when a backend fails to synthesize audio"""
+
+
+class TTSBackend:
+    """
+    Base class for synthesis engines
+
+    Subclasses implement stream(); synthesize() collects the stream into MP3 bytes.
+    The voice argument is backend-specific (Edge voice id, gTTS language code, ...).
+    """
+
+    name = "base"
+
+    async def stream(self, text: str, voice: str) -> AsyncIterator[bytes]:
+        """Yield MP3 audio chunks for text as they are produced"""
+        raise NotImplementedError
+        yield b""  # pragma: no cover - makes this an async generator
+
+    async def synthesize(self, text: str, voice: str) -> bytes:
+        """Synthesize text and return the complete MP3 audio"""
+        audio_data = BytesIO()
+        async for chunk in self.stream(text, voice):
+            audio_data.write(chunk)
+        audio_bytes = audio_data.getvalue()
+        if not audio_bytes:
+            raise TTSBackendError(f"{self.name}: empty audio data generated")
+        return audio_bytes
+
+    async def warm(self, voice: str, count: int = 1, ttl: Optional[float] = None):
+        """Prepare for requests expected soon (e.g. open connections); engines without setup cost do nothing"""
+
+    def get_stats(self) -> dict:
+        return {'name': self.name}
+
+    async def close(self):
+        """Release connections and other resources held by the backend"""
+
+
+class EdgeTTSBackend(TTSBackend):
+    """
+    Microsoft Edge neural voices
+
+    Requests go through a pool of warm WebSocket connections (edge_pool.py);
+    with EDGE_TTS_POOL_SIZE=0 every request opens its own edge_tts.Communicate session.
+    """
+
+    name = "edge"
+
+    def __init__(self, pool=None):
+        from edge_pool import EdgeConnectionPool, EDGE_POOL_SIZE
+
+        if pool is None and EDGE_POOL_SIZE > 0:
+            pool = EdgeConnectionPool()
+        self.pool = pool
+
+    async def stream(self, text: str, voice: str) -> AsyncIterator[bytes]:
+        if self.pool is not None:
+            async for chunk in self.pool.stream(text, voice):
+                yield chunk
+            return
+
+        import edge_tts
+
+        communicate = edge_tts.Communicate(text, voice)
+        async for chunk in communicate.stream():
+            if chunk["type"] == "audio":
+                yield chunk["data"]
+
+    async def warm(self, voice: str, count: int = 1, ttl: Optional[float] = None):
+        # The voice is chosen per request in the SSML, so any pooled connection serves it
+        if self.pool is not None:
+            await self.pool.warm(count, ttl)
+
+    async def close(self):
+        if self.pool is not None:
+            await self.pool.close()
+
+    def get_stats(self) -> dict:
+        stats = {'name': self.name}
+        if self.pool is not None:
+            stats['pool'] = self.pool.get_stats()
+        return stats
+
+
+class GTTSBackend(TTSBackend):
+    """
+    Google Translate TTS. voice is a gTTS language code.
+
+    Text tokens are fetched concurrently over a pooled HTTP session (gtts_fetcher.py);
+    with GTTS_CONCURRENCY=0 gTTS fetches them one by one on the shared network-io pool.
+    """
+
+    name = "gtts"
+
+    def __init__(self, executor: Optional[Executor] = None, fetcher=None):
+        from gtts_fetcher import GTTSTokenFetcher, GTTS_CONCURRENCY
+
+        if fetcher is None and GTTS_CONCURRENCY > 0:
+            fetcher = GTTSTokenFetcher()
+        self.fetcher = fetcher
+        self.executor = executor or executors.get(Pool.NETWORK_IO)
+
+    def _synthesize_blocking(self, text: str, lang: str) -> bytes:
+        from gtts import gTTS
+
+        tts = gTTS(text=text, lang=lang, slow=False)
+        audio_buffer = BytesIO()
+        tts.write_to_fp(audio_buffer)
+        return audio_buffer.getvalue()
+
+    async def stream(self, text: str, voice: str) -> AsyncIterator[bytes]:
+        if self.fetcher is not None:
+            audio_buffer = await self.fetcher.fetch(text, voice)
+            try:
+                yield audio_buffer.freeze()
+            finally:
+                audio_buffer.close()
+            return
+
+        loop = asyncio.get_running_loop()
+        yield await loop.run_in_executor(self.executor, self._synthesize_blocking, text, voice)
+
+    async def close(self):
+        if self.fetcher is not None:
+            await self.fetcher.close()
+
+    def get_stats(self) -> dict:
+        stats = {'name': self.name}
+        if self.fetcher is not None:
+            stats['fetcher'] = self.fetcher.get_stats()
+        return stats
+
+
+class OfflineTTSBackend(TTSBackend):
+    """
+    Local engine for load tests and benchmarks: no network, deterministic output
+
+    The same (text, voice) always yields the same silent MP3 of a length proportional
+    to the text. Latency is first-byte delay plus a per-character cost (with seeded
+    jitter), and a seeded fraction of requests fails to exercise retries and fallbacks.
+    """
+
+    name = "offline"
+
+    def __init__(
+        self,
+        first_byte_seconds: float = OFFLINE_FIRST_BYTE_SECONDS,
+        seconds_per_100_chars: float = OFFLINE_SECONDS_PER_100_CHARS,
+        jitter: float = OFFLINE_LATENCY_JITTER,
+        failure_rate: float = OFFLINE_FAILURE_RATE,
+        seed: int = OFFLINE_SEED,
+        failing_voices: Optional[set] = None
+    ):
+        self.first_byte_seconds = first_byte_seconds
+        self.seconds_per_100_chars = seconds_per_100_chars
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.failing_voices = set(failing_voices or ())
+        self._random = random.Random(seed)
+        self.stats = {'requests': 0, 'failures': 0, 'bytes': 0}
+
+    @staticmethod
+    def render(text: str, voice: str) -> bytes:
+        """Deterministic MP3 for (text, voice): silent frames, tagged with a content hash"""
+        frames = max(1, len(text.strip()) * OFFLINE_MS_PER_CHAR // MP3_FRAME_MS)
+        tag = hashlib.sha256(f"{voice}\x00{text}".encode('utf-8')).digest()
+        # The hash is stored in the first frame's (ignored) main data so outputs differ per input
+        first_frame = SILENT_MP3_FRAME[:-len(tag)] + tag
+        return first_frame + SILENT_MP3_FRAME * (frames - 1)
+
+    async def stream(self, text: str, voice: str) -> AsyncIterator[bytes]:
+        self.stats['requests'] += 1
+        jitter = 1 + self._random.uniform(-self.jitter, self.jitter)
+        fail = voice in self.failing_voices or self._random.random() < self.failure_rate
+
+        await asyncio.sleep(self.first_byte_seconds * jitter)
+        if fail:
+            self.stats['failures'] += 1
+            raise TTSBackendError(f"offline: injected failure for voice {voice}")
+
+        audio_bytes = self.render(text, voice)
+        self.stats['bytes'] += len(audio_bytes)
+        # Spread the remaining synthesis time over a few chunks, like a real stream
+        chunk_count = 4
+        chunk_size = -(-len(audio_bytes) // chunk_count)
+        remaining = self.seconds_per_100_chars * len(text) / 100 * jitter
+        for offset in range(0, len(audio_bytes), chunk_size):
+            if offset:
+                await asyncio.sleep(remaining / (chunk_count - 1))
+            yield audio_bytes[offset:offset + chunk_size]
+
+    def get_stats(self) -> dict:
+        return {'name': self.name, **self.stats}
+
+
+BACKENDS = {
+    EdgeTTSBackend.name: EdgeTTSBackend,
+    GTTSBackend.name: GTTSBackend,
+    OfflineTTSBackend.name: OfflineTTSBackend,
+}
+
+
+def create_backend(name: str, **kwargs) -> TTSBackend:
+    """Instantiate a backend by name ('edge', 'gtts' or 'offline')"""
+    try:
+        backend_class = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown TTS backend: {name} (available: {', '.join(BACKENDS)})")
+    return backend_class(**kwargs)
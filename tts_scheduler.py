@@ -0,0 +1,218 @@
+"""
+TTS Job Scheduler for Telegram TTS Bot
+Admission control in front of TTSService: global in-flight limit, per-user caps and round-robin fairness
+"""
+
+import os
+import time
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Optional, Dict, Any, Callable, Awaitable
+
+logger = logging.getLogger(__name__)
+
+MAX_IN_FLIGHT = int(os.getenv('TTS_MAX_IN_FLIGHT', '8'))
+PER_USER_LIMIT = int(os.getenv('TTS_PER_USER_LIMIT', '1'))
+MAX_QUEUE_DEPTH = int(os.getenv('TTS_MAX_QUEUE_DEPTH', '200'))
+
+
+class TTSQueueFull(Exception):
+    """Raised when the scheduler queue is at capacity and a new job cannot be admitted"""
+
+
+class _Job:
+    __slots__ = ('user_id', 'future', 'enqueued_at', 'user_limit')
+
+    def __init__(self, user_id: int, future: asyncio.Future, user_limit: int):
+        self.user_id = user_id
+        self.future = future
+        self.user_limit = user_limit
+        self.enqueued_at = time.monotonic()
+
+
+class TTSScheduler:
+    """
+    Fair scheduler for TTS jobs
+
+    Jobs wait in per-user FIFO queues; free slots are handed out round-robin across
+    users, so a user with many queued messages cannot starve everyone else.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = MAX_IN_FLIGHT,
+        per_user_limit: int = PER_USER_LIMIT,
+        max_queue_depth: int = MAX_QUEUE_DEPTH
+    ):
+        self.max_in_flight = max_in_flight
+        self.per_user_limit = per_user_limit
+        self.max_queue_depth = max_queue_depth
+
+        # user_id -> queued jobs; dict order is the round-robin order
+        self._queues: "OrderedDict[int, deque]" = OrderedDict()
+        self._queued_jobs = 0
+        self._in_flight = 0
+        self._user_in_flight: Dict[int, int] = {}
+
+        self._wait_times: deque = deque(maxlen=500)
+        self.stats = {
+            'submitted': 0,
+            'admitted': 0,
+            'queued': 0,
+            'rejected': 0,
+            'cancelled': 0,
+            'completed': 0,
+            'max_queue_depth_seen': 0,
+        }
+
+    def _user_has_capacity(self, user_id: int, user_limit: int) -> bool:
+        return self._user_in_flight.get(user_id, 0) < user_limit
+
+    def _dispatch(self):
+        """Grant free slots to queued jobs, one user at a time in round-robin order"""
+        while self._in_flight < self.max_in_flight and self._queues:
+            granted = False
+            for user_id, queue in list(self._queues.items()):
+                if not self._user_has_capacity(user_id, queue[0].user_limit):
+                    continue
+
+                queue = self._queues.pop(user_id)
+                job = queue.popleft()
+                self._queued_jobs -= 1
+                if queue:
+                    # Re-append at the back so the next free slot goes to another user
+                    self._queues[user_id] = queue
+
+                if job.future.done():
+                    # Waiter was cancelled before its turn came up
+                    granted = True
+                    break
+
+                self._grant(job)
+                granted = True
+                break
+
+            if not granted:
+                break
+
+    def _grant(self, job: _Job):
+        self._in_flight += 1
+        self._user_in_flight[job.user_id] = self._user_in_flight.get(job.user_id, 0) + 1
+        self._wait_times.append(time.monotonic() - job.enqueued_at)
+        self.stats['admitted'] += 1
+        if not job.future.done():
+            job.future.set_result(True)
+
+    def _release(self, user_id: int):
+        self._in_flight -= 1
+        remaining = self._user_in_flight.get(user_id, 1) - 1
+        if remaining > 0:
+            self._user_in_flight[user_id] = remaining
+        else:
+            self._user_in_flight.pop(user_id, None)
+        self.stats['completed'] += 1
+        self._dispatch()
+
+    def _remove_queued(self, job: _Job):
+        queue = self._queues.get(job.user_id)
+        if queue and job in queue:
+            queue.remove(job)
+            self._queued_jobs -= 1
+            if not queue:
+                self._queues.pop(job.user_id, None)
+
+    def get_position(self, job: _Job) -> int:
+        """Estimated 1-based queue position of a waiting job under round-robin ordering"""
+        queue = self._queues.get(job.user_id)
+        if not queue or job not in queue:
+            return 0
+
+        own_index = queue.index(job)
+        ahead = own_index
+        before_user = True
+        for user_id, other_queue in self._queues.items():
+            if user_id == job.user_id:
+                before_user = False
+                continue
+            # Users earlier in the rotation get one extra turn before ours in the same round
+            ahead += min(len(other_queue), own_index + (1 if before_user else 0))
+        return ahead + 1
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        user_id: int,
+        on_queued: Optional[Callable[[int], Awaitable[None]]] = None,
+        user_limit: Optional[int] = None
+    ):
+        """
+        Hold a TTS slot for the duration of the block
+
+        Args:
+            user_id: User the job belongs to
+            on_queued: Optional coroutine called with the queue position if the job has to wait
+            user_limit: Per-user cap for this job instead of per_user_limit, e.g. a bulk batch
+                running several lines at once (the global limit and round-robin still apply)
+
+        Raises:
+            TTSQueueFull: If the queue is already at max_queue_depth
+        """
+        self.stats['submitted'] += 1
+        loop = asyncio.get_running_loop()
+        job = _Job(user_id, loop.create_future(), max(self.per_user_limit, user_limit or 0))
+
+        if self._in_flight < self.max_in_flight and self._user_has_capacity(user_id, job.user_limit) and not self._queues.get(user_id):
+            self._grant(job)
+        else:
+            if self._queued_jobs >= self.max_queue_depth:
+                self.stats['rejected'] += 1
+                raise TTSQueueFull(f"TTS queue is full ({self._queued_jobs} jobs waiting)")
+
+            self._queues.setdefault(user_id, deque()).append(job)
+            self._queued_jobs += 1
+            self.stats['queued'] += 1
+            self.stats['max_queue_depth_seen'] = max(self.stats['max_queue_depth_seen'], self._queued_jobs)
+            self._dispatch()
+
+            # A cancellation while the callback edits the status message must also dequeue the job
+            try:
+                if not job.future.done() and on_queued:
+                    try:
+                        await on_queued(self.get_position(job))
+                    except Exception as e:
+                        logger.warning(f"Queue position callback failed: {e}")
+
+                await job.future
+            except asyncio.CancelledError:
+                if job.future.done() and not job.future.cancelled():
+                    self._release(user_id)
+                else:
+                    self._remove_queued(job)
+                self.stats['cancelled'] += 1
+                raise
+
+        try:
+            yield
+        finally:
+            self._release(user_id)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get queue depth, in-flight and wait-time metrics"""
+        waits = sorted(self._wait_times)
+        return {
+            **self.stats,
+            'in_flight': self._in_flight,
+            'max_in_flight': self.max_in_flight,
+            'per_user_limit': self.per_user_limit,
+            'queue_depth': self._queued_jobs,
+            'waiting_users': len(self._queues),
+            'avg_wait_ms': round(sum(waits) / len(waits) * 1000, 1) if waits else 0.0,
+            'p95_wait_ms': round(waits[min(len(waits) - 1, int(len(waits) * 0.95))] * 1000, 1) if waits else 0.0,
+            'max_wait_ms': round(waits[-1] * 1000, 1) if waits else 0.0,
+        }
+
+
+# Global scheduler instance
+tts_scheduler = TTSScheduler()
@@ -1,15 +1,145 @@
 import os
 import asyncio
-import tempfile
-import re
-import unicodedata
-from io import BytesIO
-from concurrent.futures import ThreadPoolExecutor
-import edge_tts
+import contextvars
+from collections import deque
+from audio_cache import AudioCache, make_cache_key, FRAGMENT_CACHE_DIR, FRAGMENT_MEMORY_BUDGET_BYTES, FRAGMENT_DISK_BUDGET_BYTES
+from audio_buffer import AudioBuffer
+from mp3_frames import MP3Joiner
+from text_chunker import split_text_chunks, split_sentence_fragments, source_end_offsets
+from language_detector import detect_language, segment_languages
+from voice_health import VoiceHealthRegistry
+from tts_backends import TTSBackend, create_backend, PRIMARY_BACKEND, FALLBACK_BACKEND
+from latency_metrics import latency_metrics, Stage
+from structured_logging import get_logger
+
+logger = get_logger(__name__)
+
+# Chunked synthesis settings for long texts
+CHUNKED_MIN_CHARS = int(os.getenv('TTS_CHUNKED_MIN_CHARS', '600'))
+CHUNK_MAX_CHARS = int(os.getenv('TTS_CHUNK_MAX_CHARS', '400'))
+CHUNK_CONCURRENCY = int(os.getenv('TTS_CHUNK_CONCURRENCY', '4'))
+# Silence inserted between joined chunks (whole MP3 frames, 24 ms each for Edge TTS)
+SEGMENT_GAP_MS = int(os.getenv('TTS_SEGMENT_GAP_MS', '0'))
+
+# Sentence fragments: chunked texts are synthesized one sentence per request and each sentence's
+# audio is cached, so an edited text only re-synthesizes the sentences that changed
+FRAGMENT_CACHE_ENABLED = os.getenv('TTS_FRAGMENT_CACHE', '1') == '1'
+
+# Progressive delivery: size of the first (fast) part and of the follow-up parts
+PROGRESSIVE_FIRST_PART_CHARS = int(os.getenv('TTS_PROGRESSIVE_FIRST_PART_CHARS', '200'))
+PROGRESSIVE_PART_CHARS = int(os.getenv('TTS_PROGRESSIVE_PART_CHARS', '1200'))
+
+# One time budget per request, shared by primary retries, hedges, fallback voices and gTTS
+REQUEST_DEADLINE_SECONDS = float(os.getenv('TTS_REQUEST_DEADLINE_SECONDS', '45'))
+# A retry is only started if at least this much of the primary voice's budget is left after the backoff
+MIN_ATTEMPT_SECONDS = 2
+
+# Fallback routing: tail of the request deadline that the primary voice leaves for the fallback chain
+FALLBACK_BUDGET_SECONDS = float(os.getenv('TTS_FALLBACK_BUDGET_SECONDS', '15'))
+FALLBACK_ATTEMPT_TIMEOUT = float(os.getenv('TTS_FALLBACK_ATTEMPT_TIMEOUT', '10'))
+FALLBACK_GTTS_RESERVE_SECONDS = 8
+FALLBACK_MAX_VOICES = 3
+
+# Speculative warm-up: picking a voice pre-opens a synthesis connection for the text that follows
+WARMUP_ENABLED = os.getenv('TTS_WARMUP', '1') == '1'
+WARMUP_TTL_SECONDS = float(os.getenv('TTS_WARMUP_TTL_SECONDS', '60'))
+
+# Code-switched text: read each Hindi / English span with the paired voice for its language
+CODE_SWITCH_ENABLED = os.getenv('TTS_CODE_SWITCH', '1') == '1'
+
+# Hedged requests: race a backup engine when the first audio byte is late
+HEDGE_ENABLED = os.getenv('TTS_HEDGE_ENABLED', '1') == '1'
+HEDGE_PERCENTILE = float(os.getenv('TTS_HEDGE_PERCENTILE', '95'))
+HEDGE_DEFAULT_THRESHOLD = float(os.getenv('TTS_HEDGE_DEFAULT_THRESHOLD', '2.5'))
+HEDGE_MIN_THRESHOLD = 0.5
+HEDGE_MAX_THRESHOLD = 10.0
+HEDGE_MIN_SAMPLES = 20
+
+# Explicit same-gender EN↔HI voice pairing dictionary
+VOICE_LANGUAGE_PAIRS = {
+    # Male Hindi ↔ Male English pairings
+    'male1': 'male2',  # Hindi Deep Bass ↔ English Ocean Calm
+    'male2': 'male1',  # English Ocean Calm ↔ Hindi Deep Bass
+    'male3': 'male4',  # Hindi Professional ↔ English Energetic
+    'male4': 'male3',  # English Energetic ↔ Hindi Professional
+    'male5': 'male6',  # Hindi Warm Tone ↔ English Strong Voice (UNIQUE!)
+    'male6': 'male5',  # English Strong Voice ↔ Hindi Warm Tone
+
+    # Female Hindi ↔ Female English pairings
+    'female1': 'female2',  # Hindi Honey Sweet ↔ English Crystal Clear
+    'female2': 'female1',  # English Crystal Clear ↔ Hindi Honey Sweet
+    'female3': 'female4',  # Hindi Soft Whisper ↔ English Bright Star
+    'female4': 'female3',  # English Bright Star ↔ Hindi Soft Whisper
+    'female5': 'female6',  # Hindi Melodic Angel ↔ English Gentle Tone (UNIQUE!)
+    'female6': 'female5',  # English Gentle Tone ↔ Hindi Melodic Angel
+}
+
+
+class TTSDeadlineExceeded(Exception):
+    """Raised when a request's time budget runs out before any engine produced audio"""
+
+
+class RequestDeadline:
+    """
+    Time budget of one synthesis request, as an absolute event-loop time
+
+    The whole retry / hedge / fallback / gTTS chain runs inside asyncio.timeout_at(at),
+    so a stalled stream is cancelled when the budget ends rather than after its own
+    timeout. The last `reserve` seconds are kept back from the primary voice for the
+    fallback chain. Tasks spawned for chunks see the deadline through _current_deadline.
+    """
+
+    def __init__(self, seconds: float = REQUEST_DEADLINE_SECONDS, reserve: float = 0.0):
+        self.seconds = seconds
+        self.at = asyncio.get_running_loop().time() + seconds
+        self.reserve = min(reserve, seconds / 2)
+
+    @property
+    def primary_at(self) -> float:
+        """Loop time by which the primary voice (with its retries) has to give up"""
+        return self.at - self.reserve
+
+    def remaining(self) -> float:
+        return self.at - asyncio.get_running_loop().time()
+
+    def allows_retry(self, delay: float) -> bool:
+        """Whether backing off for delay seconds still leaves the primary voice time for a real attempt"""
+        return self.primary_at - asyncio.get_running_loop().time() >= delay + MIN_ATTEMPT_SECONDS
+
+    def extend(self, seconds: float):
+        self.at += seconds
+
+
+# Deadline of the request being synthesized; copied into every task the request creates
+_current_deadline: contextvars.ContextVar = contextvars.ContextVar('tts_request_deadline', default=None)
+
 
 class TTSService:
-    def __init__(self):
-        self.executor = ThreadPoolExecutor(max_workers=3)
+    def __init__(self, primary_backend: TTSBackend | None = None, fallback_backend: TTSBackend | None = None):
+        # Synthesis engines: neural voices (Edge TTS) and the last-resort fallback (gTTS)
+        self.primary_backend = primary_backend or create_backend(PRIMARY_BACKEND)
+        self.fallback_backend = fallback_backend or create_backend(FALLBACK_BACKEND)
+        self.audio_cache = AudioCache()
+        self.fragment_cache = AudioCache(FRAGMENT_MEMORY_BUDGET_BYTES, FRAGMENT_DISK_BUDGET_BYTES, FRAGMENT_CACHE_DIR)
+        self.fragment_stats = {'reused': 0, 'synthesized': 0}
+        
+        # In-flight synthesis futures keyed like the audio cache (single-flight coalescing)
+        self._inflight = {}
+        self.coalescing_stats = {'upstream_calls': 0, 'coalesced': 0}
+        
+        # Per-voice health (success rate, latency, circuit breakers) for fallback routing
+        self.voice_health = VoiceHealthRegistry()
+        
+        # First-audio-byte latencies drive the hedging threshold
+        self._first_byte_latencies = deque(maxlen=500)
+        self.hedging_stats = {'eligible': 0, 'fired': 0, 'backup_wins': 0, 'primary_wins': 0}
+        self.code_switch_stats = {'requests': 0, 'segments': 0}
+        self.deadline_stats = {'requests': 0, 'exceeded': 0}
+        
+        # Users who picked a voice and have not sent their text yet (loop time their warm-up expires)
+        self._warmup_users = {}
+        self._warmup_tasks = set()
+        self.warmup_stats = {'requests': 0, 'failed': 0}
         
         # 10 Completely UNIQUE High-Quality Voice Mapping (5 Male + 5 Female)
         # Each voice uses a different neural voice for maximum variety
@@ -93,98 +223,169 @@ class TTSService:
             }
         }
     
-    async def text_to_speech_with_voice(self, text: str, voice_type: str = 'male1') -> BytesIO | None:
+    def get_voice_id(self, voice_type: str) -> str:
+        """Edge TTS voice id used for a voice type (unknown types map to male1)"""
+        return self.voice_mapping.get(voice_type, self.voice_mapping['male1'])['voice']
+
+    async def text_to_speech_with_voice(self, text: str, voice_type: str = 'male1') -> AudioBuffer | None:
         """Convert text to speech with specific voice type using intelligent language detection"""
+        # Get voice configuration
+        voice_config = self.voice_mapping.get(voice_type, self.voice_mapping['male1'])
+        
+        # Use EXACT voice selected by user - only other-language spans of code-switched text use its paired voice
+        selected_voice = voice_config['voice']
+        
+        # Serve repeats straight from the audio cache (skips Edge TTS entirely)
+        cache_key = make_cache_key(selected_voice, text)
+        cached_audio = await self.audio_cache.aget(cache_key)
+        if cached_audio:
+            logger.debug("audio_cache_hit", voice=selected_voice, bytes=len(cached_audio))
+            audio_data = AudioBuffer(cached_audio, name="cached_tts_audio.mp3")
+            audio_data.cacheable = True
+            return audio_data
+        
+        # Single-flight: identical concurrent requests share one in-flight synthesis
+        inflight = self._inflight.get(cache_key)
+        if inflight is not None:
+            self.coalescing_stats['coalesced'] += 1
+            logger.debug("synthesis_coalesced", voice=selected_voice)
+            try:
+                audio_bytes = await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                if not inflight.cancelled() or asyncio.current_task().cancelling():
+                    raise
+                # The request we joined was cancelled, not us - synthesize on our own
+                self.coalescing_stats['coalesced'] -= 1
+                return await self.text_to_speech_with_voice(text, voice_type)
+            if not audio_bytes:
+                return None
+            return AudioBuffer(audio_bytes, name="enhanced_tts_audio.mp3")
+        
+        inflight = asyncio.get_running_loop().create_future()
+        self._inflight[cache_key] = inflight
+        self.coalescing_stats['upstream_calls'] += 1
         try:
-            # Get voice configuration
-            voice_config = self.voice_mapping.get(voice_type, self.voice_mapping['male1'])
+            audio_data = await self._synthesize_with_deadline(text, voice_type, voice_config, cache_key)
+            # Waiters wrap the same read-only view; nothing is copied per request
+            inflight.set_result(audio_data.freeze() if audio_data else None)
+            return audio_data
+        except TTSDeadlineExceeded as e:
+            # Waiters were sharing the spent budget: fail them fast as well instead of starting over
+            inflight.set_exception(e)
+            inflight.exception()  # Mark retrieved so a future nobody joined is not logged
+            raise
+        except BaseException:
+            inflight.cancel()
+            raise
+        finally:
+            self._inflight.pop(cache_key, None)
+    
+    def warm_up(self, user_id: int, voice_type: str):
+        """
+        Speculatively prepare the primary engine for a user who just picked a voice
+
+        Runs in the background: the engine tops up warm connections to one per user
+        still expected to send text, and drops them after WARMUP_TTL_SECONDS unused.
+        A failed warm-up only costs the handshake it tried to save. Voices whose
+        circuit is not closed are not warmed: their next request is a trial.
+        """
+        voice = self.get_voice_id(voice_type)
+        if not WARMUP_ENABLED or not self.voice_health.is_closed(voice):
+            return
+        now = asyncio.get_running_loop().time()
+        self._warmup_users = {user: expires for user, expires in self._warmup_users.items() if expires > now}
+        self._warmup_users[user_id] = now + WARMUP_TTL_SECONDS
+        self.warmup_stats['requests'] += 1
+        task = asyncio.create_task(self._warm_primary(voice, len(self._warmup_users)))
+        self._warmup_tasks.add(task)
+        task.add_done_callback(self._warmup_tasks.discard)
+
+    def end_warm_up(self, user_id: int):
+        """The user's text arrived (their request takes a warm connection); stop counting them"""
+        self._warmup_users.pop(user_id, None)
+
+    async def _warm_primary(self, voice: str, count: int):
+        try:
+            await self.primary_backend.warm(voice, count, ttl=WARMUP_TTL_SECONDS)
+        except Exception as e:
+            self.warmup_stats['failed'] += 1
+            logger.debug("tts_warmup_failed", voice=voice, error=str(e))
+
+    def _deadline_exceeded(self, voice: str, deadline: RequestDeadline) -> TTSDeadlineExceeded:
+        self.deadline_stats['exceeded'] += 1
+        logger.warning("tts_deadline_exceeded", voice=voice, budget_s=round(deadline.seconds, 1))
+        return TTSDeadlineExceeded(f"TTS request exceeded its {deadline.seconds:.0f}s budget")
+
+    def _retry_allowed(self, delay: float) -> bool:
+        deadline = _current_deadline.get()
+        return deadline is None or deadline.allows_retry(delay)
+
+    async def _synthesize_with_deadline(self, text: str, voice_type: str, voice_config: dict, cache_key: str) -> AudioBuffer | None:
+        """
+        Run the whole synthesis chain under one request deadline
+
+        Raises:
+            TTSDeadlineExceeded: If the budget ran out; the in-flight stream or gTTS call is cancelled
+        """
+        self.deadline_stats['requests'] += 1
+        deadline = RequestDeadline(REQUEST_DEADLINE_SECONDS, reserve=FALLBACK_BUDGET_SECONDS)
+        token = _current_deadline.set(deadline)
+        request_timeout = asyncio.timeout_at(deadline.at)
+        try:
+            async with request_timeout:
+                return await self._synthesize_with_fallback(text, voice_type, voice_config, cache_key)
+        except TimeoutError:
+            if not request_timeout.expired():
+                raise
+            raise self._deadline_exceeded(voice_config['voice'], deadline) from None
+        finally:
+            _current_deadline.reset(token)
+
+    async def _synthesize_with_fallback(self, text: str, voice_type: str, voice_config: dict, cache_key: str) -> AudioBuffer | None:
+        """Synthesize with the selected voice, falling back to alternatives on failure"""
+        deadline = _current_deadline.get()
+        try:
+            selected_voice = voice_config['voice']
             
             # Language detection for optimization (but NO auto-switching)
-            detected_lang = self._detect_language(text)
-            
-            # Use EXACT voice selected by user - NO auto-switching to ensure unique voices
-            selected_voice = voice_config['voice']
+            with latency_metrics.measure(Stage.LANGUAGE_DETECT, selected_voice):
+                detected_lang = self._detect_language(text)
             
             # Debug: Show exactly what text is being processed
-            print(f"🎤 Voice: {voice_config['name']} | Detected: {detected_lang} | Using: {selected_voice} (NO AUTO-SWITCH)")
-            print(f"📝 Text to convert: '{text}' (Length: {len(text)} chars, Words: {len(text.split())})")
+            logger.info(
+                "tts_request",
+                voice=selected_voice,
+                voice_name=voice_config['name'],
+                detected_lang=detected_lang,
+                chars=len(text),
+                text=text
+            )
+            
+            # Generate high-quality audio with enhanced settings (long texts are chunked and run in parallel)
+            pieces = self._route_segments(text, voice_config, voice_type)
+            # The primary voice is cut off in time to leave the fallback chain its share of the budget
+            async with asyncio.timeout_at(deadline.primary_at if deadline else None):
+                if len({voice for _, voice in pieces}) > 1:
+                    audio_data = await self._generate_code_switched_tts(pieces)
+                elif len(text.strip()) >= CHUNKED_MIN_CHARS or self._has_cached_fragments(pieces):
+                    audio_data = await self._generate_chunked_edge_tts(text, selected_voice)
+                else:
+                    audio_data = await self._generate_enhanced_edge_tts(text, selected_voice, detected_lang, voice_type)
             
-            # Generate high-quality audio with enhanced settings
-            audio_data = await self._generate_enhanced_edge_tts(text, selected_voice, detected_lang)
+            # Only primary-voice results are cached; fallback and hedge-backup audio use a different voice
+            if not getattr(audio_data, 'hedged', False):
+                await self.audio_cache.aput(cache_key, audio_data.freeze())
+                audio_data.cacheable = True
             return audio_data
             
         except Exception as e:
-            print(f"🔴 Edge TTS Error: {e}")
+            logger.warning("edge_tts_failed", voice=voice_config['voice'], error=str(e))
             # Intelligent fallback with voice preference
             return await self._intelligent_fallback(text, voice_type)
     
     def _detect_language(self, text: str) -> str:
         """Advanced language detection for Hindi (Devanagari + Roman), English text"""
-        try:
-            # Clean text for analysis
-            clean_text = text.strip().lower()
-            
-            # Count Devanagari characters (Hindi)
-            hindi_chars = sum(1 for char in clean_text if '\u0900' <= char <= '\u097F')
-            
-            # Count Latin characters (English/Roman Hindi)
-            english_chars = sum(1 for char in clean_text if char.isascii() and char.isalpha())
-            
-            # Roman Hindi detection - strictly Hindi words only (removed ambiguous English words)
-            roman_hindi_words = {
-                # Greetings and common expressions
-                'namaste', 'namaskar', 'dhanyawad', 'shukriya', 'alvida', 'jai', 'hind',
-                # Basic Hindi words 
-                'kya', 'hai', 'hain', 'ka', 'ki', 'ke', 'ko', 'se', 'me', 'par', 'mein',
-                'aur', 'ya', 'nahi', 'nahin', 'haan', 'han', 'ji', 'sahab', 'bhai', 'didi', 'papa', 'mama',
-                # Hindi-specific words (not commonly used in English)
-                'ghar', 'paisa', 'paise', 'rupya', 'rupee', 'samay', 'din', 'rat', 'subah', 'sham', 'dopahar',
-                'khana', 'paani', 'chai', 'doodh', 'roti', 'chawal', 'dal', 'sabzi', 'acha', 'accha',
-                'bura', 'burra', 'thik', 'theek', 'sahi', 'galat', 'kaise', 'kahan', 'kab', 'kyun', 'kyu', 'kaun',
-                'kitna', 'kitni', 'kitne', 'bohot', 'bahut', 'thoda', 'zyada', 'jyada', 'kam', 'jaldi', 'der',
-                'chalo', 'aao', 'jao', 'ruko', 'dekho', 'suno', 'bolo', 'kaho', 'batao', 'poocho', 'pucho',
-                'samjha', 'samjhi', 'samjhe', 'pata', 'malum', 'jaanta', 'jaanti', 'jaante', 'karta', 'karti', 'karte',
-                'hota', 'hoti', 'hote', 'deta', 'deti', 'dete', 'leta', 'leti', 'lete', 'aata', 'aati', 'aate',
-                'jaata', 'jaati', 'jaate', 'rahta', 'rahti', 'rahte', 'khelna', 'padhna', 'likhna', 'dekhna',
-                'sunna', 'bolna', 'kehna', 'batana', 'puchna', 'samajhna', 'seekhna', 'sikhna', 'karna', 'hona',
-                'dena', 'lena', 'aana', 'jana', 'rehna', 'rahna', 'kyunki', 'isliye', 'lekin',
-                # Additional distinctly Hindi words
-                'bharat', 'hindustan', 'desh', 'sarkar', 'vidya', 'gyan', 'shaadi', 'byah', 'ganga', 'yamuna'
-            }
-            
-            # Split text into words and check for Roman Hindi
-            words = re.findall(r'\b[a-z]+\b', clean_text)
-            roman_hindi_count = sum(1 for word in words if word in roman_hindi_words)
-            
-            # Calculate percentages
-            total_chars = len([c for c in clean_text if c.isalpha()])
-            total_words = len(words) if words else 1
-            
-            if total_chars == 0:
-                return 'en'  # Default to English for non-alphabetic text
-            
-            hindi_ratio = hindi_chars / total_chars
-            roman_hindi_ratio = roman_hindi_count / total_words
-            
-            print(f"🔍 Language Analysis: Devanagari={hindi_ratio:.2f}, Roman Hindi={roman_hindi_ratio:.2f}")
-            
-            # Enhanced language detection logic with stricter thresholds
-            if hindi_ratio > 0.6:  # 60% Devanagari Hindi characters
-                print("🎯 Detected: Devanagari Hindi")
-                return 'hi'
-            elif roman_hindi_ratio >= 0.4:  # 40% Roman Hindi words - increased threshold
-                print("🎯 Detected: Roman Hindi")
-                return 'hi'
-            elif hindi_ratio > 0.3:  # Substantial Devanagari presence
-                print("🎯 Detected: Mixed Hindi (Devanagari dominant)")
-                return 'hi'
-            else:
-                print("🎯 Detected: English")
-                return 'en'  # Default to English
-                
-        except Exception as e:
-            print(f"⚠️ Language detection error: {e}")
-            return 'en'  # Default fallback
+        return detect_language(text)
     
     def _get_optimized_voice(self, voice_config: dict, detected_lang: str, voice_type: str) -> str:
         """Get optimized voice based on detected language and user preference with explicit EN↔HI pairing"""
@@ -196,198 +397,463 @@ class TTSService:
             if detected_lang == voice_lang:
                 return user_voice
             
-            # Explicit same-gender EN↔HI voice pairing dictionary
-            voice_language_pairs = {
-                # Male Hindi ↔ Male English pairings
-                'male1': 'male2',  # Hindi Deep Bass ↔ English Ocean Calm
-                'male2': 'male1',  # English Ocean Calm ↔ Hindi Deep Bass
-                'male3': 'male4',  # Hindi Professional ↔ English Energetic
-                'male4': 'male3',  # English Energetic ↔ Hindi Professional
-                'male5': 'male6',  # Hindi Warm Tone ↔ English Strong Voice (UNIQUE!)
-                'male6': 'male5',  # English Strong Voice ↔ Hindi Warm Tone
-                
-                # Female Hindi ↔ Female English pairings
-                'female1': 'female2',  # Hindi Honey Sweet ↔ English Crystal Clear
-                'female2': 'female1',  # English Crystal Clear ↔ Hindi Honey Sweet
-                'female3': 'female4',  # Hindi Soft Whisper ↔ English Bright Star
-                'female4': 'female3',  # English Bright Star ↔ Hindi Soft Whisper
-                'female5': 'female6',  # Hindi Melodic Angel ↔ English Gentle Tone (UNIQUE!)
-                'female6': 'female5',  # English Gentle Tone ↔ Hindi Melodic Angel
-            }
-            
             # Smart voice switching for language mismatch using explicit pairing
-            if detected_lang != voice_lang and voice_type in voice_language_pairs:
-                paired_voice_type = voice_language_pairs[voice_type]
+            if detected_lang != voice_lang and voice_type in VOICE_LANGUAGE_PAIRS:
+                paired_voice_type = VOICE_LANGUAGE_PAIRS[voice_type]
                 
                 if paired_voice_type in self.voice_mapping:
                     paired_voice_config = self.voice_mapping[paired_voice_type]
                     
                     # Verify the paired voice matches the detected language
                     if paired_voice_config['lang'] == detected_lang:
-                        print(f"🔄 Auto-switched from {voice_config['name']} ({voice_lang.upper()}) to {paired_voice_config['name']} ({detected_lang.upper()})")
+                        logger.debug("voice_auto_switched", voice=voice_config['name'], paired_voice=paired_voice_config['name'], detected_lang=detected_lang)
                         return paired_voice_config['voice']
             
             # Fallback to user's selected voice if no pairing found
-            print(f"⚠️ No language pair found for {voice_type}, using original voice")
+            logger.debug("voice_pair_missing", voice_type=voice_type)
             return user_voice
             
         except Exception as e:
-            print(f"⚠️ Voice optimization error: {e}")
+            logger.warning("voice_optimization_failed", voice_type=voice_type, error=str(e))
             return voice_config['voice']
     
-    async def _generate_enhanced_edge_tts(self, text: str, voice: str, detected_lang: str) -> BytesIO:
+    def _route_segments(self, text: str, voice_config: dict, voice_type: str, max_chars: int = CHUNK_MAX_CHARS) -> list:
+        """
+        Plan synthesis pieces as ordered (text, voice) pairs
+
+        Code-switched text is split into Hindi / English spans and each span gets the
+        same-gender paired voice for its language (the selected voice keeps its own
+        language); spans are then chunked to max_chars. A paired voice whose circuit
+        is not closed falls back to the selected voice: planning claims no trial, and
+        a mixed text is never the probe of a voice the user did not pick.
+        """
+        selected_voice = voice_config['voice']
+        spans = segment_languages(text) if CODE_SWITCH_ENABLED else []
+        if len(spans) < 2:
+            return [(chunk, selected_voice) for chunk in self._split_pieces(text.strip(), max_chars)]
+
+        pieces = []
+        for lang, span in spans:
+            voice = self._get_optimized_voice(voice_config, lang, voice_type)
+            if voice != selected_voice and not self.voice_health.is_closed(voice):
+                voice = selected_voice
+            pieces.extend((chunk, voice) for chunk in self._split_pieces(span, max_chars))
+        return pieces
+
+    def _split_pieces(self, text: str, max_chars: int) -> list:
+        """Synthesis pieces of text: one per sentence when fragments are cached, else sentences packed up to max_chars"""
+        if FRAGMENT_CACHE_ENABLED:
+            return split_sentence_fragments(text, max_chars)
+        return split_text_chunks(text, max_chars)
+
+    def _has_cached_fragments(self, pieces: list) -> bool:
+        """Whether a multi-sentence text shares sentences with earlier requests (then short texts are assembled from fragments too)"""
+        return FRAGMENT_CACHE_ENABLED and len(pieces) > 1 and any(
+            self.fragment_cache.contains(make_cache_key(voice, piece)) for piece, voice in pieces
+        )
+
+    async def _generate_code_switched_tts(self, pieces: list) -> AudioBuffer:
+        """Synthesize per-language pieces concurrently, each with its routed voice, and join them in order"""
+        self.code_switch_stats['requests'] += 1
+        self.code_switch_stats['segments'] += len(pieces)
+        logger.debug("code_switched_tts", pieces=len(pieces), voices=sorted({voice for _, voice in pieces}))
+
+        semaphore = asyncio.Semaphore(self._fan_out_limit({voice for _, voice in pieces}))
+        tasks = [
+            asyncio.create_task(self._synthesize_chunk_with_retry(index, piece, voice, semaphore))
+            for index, (piece, voice) in enumerate(pieces)
+        ]
+        # Edge hi-IN and en-IN voices share one MP3 format, so spans join frame by frame without re-encoding
+        return await self._join_in_order(tasks, "enhanced_tts_audio.mp3")
+
+    async def _generate_enhanced_edge_tts(self, text: str, voice: str, detected_lang: str, voice_type: str | None = None) -> AudioBuffer:
         """Generate high-quality TTS using Edge TTS with enhanced settings and connection stability"""
         max_retries = 3
         retry_delay = 2
         
+        # Clean the text to ensure no extra content
+        clean_text = text.strip()
+        if not clean_text:
+            raise Exception("Empty text provided for TTS")
+        
         for attempt in range(max_retries):
+            # Skip straight to fallbacks once the voice's circuit breaker is open
+            if not self.voice_health.is_available(voice):
+                raise Exception(f"Voice {voice} circuit open, skipping retries")
+            
             try:
-                print(f"🔄 TTS Attempt {attempt + 1}/{max_retries} for voice: {voice}")
-                
-                # Clean the text to ensure no extra content
-                clean_text = text.strip()
-                print(f"🧹 Cleaned text: '{clean_text}' (Length: {len(clean_text)} chars)")
+                logger.debug("tts_attempt", voice=voice, attempt=attempt + 1, max_retries=max_retries)
                 
                 # Simple direct text-to-speech (NO SSML to avoid markup being read as text)
-                if len(clean_text) > 0:
-                    print(f"🎯 Direct TTS: Using voice '{voice}' for text: '{clean_text}'")
-                    # Direct TTS without SSML to ensure clean, short audio
-                    communicate = edge_tts.Communicate(clean_text, voice)
+                hedged = False
+                if HEDGE_ENABLED and attempt == 0 and voice_type:
+                    audio_data, hedged = await self._stream_with_hedge(clean_text, voice, voice_type)
                 else:
-                    raise Exception("Empty text provided for TTS")
+                    audio_data = await self._stream_edge_chunk(clean_text, voice, stream_timeout=30)
                 
-                # Generate high-quality audio data with timeout
-                audio_data = BytesIO()
-                try:
-                    # Set timeout for streaming
-                    stream_timeout = 30  # 30 seconds timeout
-                    start_time = asyncio.get_event_loop().time()
-                    
-                    async for chunk in communicate.stream():
-                        # Check for timeout
-                        if asyncio.get_event_loop().time() - start_time > stream_timeout:
-                            raise asyncio.TimeoutError("TTS streaming timeout")
-                            
-                        if chunk["type"] == "audio":
-                            audio_data.write(chunk["data"])
-                    
-                except asyncio.TimeoutError as te:
-                    print(f"⏰ TTS streaming timeout on attempt {attempt + 1}")
-                    if attempt < max_retries - 1:
-                        await asyncio.sleep(retry_delay)
-                        continue
-                    else:
-                        raise te
-                
-                audio_data.seek(0)
                 audio_data.name = "enhanced_tts_audio.mp3"
-                
-                # Validate audio data
-                if audio_data.getvalue():
-                    print(f"✅ Generated {len(audio_data.getvalue())} bytes of audio on attempt {attempt + 1}")
-                    return audio_data
-                else:
-                    raise Exception("Empty audio data generated")
+                # Backup-engine audio is a different voice and must not be cached as the primary one
+                audio_data.hedged = hedged
+                logger.debug("tts_generated", voice=voice, bytes=audio_data.nbytes, attempt=attempt + 1)
+                return audio_data
                     
             except Exception as e:
-                print(f"🔴 TTS attempt {attempt + 1} failed: {e}")
-                if attempt < max_retries - 1:
-                    print(f"⏳ Retrying in {retry_delay} seconds...")
+                logger.warning("tts_attempt_failed", voice=voice, attempt=attempt + 1, error=str(e))
+                if attempt < max_retries - 1 and self._retry_allowed(retry_delay):
                     await asyncio.sleep(retry_delay)
                     retry_delay *= 1.5  # Exponential backoff
                 else:
-                    print(f"🔴 All {max_retries} attempts failed")
+                    logger.warning("tts_attempts_exhausted", voice=voice, attempts=attempt + 1)
                     raise e
     
-    async def _intelligent_fallback(self, text: str, voice_type: str) -> BytesIO | None:
-        """Enhanced intelligent fallback with robust connection handling and multiple retry strategies"""
+    async def _stream_edge_chunk(self, text: str, voice: str, stream_timeout: float = 30, first_byte: asyncio.Event | None = None) -> AudioBuffer:
+        """Synthesize one piece of text with the primary backend in a single attempt and return the raw MP3 audio"""
+        if not self.voice_health.is_available(voice):
+            raise Exception(f"Voice {voice} circuit open, trial request already in progress")
+        # A half-open voice gets one trial request; it must end with an outcome or be released
+        trial = self.voice_health.acquire_trial(voice)
+        loop = asyncio.get_running_loop()
+        start_time = loop.time()
         try:
-            print(f"🔄 Attempting intelligent fallback for voice: {voice_type}")
+            # asyncio.timeout cancels a stalled stream instead of waiting for the next chunk
+            async with asyncio.timeout(stream_timeout):
+                audio_data = AudioBuffer()
+                first_byte_time = None
+                async for chunk in self.primary_backend.stream(text, voice):
+                    if first_byte_time is None:
+                        first_byte_time = loop.time()
+                        self._first_byte_latencies.append(first_byte_time - start_time)
+                        latency_metrics.record(Stage.FIRST_BYTE, first_byte_time - start_time, voice)
+                        if first_byte is not None:
+                            first_byte.set()
+                    audio_data.write(chunk)
             
-            # Strategy 1: Try alternative voice of same gender with retry logic
-            gender = 'male' if 'male' in voice_type else 'female'
-            alternative_voices = [
-                (alt_voice_type, alt_config) 
-                for alt_voice_type, alt_config in self.voice_mapping.items() 
-                if gender in alt_voice_type and alt_voice_type != voice_type
-            ]
+            if not audio_data.nbytes:
+                raise Exception("Empty audio data generated")
+        except asyncio.CancelledError:
+            # Hedge loser, request deadline or a failed sibling chunk: no verdict on the voice
+            if trial:
+                self.voice_health.release_trial(voice)
+            raise
+        except Exception:
+            self.voice_health.record_failure(voice)
+            raise
+        
+        end_time = loop.time()
+        latency_metrics.record(Stage.STREAMING, end_time - first_byte_time, voice)
+        self.voice_health.record_success(voice, end_time - start_time, len(text))
+        return audio_data
+
+    def get_hedge_threshold(self) -> float:
+        """Seconds to wait for the first audio byte before firing a hedge (percentile of recent first-byte latency)"""
+        if len(self._first_byte_latencies) < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEFAULT_THRESHOLD
+        latencies = sorted(self._first_byte_latencies)
+        index = min(len(latencies) - 1, int(len(latencies) * HEDGE_PERCENTILE / 100))
+        return min(max(latencies[index], HEDGE_MIN_THRESHOLD), HEDGE_MAX_THRESHOLD)
+    
+    async def _hedge_backup(self, text: str, voice_type: str) -> AudioBuffer:
+        """Backup engine for hedging: the paired voice if it is healthy, otherwise gTTS"""
+        paired_voice_type = VOICE_LANGUAGE_PAIRS.get(voice_type)
+        paired_config = self.voice_mapping.get(paired_voice_type) if paired_voice_type else None
+        if paired_config and self.voice_health.is_available(paired_config['voice']):
+            logger.info("hedge_backup", engine="paired_voice", voice=paired_config['voice'])
+            return await self._stream_edge_chunk(text, paired_config['voice'], stream_timeout=30)
+        
+        logger.info("hedge_backup", engine="gtts")
+        audio_data = await self._generate_gtts_fallback_enhanced(text)
+        if not audio_data:
+            raise Exception("gTTS hedge backup failed")
+        return audio_data
+    
+    async def _stream_with_hedge(self, text: str, voice: str, voice_type: str) -> tuple:
+        """
+        Stream from the primary voice; if no audio byte arrives within the hedge threshold,
+        race a backup engine and keep whichever finishes first.
+        
+        Returns (audio_data, backup_won)
+        """
+        self.hedging_stats['eligible'] += 1
+        started_at = asyncio.get_running_loop().time()
+        first_byte = asyncio.Event()
+        primary = asyncio.create_task(self._stream_edge_chunk(text, voice, stream_timeout=30, first_byte=first_byte))
+        first_byte_wait = asyncio.create_task(first_byte.wait())
+        threshold = self.get_hedge_threshold()
+        
+        try:
+            await asyncio.wait({primary, first_byte_wait}, timeout=threshold, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            first_byte_wait.cancel()
+        
+        if primary.done() or first_byte.is_set():
+            return await primary, False
+        
+        self.hedging_stats['fired'] += 1
+        logger.info("hedge_fired", voice=voice, threshold_s=round(threshold, 2))
+        backup = asyncio.create_task(self._hedge_backup(text, voice_type))
+        pending = {primary, backup}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        backup_won = task is backup
+                        self.hedging_stats['backup_wins' if backup_won else 'primary_wins'] += 1
+                        if backup_won and not first_byte.is_set():
+                            # Record the abandoned primary's wait as a lower bound so the percentile isn't biased low
+                            self._first_byte_latencies.append(asyncio.get_running_loop().time() - started_at)
+                        return task.result(), backup_won
+            # Both failed: surface the primary error to the retry loop
+            return await primary, False
+        finally:
+            for task in (primary, backup):
+                if not task.done():
+                    task.cancel()
+    
+    def get_hedging_stats(self):
+        """Get hedge-fire and hedge-win rates plus the current threshold"""
+        eligible = self.hedging_stats['eligible']
+        fired = self.hedging_stats['fired']
+        return {
+            **self.hedging_stats,
+            'fire_rate': round(fired / eligible * 100, 1) if eligible else 0.0,
+            'backup_win_rate': round(self.hedging_stats['backup_wins'] / fired * 100, 1) if fired else 0.0,
+            'threshold_seconds': round(self.get_hedge_threshold(), 3),
+            'first_byte_samples': len(self._first_byte_latencies)
+        }
+    
+    async def _synthesize_chunk_with_retry(self, index: int, text: str, voice: str, semaphore: asyncio.Semaphore) -> AudioBuffer:
+        """
+        Synthesize a single chunk under the fan-out limit, retrying only this chunk on failure
+
+        Chunks are sentence fragments: audio already cached for (voice, sentence) is reused
+        without a request, and freshly synthesized audio is cached for later texts.
+        """
+        fragment_key = make_cache_key(voice, text) if FRAGMENT_CACHE_ENABLED else None
+        if fragment_key:
+            cached_audio = await self.fragment_cache.aget(fragment_key)
+            if cached_audio:
+                self.fragment_stats['reused'] += 1
+                return AudioBuffer(cached_audio, name="cached_tts_fragment.mp3")
+
+        max_retries = 3
+        retry_delay = 1
+
+        for attempt in range(max_retries):
+            try:
+                async with semaphore:
+                    audio_data = await self._stream_edge_chunk(text, voice)
+                if fragment_key:
+                    await self.fragment_cache.aput(fragment_key, audio_data.freeze())
+                    self.fragment_stats['synthesized'] += 1
+                return audio_data
+            except Exception as e:
+                logger.warning("chunk_attempt_failed", voice=voice, chunk=index + 1, attempt=attempt + 1, error=str(e))
+                if attempt < max_retries - 1 and self._retry_allowed(retry_delay):
+                    await asyncio.sleep(retry_delay)
+                    retry_delay *= 1.5
+                else:
+                    raise
+
+    async def _join_in_order(self, tasks: list, name: str) -> AudioBuffer:
+        """Append chunk results frame by frame to one buffer in order as they finish, freeing each part once appended"""
+        joiner = MP3Joiner(AudioBuffer(name=name), gap_ms=SEGMENT_GAP_MS)
+        try:
+            for task in tasks:
+                part = await task
+                joiner.append(part.freeze())
+                part.close()
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+        audio_data = joiner.finish()
+        audio_data.seek(0)
+        return audio_data
+
+    def _fan_out_limit(self, voices) -> int:
+        """Chunks synthesized at once: one at a time while a voice is half-open, so its trial is a single request"""
+        if all(self.voice_health.is_closed(voice) for voice in voices):
+            return CHUNK_CONCURRENCY
+        return 1
+
+    async def _generate_chunked_edge_tts(self, text: str, voice: str) -> AudioBuffer:
+        """Generate long-text TTS by synthesizing sentence chunks concurrently and joining them in order"""
+        chunks = self._split_pieces(text.strip(), CHUNK_MAX_CHARS)
+        if not chunks:
+            raise Exception("Empty text provided for TTS")
+        if not self.voice_health.is_available(voice):
+            raise Exception(f"Voice {voice} circuit open, skipping chunked synthesis")
+
+        concurrency = self._fan_out_limit([voice])
+        logger.debug("chunked_tts", voice=voice, chunks=len(chunks), concurrency=concurrency)
+        semaphore = asyncio.Semaphore(concurrency)
+        tasks = [
+            asyncio.create_task(self._synthesize_chunk_with_retry(index, chunk, voice, semaphore))
+            for index, chunk in enumerate(chunks)
+        ]
+        # Edge TTS emits MP3 frames in one fixed format, so the parts join frame by frame without re-encoding
+        audio_data = await self._join_in_order(tasks, "enhanced_tts_audio.mp3")
+        logger.debug("chunked_tts_generated", voice=voice, bytes=audio_data.nbytes, chunks=len(chunks))
+        return audio_data
+
+    def _fallback_candidates(self, voice_type: str) -> list:
+        """Same-gender alternative voices, healthiest first; same-language (equivalent) voices win ties"""
+        gender = 'female' if voice_type.startswith('female') else 'male'
+        original_lang = self.voice_mapping.get(voice_type, self.voice_mapping['male1'])['lang']
+        alternatives = {
+            alt_config['voice']: (alt_voice_type, alt_config)
+            for alt_voice_type, alt_config in self.voice_mapping.items()
+            if alt_voice_type.startswith(gender) and alt_voice_type != voice_type
+        }
+        ranked = self.voice_health.rank(alternatives.keys())
+        ranked.sort(key=lambda voice: alternatives[voice][1]['lang'] != original_lang)  # stable: keeps health order
+        return [alternatives[voice] for voice in ranked]
+    
+    async def _intelligent_fallback(self, text: str, voice_type: str) -> AudioBuffer | None:
+        """Health-routed fallback: healthiest equivalent voices first, then gTTS, within the rest of the request deadline"""
+        deadline = _current_deadline.get() or RequestDeadline(FALLBACK_BUDGET_SECONDS)
+        try:
+            logger.info("fallback_started", voice_type=voice_type, budget_s=round(deadline.remaining(), 1))
             
-            for alt_voice_type, alt_config in alternative_voices:
-                for retry_attempt in range(2):  # 2 attempts per alternative voice
-                    try:
-                        print(f"🔄 Trying alternative voice: {alt_config['name']} (attempt {retry_attempt + 1})")
-                        communicate = edge_tts.Communicate(text, alt_config['voice'])
-                        audio_data = BytesIO()
-                        
-                        # Add timeout for fallback attempts
-                        start_time = asyncio.get_event_loop().time()
-                        timeout = 20  # Shorter timeout for fallbacks
-                        
-                        async for chunk in communicate.stream():
-                            if asyncio.get_event_loop().time() - start_time > timeout:
-                                raise asyncio.TimeoutError("Fallback streaming timeout")
-                            if chunk["type"] == "audio":
-                                audio_data.write(chunk["data"])
-                        
-                        audio_data.seek(0)
-                        audio_data.name = "fallback_tts_audio.mp3"
-                        if audio_data.getvalue():
-                            print(f"✅ Fallback successful with {alt_config['name']}")
-                            return audio_data
-                            
-                    except Exception as fallback_error:
-                        print(f"⚠️ Alternative voice {alt_config['name']} failed (attempt {retry_attempt + 1}): {fallback_error}")
-                        if retry_attempt == 0:  # Only wait between attempts, not after last attempt
-                            await asyncio.sleep(1)
-                        continue
+            # Strategy 1: One attempt each on the healthiest alternative voices of the same gender
+            for alt_voice_type, alt_config in self._fallback_candidates(voice_type)[:FALLBACK_MAX_VOICES]:
+                # Keep enough of the budget for the gTTS last resort
+                remaining = deadline.remaining() - FALLBACK_GTTS_RESERVE_SECONDS
+                if remaining <= 1:
+                    logger.info("fallback_budget_spent", voice_type=voice_type)
+                    break
+                if not self.voice_health.is_available(alt_config['voice']):
+                    continue
+                
+                try:
+                    logger.debug("fallback_voice_attempt", voice=alt_config['voice'], score=round(self.voice_health.score(alt_config['voice']), 2))
+                    audio_data = await self._stream_edge_chunk(
+                        text.strip(), alt_config['voice'],
+                        stream_timeout=min(FALLBACK_ATTEMPT_TIMEOUT, remaining)
+                    )
+                    audio_data.name = "fallback_tts_audio.mp3"
+                    logger.info("fallback_succeeded", voice=alt_config['voice'])
+                    return audio_data
+                except Exception as fallback_error:
+                    logger.warning("fallback_voice_failed", voice=alt_config['voice'], error=str(fallback_error))
             
             # Strategy 2: Use enhanced gTTS as last resort (removed cross-gender fallback)
-            print(f"🔄 Using enhanced gTTS fallback...")
+            # A stalled gTTS call is cancelled by the request deadline (the worker thread finishes on its own)
+            logger.info("fallback_gtts", voice_type=voice_type, budget_s=round(deadline.remaining(), 1))
             return await self._generate_gtts_fallback_enhanced(text)
             
         except Exception as e:
-            print(f"🔴 All fallback strategies failed: {e}")
+            logger.error("fallback_failed", voice_type=voice_type, error=str(e))
             return None
     
-    async def _generate_gtts_fallback_enhanced(self, text: str) -> BytesIO | None:
+    async def _generate_gtts_fallback_enhanced(self, text: str) -> AudioBuffer | None:
         """Enhanced gTTS fallback with language detection"""
         try:
-            from gtts import gTTS
-            
             # Detect language for gTTS
             detected_lang = self._detect_language(text)
             gtts_lang = 'hi' if detected_lang == 'hi' else 'en'
             
-            print(f"🔄 gTTS fallback using language: {gtts_lang}")
+            logger.debug("gtts_fallback", lang=gtts_lang)
             
-            # Use thread pool for blocking gTTS operation
-            loop = asyncio.get_event_loop()
-            audio_data = await loop.run_in_executor(
-                self.executor, self._generate_gtts_with_lang, text, gtts_lang
-            )
-            return audio_data
+            audio_buffer = AudioBuffer(await self.fallback_backend.synthesize(text, gtts_lang), name=f"gtts_fallback_{gtts_lang}.mp3")
+            logger.debug("gtts_generated", lang=gtts_lang, bytes=audio_buffer.nbytes)
+            return audio_buffer
             
         except Exception as e:
-            print(f"🔴 Enhanced gTTS fallback error: {e}")
+            logger.warning("gtts_failed", error=str(e))
             return None
     
-    def _generate_gtts_with_lang(self, text: str, lang: str) -> BytesIO:
-        """Generate enhanced gTTS with proper language detection"""
-        from gtts import gTTS
-        
+    def _plan_progressive_parts(self, chunks: list) -> list:
+        """Group chunk indexes into delivery parts: a short first part, then larger follow-up parts"""
+        parts = []
+        current = []
+        current_chars = 0
+        for index, chunk in enumerate(chunks):
+            limit = PROGRESSIVE_FIRST_PART_CHARS if not parts else PROGRESSIVE_PART_CHARS
+            if current and current_chars + len(chunk) > limit:
+                parts.append(current)
+                current = []
+                current_chars = 0
+            current.append(index)
+            current_chars += len(chunk)
+        if current:
+            parts.append(current)
+        return parts
+
+    async def stream_text_to_speech(self, text: str, voice_type: str = 'male1'):
+        """
+        Progressive TTS: yield (part_number, total_parts, audio, text_end) in order as soon as each part is ready
+
+        text_end is the offset in text just past the part's source, so text[:text_end] is what the
+        parts so far cover (chunking drops separators, so the part's own words can differ from it).
+        All chunks are scheduled up front (first part first), so the first part arrives after
+        roughly one sentence of synthesis while the rest keeps generating in the background.
+        """
+        voice_config = self.voice_mapping.get(voice_type, self.voice_mapping['male1'])
+        selected_voice = voice_config['voice']
+
+        cache_key = make_cache_key(selected_voice, text)
+        cached_audio = await self.audio_cache.aget(cache_key)
+        if cached_audio:
+            logger.debug("audio_cache_hit", voice=selected_voice, bytes=len(cached_audio), progressive=True)
+            audio_data = AudioBuffer(cached_audio, name="cached_tts_audio.mp3")
+            audio_data.cacheable = True
+            yield 1, 1, audio_data, len(text)
+            return
+
+        # Code-switched spans keep their routed voice; parts are planned over the pieces
+        pieces = self._route_segments(text, voice_config, voice_type, min(CHUNK_MAX_CHARS, PROGRESSIVE_FIRST_PART_CHARS))
+        if not pieces:
+            raise Exception("Empty text provided for TTS")
+        chunks = [piece for piece, _ in pieces]
+        chunk_ends = source_end_offsets(text, chunks)
+
+        parts = self._plan_progressive_parts(chunks)
+        logger.debug("progressive_tts", voice=selected_voice, chunks=len(chunks), parts=len(parts))
+        if len({voice for _, voice in pieces}) > 1:
+            self.code_switch_stats['requests'] += 1
+            self.code_switch_stats['segments'] += len(pieces)
+
+        # The deadline covers synthesis only: time the consumer spends on a yielded part is added back.
+        # Chunk tasks get it through their own context (setting it here would leak into the consumer's task).
+        self.deadline_stats['requests'] += 1
+        deadline = RequestDeadline(REQUEST_DEADLINE_SECONDS)
+        context = contextvars.copy_context()
+        context.run(_current_deadline.set, deadline)
+
+        semaphore = asyncio.Semaphore(self._fan_out_limit({voice for _, voice in pieces}))
+        tasks = [
+            asyncio.create_task(self._synthesize_chunk_with_retry(index, chunk, voice, semaphore), context=context)
+            for index, (chunk, voice) in enumerate(pieces)
+        ]
+        whole_audio = MP3Joiner(AudioBuffer(), gap_ms=SEGMENT_GAP_MS)
+        loop = asyncio.get_running_loop()
         try:
-            tts = gTTS(text=text, lang=lang, slow=False)
-            audio_buffer = BytesIO()
-            tts.write_to_fp(audio_buffer)
-            audio_buffer.seek(0)
-            audio_buffer.name = f"gtts_fallback_{lang}.mp3"
-            print(f"✅ gTTS fallback generated successfully ({lang})")
-            return audio_buffer
-        except Exception as e:
-            print(f"🔴 gTTS generation error: {e}")
-            raise e
-    
-    async def text_to_speech(self, text: str, lang: str = 'hi') -> BytesIO | None:
+            for part_number, chunk_indexes in enumerate(parts, 1):
+                try:
+                    async with asyncio.timeout_at(deadline.at):
+                        part_audio = [await tasks[index] for index in chunk_indexes]
+                except TimeoutError:
+                    raise self._deadline_exceeded(selected_voice, deadline) from None
+                audio_data = AudioBuffer.join(part_audio, name=f"tts_audio_part{part_number}.mp3", gap_ms=SEGMENT_GAP_MS)
+                text_end = len(text) if part_number == len(parts) else chunk_ends[chunk_indexes[-1]]
+                yielded_at = loop.time()
+                yield part_number, len(parts), audio_data, text_end
+                deadline.extend(loop.time() - yielded_at)
+
+                # The consumer is done with the part: keep its audio once, in the whole-text buffer
+                whole_audio.append(audio_data.freeze())
+                audio_data.close()
+
+            # Whole-text audio goes to the cache so repeats are served in one piece (with one duration header)
+            await self.audio_cache.aput(cache_key, whole_audio.finish().freeze())
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def text_to_speech(self, text: str, lang: str = 'hi') -> AudioBuffer | None:
         """Legacy method for backward compatibility"""
         return await self.text_to_speech_with_voice(text, 'male1')
     
@@ -398,7 +864,7 @@ class TTSService:
                 'display_name': config['name'],
                 'description': config['description'],
                 'language': 'Hindi' if config['lang'] == 'hi' else 'English (India)',
-                'gender': 'Male' if 'male' in voice_type else 'Female',
+                'gender': 'Female' if voice_type.startswith('female') else 'Male',
                 'voice_id': config['voice']
             }
             for voice_type, config in self.voice_mapping.items()
@@ -413,15 +879,45 @@ class TTSService:
             'mixed': 'Hindi-English Mixed'
         }
     
+    def get_coalescing_stats(self):
+        """Get single-flight statistics (coalesced requests are upstream calls saved)"""
+        total = self.coalescing_stats['upstream_calls'] + self.coalescing_stats['coalesced']
+        return {
+            **self.coalescing_stats,
+            'upstream_calls_saved': self.coalescing_stats['coalesced'],
+            'in_flight': len(self._inflight),
+            'saved_rate': round(self.coalescing_stats['coalesced'] / total * 100, 1) if total else 0.0
+        }
+    
+    def get_fragment_stats(self):
+        """Get sentence fragment reuse (reused fragments are Edge TTS requests saved)"""
+        total = self.fragment_stats['reused'] + self.fragment_stats['synthesized']
+        return {
+            **self.fragment_stats,
+            'enabled': FRAGMENT_CACHE_ENABLED,
+            'reuse_rate': round(self.fragment_stats['reused'] / total * 100, 1) if total else 0.0,
+            'cache': self.fragment_cache.get_stats()
+        }
+    
     def get_voice_statistics(self):
         """Get statistics about available voices"""
         stats = {
             'total_voices': len(self.voice_mapping),
-            'male_voices': len([v for v in self.voice_mapping.keys() if 'male' in v]),
-            'female_voices': len([v for v in self.voice_mapping.keys() if 'female' in v]),
+            'male_voices': len([v for v in self.voice_mapping.keys() if v.startswith('male')]),
+            'female_voices': len([v for v in self.voice_mapping.keys() if v.startswith('female')]),
             'hindi_voices': len([v for v in self.voice_mapping.values() if v['lang'] == 'hi']),
             'english_voices': len([v for v in self.voice_mapping.values() if v['lang'] == 'en']),
             'languages_supported': list(set([v['lang'] for v in self.voice_mapping.values()])),
-            'voice_engines': ['Edge TTS (Primary)', 'gTTS (Fallback)']
+            'voice_engines': [f'{self.primary_backend.name} (Primary)', f'{self.fallback_backend.name} (Fallback)'],
+            'primary_backend': self.primary_backend.get_stats(),
+            'fallback_backend': self.fallback_backend.get_stats(),
+            'audio_cache': self.audio_cache.get_stats(),
+            'fragments': self.get_fragment_stats(),
+            'coalescing': self.get_coalescing_stats(),
+            'voice_health': self.voice_health.get_stats(),
+            'hedging': self.get_hedging_stats(),
+            'code_switch': self.code_switch_stats,
+            'deadline': {**self.deadline_stats, 'budget_seconds': REQUEST_DEADLINE_SECONDS},
+            'warmup': {**self.warmup_stats, 'enabled': WARMUP_ENABLED, 'pending_users': len(self._warmup_users)}
         }
         return stats
\ No newline at end of file
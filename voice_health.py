@@ -0,0 +1,192 @@
+"""
+Voice Health Registry for TTS Bot
+Tracks per-voice success rate and latency with exponential decay and trips circuit breakers on failing voices
+"""
+
+import os
+import math
+import time
+import logging
+from typing import Dict, Any, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Weight kept by the previous score on every new observation
+OBSERVATION_DECAY = 0.8
+# Stale scores relax back towards healthy with this half-life (seconds)
+RECOVERY_HALF_LIFE = float(os.getenv('VOICE_HEALTH_HALF_LIFE', '600'))
+# Circuit breaker settings
+FAILURE_THRESHOLD = int(os.getenv('VOICE_CIRCUIT_FAILURES', '3'))
+BASE_COOLDOWN = float(os.getenv('VOICE_CIRCUIT_COOLDOWN', '60'))
+MAX_COOLDOWN = 600.0
+# Latency reference (seconds per 100 characters) used when scoring
+REFERENCE_LATENCY = 1.0
+
+
+class CircuitState:
+    """Circuit breaker states"""
+    CLOSED = "closed"        # Voice healthy, requests flow
+    OPEN = "open"            # Voice failing, requests skipped until cooldown ends
+    HALF_OPEN = "half_open"  # Cooldown over, one trial request allowed
+
+
+class VoiceHealth:
+    """Health record for a single voice"""
+
+    def __init__(self, voice: str):
+        self.voice = voice
+        self.success_score = 1.0
+        self.latency_score: Optional[float] = None  # seconds per 100 characters
+        self.consecutive_failures = 0
+        self.state = CircuitState.CLOSED
+        self.opened_at = 0.0
+        self.cooldown = BASE_COOLDOWN
+        self.trial_in_progress = False
+        self.last_observation = time.monotonic()
+        self.successes = 0
+        self.failures = 0
+
+    def current_success_rate(self, now: float) -> float:
+        """Success score relaxed towards 1.0 according to how stale it is"""
+        elapsed = max(0.0, now - self.last_observation)
+        stale_weight = math.exp(-elapsed * math.log(2) / RECOVERY_HALF_LIFE)
+        return 1.0 - (1.0 - self.success_score) * stale_weight
+
+
+class VoiceHealthRegistry:
+    """
+    Per-voice health registry used to route fallbacks to the healthiest equivalent voice
+    """
+
+    def __init__(self):
+        self._voices: Dict[str, VoiceHealth] = {}
+
+    def _get(self, voice: str) -> VoiceHealth:
+        health = self._voices.get(voice)
+        if health is None:
+            health = self._voices[voice] = VoiceHealth(voice)
+        return health
+
+    def record_success(self, voice: str, latency: float, chars: int = 100):
+        """Record a successful synthesis and its latency"""
+        health = self._get(voice)
+        now = time.monotonic()
+        health.success_score = health.current_success_rate(now) * OBSERVATION_DECAY + (1 - OBSERVATION_DECAY)
+        per_100_chars = latency / max(chars, 1) * 100
+        if health.latency_score is None:
+            health.latency_score = per_100_chars
+        else:
+            health.latency_score = health.latency_score * OBSERVATION_DECAY + per_100_chars * (1 - OBSERVATION_DECAY)
+        health.last_observation = now
+        health.consecutive_failures = 0
+        health.successes += 1
+
+        if health.state != CircuitState.CLOSED:
+            logger.info(f"Voice circuit closed for {voice}")
+        health.state = CircuitState.CLOSED
+        health.cooldown = BASE_COOLDOWN
+        health.trial_in_progress = False
+
+    def record_failure(self, voice: str):
+        """Record a failed synthesis, opening the circuit after repeated failures"""
+        health = self._get(voice)
+        now = time.monotonic()
+        health.success_score = health.current_success_rate(now) * OBSERVATION_DECAY
+        health.last_observation = now
+        health.consecutive_failures += 1
+        health.failures += 1
+
+        if health.state == CircuitState.HALF_OPEN:
+            # Trial failed - reopen with a longer cooldown
+            health.cooldown = min(health.cooldown * 2, MAX_COOLDOWN)
+            self._open(health, now)
+        elif health.state == CircuitState.CLOSED and health.consecutive_failures >= FAILURE_THRESHOLD:
+            self._open(health, now)
+
+    def _open(self, health: VoiceHealth, now: float):
+        health.state = CircuitState.OPEN
+        health.opened_at = now
+        health.trial_in_progress = False
+        logger.warning(f"Voice circuit opened for {health.voice} for {health.cooldown:.0f}s")
+
+    def _refresh_state(self, health: VoiceHealth, now: float):
+        if health.state == CircuitState.OPEN and now - health.opened_at >= health.cooldown:
+            health.state = CircuitState.HALF_OPEN
+
+    def is_available(self, voice: str) -> bool:
+        """True if requests may be sent to the voice (closed circuit, or a half-open trial slot still free); claims nothing"""
+        health = self._voices.get(voice)
+        if health is None:
+            return True
+        self._refresh_state(health, time.monotonic())
+        return health.state == CircuitState.CLOSED or (health.state == CircuitState.HALF_OPEN and not health.trial_in_progress)
+
+    def is_closed(self, voice: str) -> bool:
+        """True if the voice's circuit is closed (no trial pending), i.e. it may take concurrent or speculative work"""
+        health = self._voices.get(voice)
+        if health is None:
+            return True
+        self._refresh_state(health, time.monotonic())
+        return health.state == CircuitState.CLOSED
+
+    def acquire_trial(self, voice: str) -> bool:
+        """
+        Claim the single trial request of a half-open voice, right before sending it
+
+        Returns True if the caller now holds the trial: it ends with record_success(),
+        record_failure() or, if the request was abandoned without an outcome, release_trial().
+        """
+        health = self._voices.get(voice)
+        if health is None:
+            return False
+        self._refresh_state(health, time.monotonic())
+        if health.state == CircuitState.HALF_OPEN and not health.trial_in_progress:
+            health.trial_in_progress = True
+            return True
+        return False
+
+    def release_trial(self, voice: str):
+        """Give back a trial that ended without an outcome (e.g. cancelled), so the next request can probe the voice"""
+        health = self._voices.get(voice)
+        if health is not None and health.state == CircuitState.HALF_OPEN:
+            health.trial_in_progress = False
+
+    def score(self, voice: str) -> float:
+        """Health score in (0, 1]: decayed success rate discounted by relative latency"""
+        health = self._voices.get(voice)
+        if health is None:
+            # Unobserved voices are assumed healthy at the reference latency
+            return 1.0 / (1.0 + 1.0)
+        success_rate = health.current_success_rate(time.monotonic())
+        latency = health.latency_score if health.latency_score is not None else REFERENCE_LATENCY
+        return success_rate / (1.0 + latency / REFERENCE_LATENCY)
+
+    def rank(self, voices: Iterable[str]) -> List[str]:
+        """Order voices healthiest first, dropping voices whose circuit is open"""
+        now = time.monotonic()
+        candidates = []
+        for voice in voices:
+            health = self._voices.get(voice)
+            if health is not None:
+                self._refresh_state(health, now)
+                if health.state == CircuitState.OPEN:
+                    continue
+            candidates.append(voice)
+        return sorted(candidates, key=self.score, reverse=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get health snapshot for every observed voice"""
+        now = time.monotonic()
+        stats = {}
+        for voice, health in self._voices.items():
+            self._refresh_state(health, now)
+            stats[voice] = {
+                'state': health.state,
+                'success_rate': round(health.current_success_rate(now), 3),
+                'latency_per_100_chars': round(health.latency_score, 3) if health.latency_score is not None else None,
+                'score': round(self.score(voice), 3),
+                'consecutive_failures': health.consecutive_failures,
+                'successes': health.successes,
+                'failures': health.failures,
+            }
+        return stats
@@ -0,0 +1,135 @@
+"""
+Voice Previews for TTS Bot
+A short sample clip per voice, synthesized once in the background and re-sent by Telegram file_id
+"""
+
+import os
+import asyncio
+from typing import Dict, List, Optional, Tuple
+
+from pyrogram.errors import BadRequest
+
+from audio_buffer import AudioBuffer
+from audio_cache import make_text_hash
+from audio_output import DeliveryFormat
+from database import get_cached_file_id, store_cached_file_id, invalidate_cached_file_id
+from executors import run_blocking, Pool
+from mp3_frames import mp3_duration
+from structured_logging import get_logger
+
+logger = get_logger(__name__)
+
+VOICE_PREVIEWS_ENABLED = os.getenv('VOICE_PREVIEWS', '1') == '1'
+# Previews synthesized at a time during startup, so user requests keep most of the engine
+PREVIEW_CONCURRENCY = int(os.getenv('VOICE_PREVIEW_CONCURRENCY', '2'))
+
+# Sample sentence per voice language; {name} is the voice's display name
+PREVIEW_TEXTS = {
+    'hi': "नमस्ते! आप {name} सुन रहे हैं। आपका text बिल्कुल इसी आवाज़ में सुनाई देगा।",
+    'en': "Hello! You are listening to {name}. Your text will sound just like this.",
+}
+
+
+class VoicePreviews:
+    """
+    Preview clips for every entry of TTSService.voice_mapping
+
+    Clips go through the normal synthesis path (so they also land in the audio
+    cache and survive restarts on disk) and are kept in memory once made. The
+    first preview of a voice is uploaded; its file_id is stored in the same
+    file_id cache as TTS results, so later previews cost no synthesis and no upload.
+    """
+
+    def __init__(self, tts_service):
+        self.tts_service = tts_service
+        self._clips: Dict[str, bytes] = {}
+        self._file_ids: Dict[str, str] = {}
+        self.stats = {'generated': 0, 'failed': 0, 'file_id_sends': 0, 'uploads': 0}
+
+    def preview_text(self, voice_type: str) -> str:
+        config = self.tts_service.voice_mapping[voice_type]
+        return PREVIEW_TEXTS['hi' if config['lang'] == 'hi' else 'en'].format(name=config['name'])
+
+    def voice_list(self) -> List[Tuple[str, str]]:
+        """(voice_type, display name) of every voice with a preview, in menu order"""
+        return [(voice_type, config['name']) for voice_type, config in self.tts_service.voice_mapping.items()]
+
+    async def _clip(self, voice_type: str) -> Optional[bytes]:
+        clip = self._clips.get(voice_type)
+        if clip is not None:
+            return clip
+        audio_data = await self.tts_service.text_to_speech_with_voice(self.preview_text(voice_type), voice_type)
+        # Fallback audio is another voice (or gTTS): never keep it as this voice's preview
+        if not audio_data or not getattr(audio_data, 'cacheable', False):
+            self.stats['failed'] += 1
+            logger.warning("voice_preview_unavailable", voice_type=voice_type)
+            return None
+        clip = self._clips[voice_type] = audio_data.freeze()
+        self.stats['generated'] += 1
+        return clip
+
+    async def generate_all(self):
+        """Synthesize the missing previews (run in the background at startup)"""
+        semaphore = asyncio.Semaphore(PREVIEW_CONCURRENCY)
+
+        async def generate(voice_type):
+            async with semaphore:
+                try:
+                    await self._clip(voice_type)
+                except Exception as e:
+                    self.stats['failed'] += 1
+                    logger.warning("voice_preview_failed", voice_type=voice_type, error=str(e))
+
+        await asyncio.gather(*(generate(voice_type) for voice_type in self.tts_service.voice_mapping))
+        logger.info("voice_previews_ready", ready=len(self._clips), voices=len(self.tts_service.voice_mapping))
+
+    async def send(self, message, voice_type: str):
+        """
+        Reply with the preview clip of a voice: by file_id when it was uploaded before
+
+        Returns:
+            Message: The sent audio message, or None if the preview could not be made
+        """
+        config = self.tts_service.voice_mapping[voice_type]
+        voice_id = config['voice']
+        text_hash = make_text_hash(self.preview_text(voice_type))
+        caption = (
+            f"🔊 **{config['name']}** - {'Hindi' if config['lang'] == 'hi' else 'English (India)'} voice preview\n\n"
+            "Pasand aayi? Voice list me se select karke apna text bhejo."
+        )
+
+        file_id = self._file_ids.get(voice_type) or await run_blocking(
+            Pool.DB, get_cached_file_id, voice_id, text_hash, DeliveryFormat.AUDIO
+        )
+        if file_id:
+            try:
+                preview_msg = await message.reply_audio(file_id, caption=caption)
+                self._file_ids[voice_type] = file_id
+                self.stats['file_id_sends'] += 1
+                return preview_msg
+            except BadRequest as e:
+                logger.info("file_id_invalidated", voice=voice_id, error=str(e), preview=True)
+                self._file_ids.pop(voice_type, None)
+                await run_blocking(Pool.DB, invalidate_cached_file_id, voice_id, text_hash, DeliveryFormat.AUDIO)
+
+        clip = await self._clip(voice_type)
+        if clip is None:
+            return None
+        preview_msg = await message.reply_audio(
+            AudioBuffer(clip, name=f"preview_{voice_type}.mp3"),
+            caption=caption,
+            title=f"{config['name']} - Voice Preview",
+            duration=int(round(mp3_duration(clip)))
+        )
+        self.stats['uploads'] += 1
+        if preview_msg and preview_msg.audio:
+            self._file_ids[voice_type] = preview_msg.audio.file_id
+            await run_blocking(
+                Pool.DB, store_cached_file_id, voice_id, text_hash, DeliveryFormat.AUDIO,
+                preview_msg.audio.file_id, preview_msg.audio.file_size
+            )
+        return preview_msg
+
+    def get_stats(self) -> dict:
+        """Preview clips ready and how previews were delivered"""
+        return {**self.stats, 'ready': len(self._clips), 'voices': len(self.tts_service.voice_mapping)}
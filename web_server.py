@@ -10,6 +10,8 @@ import os
 import sqlite3
 from datetime import datetime, timedelta
 from database import SessionLocal, User, TTSRequest, BotStatus
+from latency_metrics import latency_metrics
+from executors import executors
 import psutil
 import sys
 
@@ -152,6 +154,13 @@ def dashboard():
             "python_version": f"{sys.version_info.major}.{sys.version_info.minor}.{sys.version_info.micro}",
             "voice_stats": voice_stats,
             
+            # TTS request latency (rolling p50/p95/p99 in ms)
+            "latency": latency_metrics.get_stats(),
+            "voice_latency": latency_metrics.get_voice_stats(),
+            
+            # Blocking-work pools (queue depth, utilization)
+            "executors": executors.get_stats(),
+            
             # Timestamp
             "timestamp": datetime.now().strftime('%d/%m/%Y %H:%M:%S'),
             "iso_timestamp": datetime.now().isoformat()
@@ -274,6 +283,23 @@ def bot_status():
             "timestamp": datetime.now().isoformat()
         }), 500
 
+@app.route('/api/latency')
+def api_latency():
+    """Per-stage and per-voice TTS latency percentiles"""
+    return jsonify({
+        "stages": latency_metrics.get_stats(),
+        "voices": latency_metrics.get_voice_stats(),
+        "timestamp": datetime.now().isoformat()
+    })
+
+@app.route('/api/executors')
+def api_executors():
+    """Queue depth, active workers and utilization of the blocking-work pools"""
+    return jsonify({
+        "pools": executors.get_stats(),
+        "timestamp": datetime.now().isoformat()
+    })
+
 @app.route('/webhook', methods=['POST'])
 def webhook():
     """Webhook endpoint for external integrations"""